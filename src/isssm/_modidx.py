@@ -5,14 +5,63 @@ d = { 'settings': { 'branch': 'main',
                 'doc_host': 'https://stefanheyder.github.io',
                 'git_url': 'https://github.com/stefanheyder/isssm',
                 'lib_path': 'src/isssm'},
-  'syms': { 'isssm.ce_method': { 'isssm.ce_method.cross_entropy_method': ( 'cross_entropy_method.html#cross_entropy_method',
+  'syms': { 'isssm.benchmark': { 'isssm.benchmark.BenchmarkCase': ('benchmarks.html#benchmarkcase', 'isssm/benchmark.py'),
+                                 'isssm.benchmark.BenchmarkResult': ('benchmarks.html#benchmarkresult', 'isssm/benchmark.py'),
+                                 'isssm.benchmark._max_rss': ('benchmarks.html#_max_rss', 'isssm/benchmark.py'),
+                                 'isssm.benchmark._observe_p_times': ('benchmarks.html#_observe_p_times', 'isssm/benchmark.py'),
+                                 'isssm.benchmark._peak_memory': ('benchmarks.html#_peak_memory', 'isssm/benchmark.py'),
+                                 'isssm.benchmark._setup': ('benchmarks.html#_setup', 'isssm/benchmark.py'),
+                                 'isssm.benchmark._timed': ('benchmarks.html#_timed', 'isssm/benchmark.py'),
+                                 'isssm.benchmark.benchmark_glssm': ('benchmarks.html#benchmark_glssm', 'isssm/benchmark.py'),
+                                 'isssm.benchmark.benchmark_grid': ('benchmarks.html#benchmark_grid', 'isssm/benchmark.py'),
+                                 'isssm.benchmark.benchmark_pgssm': ('benchmarks.html#benchmark_pgssm', 'isssm/benchmark.py'),
+                                 'isssm.benchmark.compare_results': ('benchmarks.html#compare_results', 'isssm/benchmark.py'),
+                                 'isssm.benchmark.environment': ('benchmarks.html#environment', 'isssm/benchmark.py'),
+                                 'isssm.benchmark.main': ('benchmarks.html#main', 'isssm/benchmark.py'),
+                                 'isssm.benchmark.read_results': ('benchmarks.html#read_results', 'isssm/benchmark.py'),
+                                 'isssm.benchmark.run_benchmarks': ('benchmarks.html#run_benchmarks', 'isssm/benchmark.py'),
+                                 'isssm.benchmark.run_case': ('benchmarks.html#run_case', 'isssm/benchmark.py')},
+            'isssm.bucketing': { 'isssm.bucketing._pad_edge': ('bucketing.html#_pad_edge', 'isssm/bucketing.py'),
+                                 'isssm.bucketing.bucket_length': ('bucketing.html#bucket_length', 'isssm/bucketing.py'),
+                                 'isssm.bucketing.bucketed_kalman': ('bucketing.html#bucketed_kalman', 'isssm/bucketing.py'),
+                                 'isssm.bucketing.bucketed_laplace_approximation': ( 'bucketing.html#bucketed_laplace_approximation',
+                                                                                     'isssm/bucketing.py'),
+                                 'isssm.bucketing.bucketed_mle_pgssm': ('bucketing.html#bucketed_mle_pgssm', 'isssm/bucketing.py'),
+                                 'isssm.bucketing.bucketed_modified_efficient_importance_sampling': ( 'bucketing.html#bucketed_modified_efficient_importance_sampling',
+                                                                                                      'isssm/bucketing.py'),
+                                 'isssm.bucketing.pad_model': ('bucketing.html#pad_model', 'isssm/bucketing.py'),
+                                 'isssm.bucketing.pad_observations': ('bucketing.html#pad_observations', 'isssm/bucketing.py'),
+                                 'isssm.bucketing.truncate_model': ('bucketing.html#truncate_model', 'isssm/bucketing.py')},
+            'isssm.ce_method': { 'isssm.ce_method._cross_entropy_method': ( 'cross_entropy_method.html#_cross_entropy_method',
+                                                                            'isssm/ce_method.py'),
+                                 'isssm.ce_method._joint_cov': ('cross_entropy_method.html#_joint_cov', 'isssm/ce_method.py'),
+                                 'isssm.ce_method._moment_sums': ('cross_entropy_method.html#_moment_sums', 'isssm/ce_method.py'),
+                                 'isssm.ce_method._with_operators': ('cross_entropy_method.html#_with_operators', 'isssm/ce_method.py'),
+                                 'isssm.ce_method.consecutive_moments': ( 'cross_entropy_method.html#consecutive_moments',
+                                                                          'isssm/ce_method.py'),
+                                 'isssm.ce_method.cross_entropy_method': ( 'cross_entropy_method.html#cross_entropy_method',
                                                                            'isssm/ce_method.py'),
                                  'isssm.ce_method.log_pdf': ('cross_entropy_method.html#log_pdf', 'isssm/ce_method.py'),
                                  'isssm.ce_method.log_weight_cem': ('cross_entropy_method.html#log_weight_cem', 'isssm/ce_method.py'),
+                                 'isssm.ce_method.posterior_markov_proposal': ( 'cross_entropy_method.html#posterior_markov_proposal',
+                                                                                'isssm/ce_method.py'),
                                  'isssm.ce_method.proposal_from_moments': ( 'cross_entropy_method.html#proposal_from_moments',
                                                                             'isssm/ce_method.py'),
-                                 'isssm.ce_method.simulate_cem': ('cross_entropy_method.html#simulate_cem', 'isssm/ce_method.py')},
-            'isssm.estimation': { 'isssm.estimation._pgnll': ('maximum_likelihood_estimation.html#_pgnll', 'isssm/estimation.py'),
+                                 'isssm.ce_method.simulate_cem': ('cross_entropy_method.html#simulate_cem', 'isssm/ce_method.py'),
+                                 'isssm.ce_method.transition_matrices': ( 'cross_entropy_method.html#transition_matrices',
+                                                                          'isssm/ce_method.py')},
+            'isssm.compilation': { 'isssm.compilation.WarmupShape': ('compilation.html#warmupshape', 'isssm/compilation.py'),
+                                   'isssm.compilation._placeholder_model': ('compilation.html#_placeholder_model', 'isssm/compilation.py'),
+                                   'isssm.compilation.default_cache_dir': ('compilation.html#default_cache_dir', 'isssm/compilation.py'),
+                                   'isssm.compilation.enable_compilation_cache': ( 'compilation.html#enable_compilation_cache',
+                                                                                   'isssm/compilation.py'),
+                                   'isssm.compilation.warmup': ('compilation.html#warmup', 'isssm/compilation.py')},
+            'isssm.estimation': { 'isssm.estimation._minimize_scipy': ( 'maximum_likelihood_estimation.html#_minimize_scipy',
+                                                                        'isssm/estimation.py'),
+                                  'isssm.estimation._pgnll': ('maximum_likelihood_estimation.html#_pgnll', 'isssm/estimation.py'),
+                                  'isssm.estimation._pgnll_cv': ('maximum_likelihood_estimation.html#_pgnll_cv', 'isssm/estimation.py'),
+                                  'isssm.estimation._pgnll_kernel': ( 'maximum_likelihood_estimation.html#_pgnll_kernel',
+                                                                      'isssm/estimation.py'),
                                   'isssm.estimation.gnll': ('maximum_likelihood_estimation.html#gnll', 'isssm/estimation.py'),
                                   'isssm.estimation.gnll_full': ('maximum_likelihood_estimation.html#gnll_full', 'isssm/estimation.py'),
                                   'isssm.estimation.initial_theta': ( 'maximum_likelihood_estimation.html#initial_theta',
@@ -27,30 +76,117 @@ d = { 'settings': { 'branch': 'main',
                              'isssm.glssm.log_probs_y': ('glssm.html#log_probs_y', 'isssm/glssm.py'),
                              'isssm.glssm.simulate_glssm': ('glssm.html#simulate_glssm', 'isssm/glssm.py'),
                              'isssm.glssm.simulate_states': ('glssm.html#simulate_states', 'isssm/glssm.py')},
-            'isssm.importance_sampling': { 'isssm.importance_sampling.ess': ( 'importance_sampling.html#ess',
+            'isssm.importance_sampling': { 'isssm.importance_sampling.ControlledEstimate': ( 'importance_sampling.html#controlledestimate',
+                                                                                             'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.ControlledPredictionResult': ( 'importance_sampling.html#controlledpredictionresult',
+                                                                                                     'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.PredictionResult': ( 'importance_sampling.html#predictionresult',
+                                                                                           'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.QuantileSketch': ( 'importance_sampling.html#quantilesketch',
+                                                                                         'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling._check_affine': ( 'importance_sampling.html#_check_affine',
+                                                                                        'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling._conditional_moments': ( 'importance_sampling.html#_conditional_moments',
+                                                                                               'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling._controlled_mean': ( 'importance_sampling.html#_controlled_mean',
+                                                                                           'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling._discrete_prediction_quantiles': ( 'importance_sampling.html#_discrete_prediction_quantiles',
+                                                                                                         'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling._normal_mixture_quantiles': ( 'importance_sampling.html#_normal_mixture_quantiles',
+                                                                                                    'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling._percentiles': ( 'importance_sampling.html#_percentiles',
+                                                                                       'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling._prediction_draws': ( 'importance_sampling.html#_prediction_draws',
+                                                                                            'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling._prediction_samples': ( 'importance_sampling.html#_prediction_samples',
+                                                                                              'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling._regression_coefficients': ( 'importance_sampling.html#_regression_coefficients',
+                                                                                                   'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling._signal_log_weights': ( 'importance_sampling.html#_signal_log_weights',
+                                                                                              'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling._synthetic_log_prob': ( 'importance_sampling.html#_synthetic_log_prob',
+                                                                                              'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.cv_mc_integration': ( 'importance_sampling.html#cv_mc_integration',
+                                                                                            'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.diagonal_gaussian_log_prob': ( 'importance_sampling.html#diagonal_gaussian_log_prob',
+                                                                                                     'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.discrete_prediction_quantiles': ( 'importance_sampling.html#discrete_prediction_quantiles',
+                                                                                                        'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.ess': ( 'importance_sampling.html#ess',
                                                                               'isssm/importance_sampling.py'),
                                            'isssm.importance_sampling.ess_lw': ( 'importance_sampling.html#ess_lw',
                                                                                  'isssm/importance_sampling.py'),
                                            'isssm.importance_sampling.ess_pct': ( 'importance_sampling.html#ess_pct',
                                                                                   'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.future_prediction_interval': ( 'importance_sampling.html#future_prediction_interval',
+                                                                                                     'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.is_diagonal': ( 'importance_sampling.html#is_diagonal',
+                                                                                      'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.log_weights': ( 'importance_sampling.html#log_weights',
+                                                                                      'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.log_weights_diagonal': ( 'importance_sampling.html#log_weights_diagonal',
+                                                                                               'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.log_weights_t': ( 'importance_sampling.html#log_weights_t',
+                                                                                        'isssm/importance_sampling.py'),
                                            'isssm.importance_sampling.mc_integration': ( 'importance_sampling.html#mc_integration',
                                                                                          'isssm/importance_sampling.py'),
                                            'isssm.importance_sampling.normalize_weights': ( 'importance_sampling.html#normalize_weights',
                                                                                             'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.pgssm_importance_sampling': ( 'importance_sampling.html#pgssm_importance_sampling',
+                                                                                                    'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.predict': ( 'importance_sampling.html#predict',
+                                                                                  'isssm/importance_sampling.py'),
                                            'isssm.importance_sampling.prediction': ( 'importance_sampling.html#prediction',
-                                                                                     'isssm/importance_sampling.py')},
-            'isssm.kalman': { 'isssm.kalman.FFBS': ('kalman_filter_smoother.html#ffbs', 'isssm/kalman.py'),
+                                                                                     'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.proposal_signal_moments': ( 'importance_sampling.html#proposal_signal_moments',
+                                                                                                  'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.quantile_sketch': ( 'importance_sampling.html#quantile_sketch',
+                                                                                          'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.signal_control_variates': ( 'importance_sampling.html#signal_control_variates',
+                                                                                                  'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.sketch_quantiles': ( 'importance_sampling.html#sketch_quantiles',
+                                                                                           'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.update_sketch': ( 'importance_sampling.html#update_sketch',
+                                                                                        'isssm/importance_sampling.py'),
+                                           'isssm.importance_sampling.weighted_quantiles': ( 'importance_sampling.html#weighted_quantiles',
+                                                                                             'isssm/importance_sampling.py')},
+            'isssm.kalman': { 'isssm.kalman.BlockDiagonal': ('kalman_filter_smoother.html#blockdiagonal', 'isssm/kalman.py'),
+                              'isssm.kalman.Companion': ('kalman_filter_smoother.html#companion', 'isssm/kalman.py'),
+                              'isssm.kalman.Dense': ('kalman_filter_smoother.html#dense', 'isssm/kalman.py'),
+                              'isssm.kalman.FFBS': ('kalman_filter_smoother.html#ffbs', 'isssm/kalman.py'),
+                              'isssm.kalman.Selection': ('kalman_filter_smoother.html#selection', 'isssm/kalman.py'),
+                              'isssm.kalman.StateSpaceStructure': ('kalman_filter_smoother.html#statespacestructure', 'isssm/kalman.py'),
+                              'isssm.kalman._apply_selection': ('kalman_filter_smoother.html#_apply_selection', 'isssm/kalman.py'),
+                              'isssm.kalman._apply_selection_T': ('kalman_filter_smoother.html#_apply_selection_t', 'isssm/kalman.py'),
+                              'isssm.kalman._apply_transition': ('kalman_filter_smoother.html#_apply_transition', 'isssm/kalman.py'),
+                              'isssm.kalman._apply_transition_T': ('kalman_filter_smoother.html#_apply_transition_t', 'isssm/kalman.py'),
+                              'isssm.kalman._backward_sampling_parameters': ( 'kalman_filter_smoother.html#_backward_sampling_parameters',
+                                                                              'isssm/kalman.py'),
                               'isssm.kalman._filter': ('kalman_filter_smoother.html#_filter', 'isssm/kalman.py'),
+                              'isssm.kalman._filter_means': ('kalman_filter_smoother.html#_filter_means', 'isssm/kalman.py'),
+                              'isssm.kalman._kalman_gains': ('kalman_filter_smoother.html#_kalman_gains', 'isssm/kalman.py'),
+                              'isssm.kalman._n_variates': ('kalman_filter_smoother.html#_n_variates', 'isssm/kalman.py'),
                               'isssm.kalman._predict': ('kalman_filter_smoother.html#_predict', 'isssm/kalman.py'),
+                              'isssm.kalman._sample_backwards': ('kalman_filter_smoother.html#_sample_backwards', 'isssm/kalman.py'),
+                              'isssm.kalman._samples_from_variates': ( 'kalman_filter_smoother.html#_samples_from_variates',
+                                                                       'isssm/kalman.py'),
+                              'isssm.kalman._signal_filter_smoother': ( 'kalman_filter_smoother.html#_signal_filter_smoother',
+                                                                        'isssm/kalman.py'),
                               'isssm.kalman._sim_from_innovations_disturbances': ( 'kalman_filter_smoother.html#_sim_from_innovations_disturbances',
                                                                                    'isssm/kalman.py'),
                               'isssm.kalman._simulate_smoothed_FW1994': ( 'kalman_filter_smoother.html#_simulate_smoothed_fw1994',
                                                                           'isssm/kalman.py'),
+                              'isssm.kalman._simulation_smoother': ('kalman_filter_smoother.html#_simulation_smoother', 'isssm/kalman.py'),
                               'isssm.kalman._smooth_step': ('kalman_filter_smoother.html#_smooth_step', 'isssm/kalman.py'),
+                              'isssm.kalman._structured_filter': ('kalman_filter_smoother.html#_structured_filter', 'isssm/kalman.py'),
+                              'isssm.kalman._structured_kalman': ('kalman_filter_smoother.html#_structured_kalman', 'isssm/kalman.py'),
+                              'isssm.kalman._structured_predict': ('kalman_filter_smoother.html#_structured_predict', 'isssm/kalman.py'),
                               'isssm.kalman.account_for_nans': ('kalman_filter_smoother.html#account_for_nans', 'isssm/kalman.py'),
+                              'isssm.kalman.batched_FFBS': ('kalman_filter_smoother.html#batched_ffbs', 'isssm/kalman.py'),
                               'isssm.kalman.disturbance_smoother': ('kalman_filter_smoother.html#disturbance_smoother', 'isssm/kalman.py'),
                               'isssm.kalman.filter_intervals': ('kalman_filter_smoother.html#filter_intervals', 'isssm/kalman.py'),
                               'isssm.kalman.kalman': ('kalman_filter_smoother.html#kalman', 'isssm/kalman.py'),
+                              'isssm.kalman.log_likelihood': ('kalman_filter_smoother.html#log_likelihood', 'isssm/kalman.py'),
                               'isssm.kalman.simulation_smoother': ('kalman_filter_smoother.html#simulation_smoother', 'isssm/kalman.py'),
                               'isssm.kalman.smoothed_signals': ('kalman_filter_smoother.html#smoothed_signals', 'isssm/kalman.py'),
                               'isssm.kalman.smoother': ('kalman_filter_smoother.html#smoother', 'isssm/kalman.py'),
@@ -58,9 +194,20 @@ d = { 'settings': { 'branch': 'main',
                               'isssm.kalman.state_conditional_on_signal': ( 'kalman_filter_smoother.html#state_conditional_on_signal',
                                                                             'isssm/kalman.py'),
                               'isssm.kalman.state_mode': ('kalman_filter_smoother.html#state_mode', 'isssm/kalman.py'),
+                              'isssm.kalman.structured_disturbance_smoother': ( 'kalman_filter_smoother.html#structured_disturbance_smoother',
+                                                                                'isssm/kalman.py'),
+                              'isssm.kalman.structured_kalman': ('kalman_filter_smoother.html#structured_kalman', 'isssm/kalman.py'),
+                              'isssm.kalman.structured_smoothed_signals': ( 'kalman_filter_smoother.html#structured_smoothed_signals',
+                                                                            'isssm/kalman.py'),
                               'isssm.kalman.to_signal_model': ('kalman_filter_smoother.html#to_signal_model', 'isssm/kalman.py')},
-            'isssm.laplace_approximation': { 'isssm.laplace_approximation._initial_guess': ( 'laplace_approximation.html#_initial_guess',
+            'isssm.laplace_approximation': { 'isssm.laplace_approximation._default_log_lik': ( 'laplace_approximation.html#_default_log_lik',
+                                                                                               'isssm/laplace_approximation.py'),
+                                             'isssm.laplace_approximation._initial_guess': ( 'laplace_approximation.html#_initial_guess',
                                                                                              'isssm/laplace_approximation.py'),
+                                             'isssm.laplace_approximation._laplace_approximation': ( 'laplace_approximation.html#_laplace_approximation',
+                                                                                                     'isssm/laplace_approximation.py'),
+                                             'isssm.laplace_approximation._pseudo_observations': ( 'laplace_approximation.html#_pseudo_observations',
+                                                                                                   'isssm/laplace_approximation.py'),
                                              'isssm.laplace_approximation.laplace_approximation': ( 'laplace_approximation.html#laplace_approximation',
                                                                                                     'isssm/laplace_approximation.py'),
                                              'isssm.laplace_approximation.posterior_mode': ( 'laplace_approximation.html#posterior_mode',
@@ -68,32 +215,170 @@ d = { 'settings': { 'branch': 'main',
             'isssm.models.glssm': { 'isssm.models.glssm.ar1': ('Models/gaussian_models.html#ar1', 'isssm/models/glssm.py'),
                                     'isssm.models.glssm.lcm': ('Models/gaussian_models.html#lcm', 'isssm/models/glssm.py'),
                                     'isssm.models.glssm.mv_ar1': ('Models/gaussian_models.html#mv_ar1', 'isssm/models/glssm.py')},
-            'isssm.models.pgssm': { 'isssm.models.pgssm.nb_pgssm': ('Models/pgssm.html#nb_pgssm', 'isssm/models/pgssm.py'),
+            'isssm.models.pgssm': { 'isssm.models.pgssm.dist_nb': ('Models/pgssm.html#dist_nb', 'isssm/models/pgssm.py'),
+                                    'isssm.models.pgssm.dist_poisson': ('Models/pgssm.html#dist_poisson', 'isssm/models/pgssm.py'),
+                                    'isssm.models.pgssm.nb_pgssm': ('Models/pgssm.html#nb_pgssm', 'isssm/models/pgssm.py'),
                                     'isssm.models.pgssm.poisson_pgssm': ('Models/pgssm.html#poisson_pgssm', 'isssm/models/pgssm.py')},
-            'isssm.models.stsm': {'isssm.models.stsm.stsm': ('Models/stsm.html#stsm', 'isssm/models/stsm.py')},
-            'isssm.modified_efficient_importance_sampling': { 'isssm.modified_efficient_importance_sampling.modified_efficient_importance_sampling': ( 'modified_efficient_importance_sampling.html#modified_efficient_importance_sampling',
+            'isssm.models.stsm': { 'isssm.models.stsm.stsm': ('Models/stsm.html#stsm', 'isssm/models/stsm.py'),
+                                   'isssm.models.stsm.stsm_structure': ('Models/stsm.html#stsm_structure', 'isssm/models/stsm.py')},
+            'isssm.modified_efficient_importance_sampling': { 'isssm.modified_efficient_importance_sampling._modified_efficient_importance_sampling': ( 'modified_efficient_importance_sampling.html#_modified_efficient_importance_sampling',
+                                                                                                                                                        'isssm/modified_efficient_importance_sampling.py'),
+                                                              'isssm.modified_efficient_importance_sampling._normal_equations': ( 'modified_efficient_importance_sampling.html#_normal_equations',
+                                                                                                                                  'isssm/modified_efficient_importance_sampling.py'),
+                                                              'isssm.modified_efficient_importance_sampling._normalize_observed_weights': ( 'modified_efficient_importance_sampling.html#_normalize_observed_weights',
+                                                                                                                                            'isssm/modified_efficient_importance_sampling.py'),
+                                                              'isssm.modified_efficient_importance_sampling._solve_normal_equations': ( 'modified_efficient_importance_sampling.html#_solve_normal_equations',
+                                                                                                                                        'isssm/modified_efficient_importance_sampling.py'),
+                                                              'isssm.modified_efficient_importance_sampling.modified_efficient_importance_sampling': ( 'modified_efficient_importance_sampling.html#modified_efficient_importance_sampling',
                                                                                                                                                        'isssm/modified_efficient_importance_sampling.py'),
                                                               'isssm.modified_efficient_importance_sampling.optimal_parameters': ( 'modified_efficient_importance_sampling.html#optimal_parameters',
                                                                                                                                    'isssm/modified_efficient_importance_sampling.py')},
+            'isssm.parallel': { 'isssm.parallel.Job': ('parallel.html#job', 'isssm/parallel.py'),
+                                'isssm.parallel.JobResult': ('parallel.html#jobresult', 'isssm/parallel.py'),
+                                'isssm.parallel._future_observations': ('parallel.html#_future_observations', 'isssm/parallel.py'),
+                                'isssm.parallel._initialize_worker': ('parallel.html#_initialize_worker', 'isssm/parallel.py'),
+                                'isssm.parallel._pin_to_cores': ('parallel.html#_pin_to_cores', 'isssm/parallel.py'),
+                                'isssm.parallel._run_job': ('parallel.html#_run_job', 'isssm/parallel.py'),
+                                'isssm.parallel.mle_job': ('parallel.html#mle_job', 'isssm/parallel.py'),
+                                'isssm.parallel.prediction_job': ('parallel.html#prediction_job', 'isssm/parallel.py'),
+                                'isssm.parallel.run_jobs': ('parallel.html#run_jobs', 'isssm/parallel.py'),
+                                'isssm.parallel.worker_environment': ('parallel.html#worker_environment', 'isssm/parallel.py')},
+            'isssm.particle_filter': { 'isssm.particle_filter.GuidedStep': ('particle_filter.html#guidedstep', 'isssm/particle_filter.py'),
+                                       'isssm.particle_filter.MarkovStep': ('particle_filter.html#markovstep', 'isssm/particle_filter.py'),
+                                       'isssm.particle_filter.ParticleFilterResult': ( 'particle_filter.html#particlefilterresult',
+                                                                                       'isssm/particle_filter.py'),
+                                       'isssm.particle_filter.ParticleFilterState': ( 'particle_filter.html#particlefilterstate',
+                                                                                      'isssm/particle_filter.py'),
+                                       'isssm.particle_filter._assimilate': ( 'particle_filter.html#_assimilate',
+                                                                              'isssm/particle_filter.py'),
+                                       'isssm.particle_filter._check_finite': ( 'particle_filter.html#_check_finite',
+                                                                                'isssm/particle_filter.py'),
+                                       'isssm.particle_filter._guided_operators': ( 'particle_filter.html#_guided_operators',
+                                                                                    'isssm/particle_filter.py'),
+                                       'isssm.particle_filter._guided_step': ( 'particle_filter.html#_guided_step',
+                                                                               'isssm/particle_filter.py'),
+                                       'isssm.particle_filter._markov_step': ( 'particle_filter.html#_markov_step',
+                                                                               'isssm/particle_filter.py'),
+                                       'isssm.particle_filter._particle_filter': ( 'particle_filter.html#_particle_filter',
+                                                                                   'isssm/particle_filter.py'),
+                                       'isssm.particle_filter._resample_if_degenerate': ( 'particle_filter.html#_resample_if_degenerate',
+                                                                                          'isssm/particle_filter.py'),
+                                       'isssm.particle_filter._step_function': ( 'particle_filter.html#_step_function',
+                                                                                 'isssm/particle_filter.py'),
+                                       'isssm.particle_filter.assimilate': ('particle_filter.html#assimilate', 'isssm/particle_filter.py'),
+                                       'isssm.particle_filter.guided_steps': ( 'particle_filter.html#guided_steps',
+                                                                               'isssm/particle_filter.py'),
+                                       'isssm.particle_filter.initial_state': ( 'particle_filter.html#initial_state',
+                                                                                'isssm/particle_filter.py'),
+                                       'isssm.particle_filter.markov_steps': ( 'particle_filter.html#markov_steps',
+                                                                               'isssm/particle_filter.py'),
+                                       'isssm.particle_filter.particle_filter': ( 'particle_filter.html#particle_filter',
+                                                                                  'isssm/particle_filter.py'),
+                                       'isssm.particle_filter.systematic_resampling': ( 'particle_filter.html#systematic_resampling',
+                                                                                        'isssm/particle_filter.py')},
             'isssm.pgssm': { 'isssm.pgssm.log_prob': ('pgssm.html#log_prob', 'isssm/pgssm.py'),
                              'isssm.pgssm.log_probs_y': ('pgssm.html#log_probs_y', 'isssm/pgssm.py'),
+                             'isssm.pgssm.mask_missing': ('pgssm.html#mask_missing', 'isssm/pgssm.py'),
+                             'isssm.pgssm.missing_observations': ('pgssm.html#missing_observations', 'isssm/pgssm.py'),
                              'isssm.pgssm.nb_pgssm_running_example': ('pgssm.html#nb_pgssm_running_example', 'isssm/pgssm.py'),
+                             'isssm.pgssm.observation_log_prob': ('pgssm.html#observation_log_prob', 'isssm/pgssm.py'),
                              'isssm.pgssm.simulate_pgssm': ('pgssm.html#simulate_pgssm', 'isssm/pgssm.py')},
+            'isssm.sharding': { 'isssm.sharding._check_divisible': ('sharding.html#_check_divisible', 'isssm/sharding.py'),
+                                'isssm.sharding._shard_map': ('sharding.html#_shard_map', 'isssm/sharding.py'),
+                                'isssm.sharding._sharded_importance_sampling': ( 'sharding.html#_sharded_importance_sampling',
+                                                                                 'isssm/sharding.py'),
+                                'isssm.sharding._sharded_modified_efficient_importance_sampling': ( 'sharding.html#_sharded_modified_efficient_importance_sampling',
+                                                                                                    'isssm/sharding.py'),
+                                'isssm.sharding._sharded_prediction': ('sharding.html#_sharded_prediction', 'isssm/sharding.py'),
+                                'isssm.sharding._sharded_simulation_smoother': ( 'sharding.html#_sharded_simulation_smoother',
+                                                                                 'isssm/sharding.py'),
+                                'isssm.sharding._sharded_variates': ('sharding.html#_sharded_variates', 'isssm/sharding.py'),
+                                'isssm.sharding.sample_mesh': ('sharding.html#sample_mesh', 'isssm/sharding.py'),
+                                'isssm.sharding.sharded_logsumexp': ('sharding.html#sharded_logsumexp', 'isssm/sharding.py'),
+                                'isssm.sharding.sharded_mc_integration': ('sharding.html#sharded_mc_integration', 'isssm/sharding.py'),
+                                'isssm.sharding.sharded_modified_efficient_importance_sampling': ( 'sharding.html#sharded_modified_efficient_importance_sampling',
+                                                                                                   'isssm/sharding.py'),
+                                'isssm.sharding.sharded_normalize_weights': ( 'sharding.html#sharded_normalize_weights',
+                                                                              'isssm/sharding.py'),
+                                'isssm.sharding.sharded_pgssm_importance_sampling': ( 'sharding.html#sharded_pgssm_importance_sampling',
+                                                                                      'isssm/sharding.py'),
+                                'isssm.sharding.sharded_prediction': ('sharding.html#sharded_prediction', 'isssm/sharding.py'),
+                                'isssm.sharding.sharded_simulation_smoother': ( 'sharding.html#sharded_simulation_smoother',
+                                                                                'isssm/sharding.py')},
             'isssm.typing': { 'isssm.typing.ConvergenceInformation': ('typings.html#convergenceinformation', 'isssm/typing.py'),
                               'isssm.typing.FilterResult': ('typings.html#filterresult', 'isssm/typing.py'),
                               'isssm.typing.GLSSM': ('typings.html#glssm', 'isssm/typing.py'),
                               'isssm.typing.GLSSMObservationModel': ('typings.html#glssmobservationmodel', 'isssm/typing.py'),
                               'isssm.typing.GLSSMProposal': ('typings.html#glssmproposal', 'isssm/typing.py'),
                               'isssm.typing.GLSSMState': ('typings.html#glssmstate', 'isssm/typing.py'),
+                              'isssm.typing.IterationTrace': ('typings.html#iterationtrace', 'isssm/typing.py'),
+                              'isssm.typing.IterationTrace.empty': ('typings.html#iterationtrace.empty', 'isssm/typing.py'),
+                              'isssm.typing.IterationTrace.record': ('typings.html#iterationtrace.record', 'isssm/typing.py'),
                               'isssm.typing.MarkovProposal': ('typings.html#markovproposal', 'isssm/typing.py'),
+                              'isssm.typing.MarkovProposal._replace': ('typings.html#markovproposal._replace', 'isssm/typing.py'),
                               'isssm.typing.PGSSM': ('typings.html#pgssm', 'isssm/typing.py'),
+                              'isssm.typing.PreparedModel': ('typings.html#preparedmodel', 'isssm/typing.py'),
+                              'isssm.typing.PreparedModel.__getattr__': ('typings.html#preparedmodel.__getattr__', 'isssm/typing.py'),
+                              'isssm.typing.PreparedModel.__getitem__': ('typings.html#preparedmodel.__getitem__', 'isssm/typing.py'),
+                              'isssm.typing.PreparedModel.__init__': ('typings.html#preparedmodel.__init__', 'isssm/typing.py'),
+                              'isssm.typing.PreparedModel.__iter__': ('typings.html#preparedmodel.__iter__', 'isssm/typing.py'),
+                              'isssm.typing.PreparedModel.__len__': ('typings.html#preparedmodel.__len__', 'isssm/typing.py'),
+                              'isssm.typing.PreparedModel.__repr__': ('typings.html#preparedmodel.__repr__', 'isssm/typing.py'),
+                              'isssm.typing.PreparedModel.__setattr__': ('typings.html#preparedmodel.__setattr__', 'isssm/typing.py'),
+                              'isssm.typing.PreparedModel._replace': ('typings.html#preparedmodel._replace', 'isssm/typing.py'),
+                              'isssm.typing.PreparedModel.tree_flatten': ('typings.html#preparedmodel.tree_flatten', 'isssm/typing.py'),
+                              'isssm.typing.PreparedModel.tree_unflatten': ('typings.html#preparedmodel.tree_unflatten', 'isssm/typing.py'),
                               'isssm.typing.SmootherResult': ('typings.html#smootherresult', 'isssm/typing.py'),
+                              'isssm.typing._MarkovProposal': ('typings.html#_markovproposal', 'isssm/typing.py'),
+                              'isssm.typing.prepare': ('typings.html#prepare', 'isssm/typing.py'),
+                              'isssm.typing.prepared_like': ('typings.html#prepared_like', 'isssm/typing.py'),
                               'isssm.typing.to_glssm': ('typings.html#to_glssm', 'isssm/typing.py'),
                               'isssm.typing.to_observation_model': ('typings.html#to_observation_model', 'isssm/typing.py'),
                               'isssm.typing.to_states': ('typings.html#to_states', 'isssm/typing.py')},
-            'isssm.util': { 'isssm.util.MVN_degenerate': ('util.html#mvn_degenerate', 'isssm/util.py'),
+            'isssm.updating': { 'isssm.updating._head': ('updating.html#_head', 'isssm/updating.py'),
+                                'isssm.updating._initial_pseudo_observations': ( 'updating.html#_initial_pseudo_observations',
+                                                                                 'isssm/updating.py'),
+                                'isssm.updating._join_window': ('updating.html#_join_window', 'isssm/updating.py'),
+                                'isssm.updating._time_slice': ('updating.html#_time_slice', 'isssm/updating.py'),
+                                'isssm.updating._window_model': ('updating.html#_window_model', 'isssm/updating.py'),
+                                'isssm.updating._window_start': ('updating.html#_window_start', 'isssm/updating.py'),
+                                'isssm.updating.shift_proposal': ('updating.html#shift_proposal', 'isssm/updating.py'),
+                                'isssm.updating.update_laplace_approximation': ( 'updating.html#update_laplace_approximation',
+                                                                                 'isssm/updating.py'),
+                                'isssm.updating.update_modified_efficient_importance_sampling': ( 'updating.html#update_modified_efficient_importance_sampling',
+                                                                                                  'isssm/updating.py')},
+            'isssm.util': { 'isssm.util.CholeskyMVN': ('util.html#choleskymvn', 'isssm/util.py'),
+                            'isssm.util.CholeskyMVN.log_prob': ('util.html#choleskymvn.log_prob', 'isssm/util.py'),
+                            'isssm.util.CholeskyMVN.sample': ('util.html#choleskymvn.sample', 'isssm/util.py'),
+                            'isssm.util.Factorization': ('util.html#factorization', 'isssm/util.py'),
+                            'isssm.util.KernelCache': ('util.html#kernelcache', 'isssm/util.py'),
+                            'isssm.util.KernelCache.__init__': ('util.html#kernelcache.__init__', 'isssm/util.py'),
+                            'isssm.util.KernelCache.clear': ('util.html#kernelcache.clear', 'isssm/util.py'),
+                            'isssm.util.KernelCache.info': ('util.html#kernelcache.info', 'isssm/util.py'),
+                            'isssm.util.KernelCache.kernel': ('util.html#kernelcache.kernel', 'isssm/util.py'),
+                            'isssm.util.KernelCacheInfo': ('util.html#kernelcacheinfo', 'isssm/util.py'),
+                            'isssm.util.MVN_cholesky': ('util.html#mvn_cholesky', 'isssm/util.py'),
+                            'isssm.util.MVN_degenerate': ('util.html#mvn_degenerate', 'isssm/util.py'),
+                            'isssm.util._abstract_signature': ('util.html#_abstract_signature', 'isssm/util.py'),
+                            'isssm.util._eigh_qr_cholesky': ('util.html#_eigh_qr_cholesky', 'isssm/util.py'),
+                            'isssm.util._elapsed_since_last_step': ('util.html#_elapsed_since_last_step', 'isssm/util.py'),
+                            'isssm.util._first_primes': ('util.html#_first_primes', 'isssm/util.py'),
+                            'isssm.util._log_det': ('util.html#_log_det', 'isssm/util.py'),
+                            'isssm.util._nested_uniform_scramble': ('util.html#_nested_uniform_scramble', 'isssm/util.py'),
+                            'isssm.util._reverse_bits': ('util.html#_reverse_bits', 'isssm/util.py'),
+                            'isssm.util._strongly_typed': ('util.html#_strongly_typed', 'isssm/util.py'),
+                            'isssm.util._uniform_to_normal': ('util.html#_uniform_to_normal', 'isssm/util.py'),
                             'isssm.util.append_to_front': ('util.html#append_to_front', 'isssm/util.py'),
+                            'isssm.util.apply_antithetics': ('util.html#apply_antithetics', 'isssm/util.py'),
+                            'isssm.util.cached_factor': ('util.html#cached_factor', 'isssm/util.py'),
+                            'isssm.util.compiled_kernel': ('util.html#compiled_kernel', 'isssm/util.py'),
                             'isssm.util.converged': ('util.html#converged', 'isssm/util.py'),
                             'isssm.util.degenerate_cholesky': ('util.html#degenerate_cholesky', 'isssm/util.py'),
+                            'isssm.util.factorize': ('util.html#factorize', 'isssm/util.py'),
+                            'isssm.util.iid_normal': ('util.html#iid_normal', 'isssm/util.py'),
+                            'isssm.util.lattice_normal': ('util.html#lattice_normal', 'isssm/util.py'),
                             'isssm.util.location_antithetic': ('util.html#location_antithetic', 'isssm/util.py'),
-                            'isssm.util.scale_antithethic': ('util.html#scale_antithethic', 'isssm/util.py')}}}
+                            'isssm.util.n_antithetic_samples': ('util.html#n_antithetic_samples', 'isssm/util.py'),
+                            'isssm.util.scale_antithethic': ('util.html#scale_antithethic', 'isssm/util.py'),
+                            'isssm.util.sobol_normal': ('util.html#sobol_normal', 'isssm/util.py'),
+                            'isssm.util.step_timer': ('util.html#step_timer', 'isssm/util.py')}}}
@@ -0,0 +1,361 @@
+"""Reproducible timings and memory usage of the main algorithms"""
+
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/90_benchmarks.ipynb.
+
+# %% auto 0
+__all__ = ['GAUSSIAN_ALGORITHMS', 'ALGORITHMS', 'benchmark_pgssm', 'benchmark_glssm', 'BenchmarkCase', 'benchmark_grid',
+           'BenchmarkResult', 'run_case', 'environment', 'run_benchmarks', 'read_results', 'compare_results', 'main']
+
+# %% ../../nbs/90_benchmarks.ipynb 3
+import argparse
+import itertools
+import json
+import resource
+import statistics
+import sys
+import time
+from typing import NamedTuple
+
+import jax
+import jax.numpy as jnp
+import jax.random as jrn
+import jax.scipy.linalg as jsla
+from jaxtyping import Float, PRNGKeyArray
+
+import isssm
+from .ce_method import cross_entropy_method
+from .estimation import mle_pgssm, pgnll
+from .glssm import simulate_glssm
+from isssm.kalman import (
+    FFBS,
+    disturbance_smoother,
+    kalman,
+    simulation_smoother,
+    smoother,
+)
+from .laplace_approximation import laplace_approximation
+from .models.stsm import stsm
+from isssm.modified_efficient_importance_sampling import (
+    modified_efficient_importance_sampling,
+)
+from .pgssm import nb_pgssm_running_example, simulate_pgssm
+from .typing import GLSSM, PGSSM
+
+# %% ../../nbs/90_benchmarks.ipynb 6
+def _observe_p_times(model, p: int):
+    np1, _, m = model.B.shape
+    return model._replace(
+        v=jnp.tile(model.v, (1, p)),
+        B=jnp.tile(model.B, (1, p, 1)),
+        **({"xi": jnp.tile(model.xi, (1, p))} if isinstance(model, PGSSM) else {}),
+    )
+
+
+def benchmark_pgssm(
+    n: int,  # number of time points minus one
+    m: int,  # dimension of states, at least 3
+    p: int,  # dimension of observations
+) -> PGSSM:
+    """The running example with seasonal component of order $m - 1$, observed $p$ times"""
+    model = nb_pgssm_running_example(
+        n=n,
+        s_order=m - 1,
+        x0_seasonal=jnp.zeros(m - 2),
+        Sigma0_seasonal=0.1 * jnp.eye(m - 2),
+    )
+    return _observe_p_times(model, p)
+
+
+def benchmark_glssm(
+    n: int,  # number of time points minus one
+    m: int,  # dimension of states, at least 3
+    p: int,  # dimension of observations
+    omega2: Float = 0.01,  # variance of observation noise
+) -> GLSSM:
+    """The `stsm` of the running example, observed $p$ times"""
+    Sigma0 = jsla.block_diag(0.01 * jnp.eye(2), 0.1 * jnp.eye(m - 2))
+    model = stsm(jnp.zeros(m), 0.01, 0.1, 0.1, n, Sigma0, omega2, m - 1, 0.1)
+    return _observe_p_times(model, p)._replace(
+        Omega=jnp.broadcast_to(omega2 * jnp.eye(p), (n + 1, p, p))
+    )
+
+# %% ../../nbs/90_benchmarks.ipynb 9
+GAUSSIAN_ALGORITHMS = (
+    "kalman",
+    "smoother",
+    "disturbance_smoother",
+    "simulation_smoother",
+    "FFBS",
+)
+ALGORITHMS = GAUSSIAN_ALGORITHMS + (
+    "laplace_approximation",
+    "modified_efficient_importance_sampling",
+    "cross_entropy_method",
+    "pgnll",
+    "mle_pgssm",
+)
+# algorithms whose cost does not depend on N
+_DETERMINISTIC = ("kalman", "smoother", "disturbance_smoother", "laplace_approximation")
+
+
+class BenchmarkCase(NamedTuple):
+    algorithm: str  # one of `ALGORITHMS`
+    n: int  # number of time points minus one
+    m: int  # dimension of states
+    p: int  # dimension of observations
+    N: int  # number of samples, 0 for deterministic algorithms
+
+
+def benchmark_grid(
+    n: tuple[int, ...] = (100,),  # numbers of time points minus one
+    m: tuple[int, ...] = (6,),  # dimensions of states
+    p: tuple[int, ...] = (1,),  # dimensions of observations
+    N: tuple[int, ...] = (100,),  # numbers of samples
+    algorithms: tuple[str, ...] = ALGORITHMS,  # algorithms to benchmark
+) -> list[BenchmarkCase]:  # all combinations, without duplicates
+    """Grid of benchmark cases"""
+    unknown = set(algorithms) - set(ALGORITHMS)
+    if unknown:
+        raise ValueError(f"Unknown algorithms {sorted(unknown)}, expected {ALGORITHMS}")
+    cases = []
+    for algorithm, n_, m_, p_, N_ in itertools.product(algorithms, n, m, p, N):
+        case = BenchmarkCase(
+            algorithm, n_, m_, p_, 0 if algorithm in _DETERMINISTIC else N_
+        )
+        if case not in cases:
+            cases.append(case)
+    return cases
+
+# %% ../../nbs/90_benchmarks.ipynb 12
+def _setup(
+    case: BenchmarkCase,
+    n_iter: int,  # number of iterations of LA, MEIS, CEM and the optimizer in MLE
+    key: PRNGKeyArray,
+):
+    algorithm, n, m, p, N = case
+    key, subkey = jrn.split(key)
+    if algorithm in GAUSSIAN_ALGORITHMS:
+        model = benchmark_glssm(n, m, p)
+        _, (y,) = simulate_glssm(model, 1, subkey)
+        data = {"model": model, "y": y, "key": key}
+        if algorithm == "kalman":
+            return lambda d: kalman(d["y"], d["model"]), data
+        data["filtered"] = kalman(y, model)
+        if algorithm == "smoother":
+            return lambda d: smoother(d["filtered"], d["model"].A), data
+        if algorithm == "disturbance_smoother":
+            return (
+                lambda d: disturbance_smoother(d["filtered"], d["y"], d["model"]),
+                data,
+            )
+        if algorithm == "simulation_smoother":
+            return lambda d: simulation_smoother(d["model"], d["y"], N, d["key"]), data
+        return lambda d: FFBS(d["y"], d["model"], N, d["key"]), data
+
+    model = benchmark_pgssm(n, m, p)
+    _, (y,) = simulate_pgssm(model, 1, subkey)
+    dist = model.dist
+    data = {"model": model._replace(dist=None), "y": y, "key": key}
+    with_dist = lambda d: d["model"]._replace(dist=dist)
+    if algorithm == "laplace_approximation":
+        return lambda d: laplace_approximation(d["y"], with_dist(d), n_iter), data
+    if algorithm == "cross_entropy_method":
+        return (
+            lambda d: cross_entropy_method(with_dist(d), d["y"], N, d["key"], n_iter),
+            data,
+        )
+    if algorithm == "mle_pgssm":
+        # estimate the dispersion parameter, not jittable due to scipy's optimizer
+        def model_fn(theta, aux):
+            return aux._replace(xi=jnp.full_like(aux.xi, jnp.exp(theta[0])))
+
+        theta0 = jnp.log(model.xi[:1, 0])
+        options = {"maxiter": n_iter}
+        return (
+            lambda d: mle_pgssm(
+                d["y"], model_fn, theta0, with_dist(d), n_iter, N, d["key"], options
+            ).x,
+            data,
+        )
+
+    proposal, _ = laplace_approximation(y, model, n_iter)
+    data["z"], data["Omega"] = proposal.z, proposal.Omega
+    if algorithm == "modified_efficient_importance_sampling":
+        return (
+            lambda d: modified_efficient_importance_sampling(
+                d["y"], with_dist(d), d["z"], d["Omega"], n_iter, N, d["key"]
+            ),
+            data,
+        )
+    return lambda d: pgnll(d["y"], with_dist(d), d["z"], d["Omega"], N, d["key"]), data
+
+# %% ../../nbs/90_benchmarks.ipynb 14
+class BenchmarkResult(NamedTuple):
+    algorithm: str  # one of `ALGORITHMS`
+    n: int  # number of time points minus one
+    m: int  # dimension of states
+    p: int  # dimension of observations
+    N: int  # number of samples, 0 for deterministic algorithms
+    compile_time: float  # seconds to lower and compile
+    run_time: float  # median seconds of the steady state runs
+    min_run_time: float  # fastest steady state run in seconds
+    n_runs: int  # number of steady state runs
+    peak_memory: int | None  # XLA's estimate of peak memory in bytes
+    max_rss: int  # peak resident memory of the process in bytes, so far
+
+
+def _max_rss() -> int:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on linux
+    return max_rss if sys.platform == "darwin" else 1024 * max_rss
+
+
+def _peak_memory(compiled) -> int | None:
+    stats = compiled.memory_analysis()
+    if stats is None:
+        return None
+    return (
+        stats.argument_size_in_bytes
+        + stats.output_size_in_bytes
+        + stats.temp_size_in_bytes
+        - stats.alias_size_in_bytes
+    )
+
+
+def _timed(fun, *args) -> float:
+    start = time.perf_counter()
+    jax.block_until_ready(fun(*args))
+    return time.perf_counter() - start
+
+
+def run_case(
+    case: BenchmarkCase,  # the case to run
+    n_repeat: int = 5,  # number of steady state runs
+    n_iter: int = 10,  # number of iterations of LA, MEIS, CEM and the optimizer in MLE
+    key: PRNGKeyArray | None = None,  # random key, defaults to `PRNGKey(0)`
+) -> BenchmarkResult:
+    """Benchmark a single case"""
+    key = jrn.PRNGKey(0) if key is None else key
+    target, data = _setup(case, n_iter, key)
+
+    if case.algorithm == "mle_pgssm":
+        # the objective is compiled on every call, estimate compilation time
+        # by the difference of the first and the fastest run
+        first_run = _timed(target, data)
+        run_times = [_timed(target, data) for _ in range(n_repeat)]
+        compile_time = max(first_run - min(run_times), 0.0)
+        peak_memory = None
+    else:
+        start = time.perf_counter()
+        compiled = jax.jit(target).lower(data).compile()
+        compile_time = time.perf_counter() - start
+        run_times = [_timed(compiled, data) for _ in range(n_repeat)]
+        peak_memory = _peak_memory(compiled)
+
+    return BenchmarkResult(
+        *case,
+        compile_time=compile_time,
+        run_time=statistics.median(run_times),
+        min_run_time=min(run_times),
+        n_runs=n_repeat,
+        peak_memory=peak_memory,
+        max_rss=_max_rss(),
+    )
+
+# %% ../../nbs/90_benchmarks.ipynb 15
+def environment() -> dict:
+    """Versions and configuration the benchmarks run with"""
+    return {
+        "isssm": isssm.__version__,
+        "jax": jax.__version__,
+        "backend": jax.default_backend(),
+        "device_count": jax.device_count(),
+        "x64": jax.config.jax_enable_x64,
+        "python": sys.version.split()[0],
+    }
+
+
+def run_benchmarks(
+    cases: list[BenchmarkCase],  # cases to run, see `benchmark_grid`
+    path: str | None = None,  # JSON lines file to append results to
+    n_repeat: int = 5,  # number of steady state runs
+    n_iter: int = 10,  # number of iterations of LA, MEIS, CEM and the optimizer in MLE
+    key: PRNGKeyArray | None = None,  # random key, defaults to `PRNGKey(0)`
+) -> list[BenchmarkResult]:  # results of all cases
+    """Run all cases, writing every result as soon as it is available"""
+    env = environment()
+    results = []
+    for case in cases:
+        result = run_case(case, n_repeat, n_iter, key)
+        results.append(result)
+        if path is not None:
+            with open(path, "a") as file:
+                file.write(json.dumps({**result._asdict(), "environment": env}) + "\n")
+    return results
+
+
+def read_results(
+    path: str,  # JSON lines file written by `run_benchmarks`
+) -> list[tuple[BenchmarkResult, dict]]:  # results and their environments
+    """Read benchmark results"""
+    results = []
+    with open(path) as file:
+        for line in file:
+            record = json.loads(line)
+            env = record.pop("environment")
+            results.append((BenchmarkResult(**record), env))
+    return results
+
+# %% ../../nbs/90_benchmarks.ipynb 18
+def compare_results(
+    baseline: str,  # JSON lines file of the baseline, e.g. the last release
+    current: str,  # JSON lines file of the current version
+) -> list[dict]:  # relative compile time, run time and peak memory for common cases
+    """Ratios current / baseline of the cases in both files, > 1 means slower"""
+    base = {BenchmarkCase(*r[:5]): r for r, _ in read_results(baseline)}
+    comparison = []
+    for result, _ in read_results(current):
+        case = BenchmarkCase(*result[:5])
+        if case not in base:
+            continue
+        before = base[case]
+        comparison.append(
+            {
+                **case._asdict(),
+                "compile_time": result.compile_time / before.compile_time,
+                "run_time": result.run_time / before.run_time,
+                "peak_memory": (
+                    result.peak_memory / before.peak_memory
+                    if result.peak_memory and before.peak_memory
+                    else None
+                ),
+            }
+        )
+    return comparison
+
+# %% ../../nbs/90_benchmarks.ipynb 21
+def main(argv: list[str] | None = None):
+    """Run a benchmark grid from the command line"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--n", type=int, nargs="+", default=[100])
+    parser.add_argument("--m", type=int, nargs="+", default=[6])
+    parser.add_argument("--p", type=int, nargs="+", default=[1])
+    parser.add_argument("--N", type=int, nargs="+", default=[100])
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS))
+    parser.add_argument("--n-repeat", type=int, default=5)
+    parser.add_argument("--n-iter", type=int, default=10)
+    parser.add_argument("--output", default="benchmark.jsonl")
+    parser.add_argument("--x64", action="store_true", help="use double precision")
+    args = parser.parse_args(argv)
+
+    jax.config.update("jax_enable_x64", args.x64)
+    cases = benchmark_grid(args.n, args.m, args.p, args.N, tuple(args.algorithms))
+    for result in run_benchmarks(cases, args.output, args.n_repeat, args.n_iter):
+        print(
+            f"{result.algorithm} n={result.n} m={result.m} p={result.p} N={result.N}: "
+            f"compile {result.compile_time:.2f}s, run {result.run_time:.4f}s"
+        )
+
+# %% ../../nbs/90_benchmarks.ipynb 22
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Pad time series to a fixed set of lengths to reuse compiled kernels"""
+
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/70_bucketing.ipynb.
+
+# %% auto 0
+__all__ = ['bucket_length', 'pad_model', 'pad_observations', 'truncate_model', 'bucketed_kalman',
+           'bucketed_laplace_approximation', 'bucketed_modified_efficient_importance_sampling', 'bucketed_mle_pgssm']
+
+# %% ../../nbs/70_bucketing.ipynb 3
+import jax.numpy as jnp
+from jaxtyping import Array, Float, PRNGKeyArray
+
+from .estimation import mle_pgssm
+from .kalman import kalman, smoother
+from .laplace_approximation import laplace_approximation
+from isssm.modified_efficient_importance_sampling import (
+    modified_efficient_importance_sampling,
+)
+from .pgssm import missing_omega2
+from isssm.typing import (
+    PGSSM,
+    ConvergenceInformation,
+    FilterResult,
+    GLSSM,
+    GLSSMProposal,
+)
+from .util import iid_normal
+
+# %% ../../nbs/70_bucketing.ipynb 6
+def bucket_length(
+    np1: int,  # number of time points $n + 1$
+    buckets: str | int = "pow2",  # "pow2" for powers of two or a fixed increment
+) -> int:  # smallest bucket length that is at least `np1`
+    """Length of the bucket that `np1` time points fall into"""
+    if buckets == "pow2":
+        return 1 << (np1 - 1).bit_length()
+    if isinstance(buckets, int) and buckets > 0:
+        return -(-np1 // buckets) * buckets
+    raise ValueError(f"buckets must be 'pow2' or a positive integer, got {buckets}")
+
+# %% ../../nbs/70_bucketing.ipynb 8
+# fields of models that are indexed by time t = 0, ..., n and t = 1, ..., n
+_OBSERVATION_FIELDS = ("u", "v", "B", "Omega", "xi", "z")
+_TRANSITION_FIELDS = ("A", "D", "Sigma")
+
+
+def _pad_edge(a: Array, length: int) -> Array:
+    """continue `a` along the first axis with its last entry"""
+    return jnp.concatenate([a, jnp.repeat(a[-1:], length - a.shape[0], axis=0)])
+
+
+def pad_model(
+    model: GLSSM | PGSSM | GLSSMProposal,  # model with n + 1 time points
+    length: int,  # number of time points of the padded model
+) -> GLSSM | PGSSM | GLSSMProposal:  # padded model
+    """Pad a model to `length` time points, padded time points are uninformative"""
+    np1, p, _ = model.B.shape
+    padded = {
+        name: _pad_edge(getattr(model, name), length - (name in _TRANSITION_FIELDS))
+        for name in _OBSERVATION_FIELDS + _TRANSITION_FIELDS
+        if name in model._fields
+    }
+    is_padded = jnp.arange(length) >= np1
+    padded["v"] = jnp.where(is_padded[:, None], 0.0, padded["v"])
+    padded["B"] = jnp.where(is_padded[:, None, None], 0.0, padded["B"])
+    if "Omega" in padded:
+        padded["Omega"] = jnp.where(
+            is_padded[:, None, None], missing_omega2 * jnp.eye(p), padded["Omega"]
+        )
+    if "z" in padded:
+        padded["z"] = jnp.where(is_padded[:, None], 0.0, padded["z"])
+    return model._replace(**padded)
+
+
+def pad_observations(
+    y: Float[Array, "n+1 p"],  # observations
+    length: int,  # number of time points of the padded observations
+    fill_value: Float = jnp.nan,  # value of padded observations
+) -> Float[Array, "length p"]:  # padded observations
+    """Pad observations to `length` time points"""
+    np1, p = y.shape
+    return jnp.concatenate([y, jnp.full((length - np1, p), fill_value, y.dtype)])
+
+
+def truncate_model(
+    model: GLSSM | PGSSM | GLSSMProposal,  # padded model
+    np1: int,  # number of time points to keep
+) -> GLSSM | PGSSM | GLSSMProposal:  # model with `np1` time points
+    """Undo `pad_model`"""
+    truncated = {
+        name: getattr(model, name)[: np1 - (name in _TRANSITION_FIELDS)]
+        for name in _OBSERVATION_FIELDS + _TRANSITION_FIELDS
+        if name in model._fields
+    }
+    return model._replace(**truncated)
+
+# %% ../../nbs/70_bucketing.ipynb 12
+def bucketed_kalman(
+    y: Float[Array, "n+1 p"],  # observations
+    glssm: GLSSM,  # model
+    buckets: str | int = "pow2",  # see `bucket_length`
+) -> FilterResult:  # filtered & predicted states and covariances
+    """Kalman filter on padded observations"""
+    np1, _ = y.shape
+    length = bucket_length(np1, buckets)
+    filtered = kalman(pad_observations(y, length, 0.0), pad_model(glssm, length))
+    return FilterResult(*(a[:np1] for a in filtered))
+
+# %% ../../nbs/70_bucketing.ipynb 15
+def bucketed_laplace_approximation(
+    y: Float[Array, "n+1 p"],  # observations
+    model: PGSSM,  # model
+    n_iter: int,  # number of iterations
+    buckets: str | int = "pow2",  # see `bucket_length`
+    **kwargs,  # further arguments to `laplace_approximation`
+) -> tuple[GLSSMProposal, ConvergenceInformation]:
+    """Laplace approximation on padded observations"""
+    np1, _ = y.shape
+    length = bucket_length(np1, buckets)
+    proposal, info = laplace_approximation(
+        pad_observations(y, length), pad_model(model, length), n_iter, **kwargs
+    )
+    return truncate_model(proposal, np1), info
+
+
+def bucketed_modified_efficient_importance_sampling(
+    y: Float[Array, "n+1 p"],  # observations
+    model: PGSSM,  # model
+    z_init: Float[Array, "n+1 p"],  # initial z estimate
+    Omega_init: Float[Array, "n+1 p p"],  # initial Omega estimate
+    n_iter: int,  # number of iterations
+    N: int,  # number of samples
+    key: PRNGKeyArray,  # random key
+    buckets: str | int = "pow2",  # see `bucket_length`
+    **kwargs,  # further arguments to `modified_efficient_importance_sampling`
+) -> tuple[GLSSMProposal, ConvergenceInformation]:
+    """MEIS on padded observations"""
+    np1, _ = y.shape
+    length = bucket_length(np1, buckets)
+    padded_model = pad_model(model, length)
+    padded_init = pad_model(
+        GLSSMProposal(*model[:7], Omega=Omega_init, z=z_init), length
+    )
+    proposal, info = modified_efficient_importance_sampling(
+        pad_observations(y, length),
+        padded_model,
+        padded_init.z,
+        padded_init.Omega,
+        n_iter,
+        N,
+        key,
+        **kwargs,
+    )
+    return truncate_model(proposal, np1), info
+
+# %% ../../nbs/70_bucketing.ipynb 22
+def bucketed_mle_pgssm(
+    y: Float[Array, "n+1 p"],  # observations $y_t$
+    model_fn,  # parameterized LCSSM
+    theta0: Float[Array, "k"],  # initial parameter guess
+    aux,  # auxiliary data for the model
+    n_iter_la: int,  # number of LA iterations
+    N: int,  # number of importance samples
+    key: PRNGKeyArray,  # random key
+    buckets: str | int = "pow2",  # see `bucket_length`
+    **kwargs,  # further arguments to `mle_pgssm`
+):
+    """Maximum Likelihood Estimation for PGSSMs on padded observations"""
+    np1, _ = y.shape
+    length = bucket_length(np1, buckets)
+
+    def padded_model_fn(theta, aux):
+        return pad_model(model_fn(theta, aux), length)
+
+    return mle_pgssm(
+        pad_observations(y, length),
+        padded_model_fn,
+        theta0,
+        aux,
+        n_iter_la,
+        N,
+        key,
+        **kwargs,
+    )
@@ -3,7 +3,23 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/45_cross_entropy_method.ipynb.
 
 # %% auto 0
-__all__ = ['proposal_from_moments', 'simulate_cem', 'log_pdf', 'log_weight_cem', 'cross_entropy_method']
+__all__ = ['proposal_from_moments', 'transition_matrices', 'simulate_cem', 'log_pdf', 'log_weight_cem',
+           'posterior_markov_proposal', 'consecutive_moments', 'cross_entropy_method']
+
+# %% ../../nbs/45_cross_entropy_method.ipynb 1
+from typing import Tuple
+
+import jax.numpy as jnp
+import jax.random as jrn
+import jax.scipy as jsp
+from jax import jit, vmap
+from jax.lax import fori_loop, scan, while_loop
+from jaxtyping import Array, Float, PRNGKeyArray
+
+from .importance_sampling import ess_pct, normalize_weights
+from .laplace_approximation import laplace_approximation
+from .pgssm import log_prob as log_prob_joint
+from .util import converged
 
 # %% ../../nbs/45_cross_entropy_method.ipynb 6
 from functools import partial
@@ -12,8 +28,8 @@ from typing import NamedTuple
 import jax.scipy.linalg as jsla
 
 from .typing import PGSSM, MarkovProposal, Observations
-from .util import (degenerate_cholesky, location_antithetic, mm_sim,
-                        mm_time_sim, scale_antithethic)
+from .util import (apply_antithetics, degenerate_cholesky, iid_normal,
+                        mm_sim, mm_time_sim, n_antithetic_samples)
 
 
 def proposal_from_moments(
@@ -42,133 +58,384 @@ def proposal_from_moments(
     J_tp1t = chols[1:, m:, :m]
     Rs = chols[:, m:, m:]
 
-    return MarkovProposal(mean=mean, R=Rs, J_tt=J_tt, J_tp1t=J_tp1t)
+    proposal = MarkovProposal(mean=mean, R=Rs, J_tt=J_tt, J_tp1t=J_tp1t)
+    return _with_operators(proposal)
+
+
+def _with_operators(proposal: MarkovProposal) -> MarkovProposal:
+    """precompute operators shared by all samples, if they are missing"""
+    log_det_R = proposal.log_det_R
+    if log_det_R is None:
+        log_det_R = jnp.log(vmap(jnp.diag)(proposal.R)).sum()
+    return proposal._replace(C=transition_matrices(proposal), log_det_R=log_det_R)
+
+
+def transition_matrices(
+    proposal: MarkovProposal,  # proposal
+) -> Float[Array, "n m m"]:  # $C_t = J_{t + 1,t} J_{t,t}^{-1}$
+    """Transition matrices of the proposal's recurrence"""
+    if proposal.C is not None:
+        return proposal.C
+    # C_t J_tt = J_tp1t, i.e. J_tt^T C_t^T = J_tp1t^T
+    solve = partial(jsla.solve_triangular, lower=True, trans="T")
+    C_T = vmap(solve)(proposal.J_tt, proposal.J_tp1t.transpose((0, 2, 1)))
+    return C_T.transpose((0, 2, 1))
 
 # %% ../../nbs/45_cross_entropy_method.ipynb 10
 def simulate_cem(
     proposal: MarkovProposal,  # proposal
     N: int,  # number of samples
     key: PRNGKeyArray,  # random number seed
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
 ) -> Float[Array, "N n+1 m"]:
     np1, m = proposal.mean.shape
     key, subkey = jrn.split(key)
-    u = MVN(loc=jnp.zeros(m), covariance_matrix=jnp.eye(m)).sample((N, np1), subkey)
+    u = normal_variates(subkey, N, np1 * m).reshape((N, np1, m))
 
     # transpose to have time in first dimension
     eps = mm_time_sim(proposal.R, u).transpose((1, 0, 2))
-    lower_tri_solve = partial(jsla.solve_triangular, lower=True)
 
     def _iteration(carry, inputs):
         (x_prev,) = carry
-        eps, J_tt, J_tp1t = inputs
+        eps, C = inputs
 
-        x_next = mm_sim(J_tp1t, vmap(lower_tri_solve, (None, 0))(J_tt, x_prev)) + eps
+        # a single matrix product for all samples
+        x_next = x_prev @ C.T + eps
 
         return (x_next,), x_next
 
-    J_tt_ext = jnp.concatenate([jnp.eye(m)[None], proposal.J_tt], axis=0)
-    J_tp1t_ext = jnp.concatenate([jnp.eye(m)[None], proposal.J_tp1t], axis=0)
-    _, x = scan(_iteration, (jnp.zeros((N, m)),), (eps, J_tt_ext, J_tp1t_ext))
+    C_ext = jnp.concatenate([jnp.eye(m)[None], transition_matrices(proposal)], axis=0)
+    _, x = scan(_iteration, (jnp.zeros((N, m)),), (eps, C_ext))
 
     mean = proposal.mean
     samples = x.transpose((1, 0, 2)) + proposal.mean
 
     u = u.reshape((N, -1))
-    l_samples = location_antithetic(samples, mean)
-    s_samples = scale_antithethic(u, samples, mean)
-    ls_samples = scale_antithethic(u, l_samples, mean)
-
-    return jnp.concatenate((samples, l_samples, s_samples, ls_samples), axis=0)
+    return apply_antithetics(u, samples, mean, antithetics)
 
 # %% ../../nbs/45_cross_entropy_method.ipynb 12
 from .util import mm_time
 
 
-def log_pdf(x: Float[Array, "n+1 m"], proposal: MarkovProposal):
-    np1, m = x.shape
-
-    lower_tri_solve = partial(jsla.solve_triangular, lower=True)
+def log_pdf(
+    x: Float[Array, "... n+1 m"],  # points, possibly batched
+    proposal: MarkovProposal,  # proposal
+) -> Float[Array, "..."]:  # log densities
     centered = x - proposal.mean
-    eps = centered[1:] - mm_time(
-        proposal.J_tp1t, vmap(lower_tri_solve)(proposal.J_tt, centered[:-1])
+    C = transition_matrices(proposal)
+    eps = centered[..., 1:, :] - jnp.einsum(
+        "tij,...tj->...ti", C, centered[..., :-1, :]
     )
-    eps = jnp.concatenate((centered[:1], eps), axis=0)
+    eps = jnp.concatenate((centered[..., :1, :], eps), axis=-2)
 
-    nu = vmap(lower_tri_solve)(proposal.R, eps)
+    # one triangular solve per time point for all points, (n+1, m, ...)
+    eps_t = jnp.moveaxis(eps, (-2, -1), (0, 1)).reshape((*eps.shape[-2:], -1))
+    nu = jsla.solve_triangular(proposal.R, eps_t, lower=True)
 
-    return (
-        MVN(jnp.zeros(m), jnp.eye(m)).log_prob(nu).sum()
-        - jnp.log(vmap(jnp.diag)(proposal.R)).sum()
-    )
+    log_det_R = proposal.log_det_R
+    if log_det_R is None:
+        log_det_R = jnp.log(vmap(jnp.diag)(proposal.R)).sum()
+    log_densities = jsp.stats.norm.logpdf(nu).sum(axis=(0, 1)) - log_det_R
+    return log_densities.reshape(x.shape[:-2])
 
 
 def log_weight_cem(
-    x: Float[Array, "n+1 m"],  # point at which to evaluate the weights
+    x: Float[Array, "... n+1 m"],  # points at which to evaluate the weights
     y: Observations,  # observations
     model: PGSSM,  # modle
     proposal: MarkovProposal,  # proposal
-) -> Float:  # log weights
-    log_p = log_prob_joint(x, y, model)
+) -> Float[Array, "..."]:  # log weights
+    log_p = jnp.vectorize(
+        partial(log_prob_joint, y=y, model=model), signature="(n,m)->()"
+    )(x)
     log_g = log_pdf(x, proposal)
 
     return log_p - log_g
 
-# %% ../../nbs/45_cross_entropy_method.ipynb 17
-from functools import partial
-
+# %% ../../nbs/45_cross_entropy_method.ipynb 16
+from .kalman import kalman, smoother
 from .typing import GLSSM
 
 
-def cross_entropy_method(
-    model: PGSSM,  # model
-    y: Observations,  # observations
-    N: int,  # number of samples to use in the CEM
-    key: PRNGKeyArray,  # random number seed
-    n_iter: int,  # number of iterations
-) -> MarkovProposal:  # the CEM proposal
-    """iteratively perform the CEM to find an optimal proposal"""
-    key, subkey_crn = jrn.split(key)
+def _joint_cov(Xi_smooth_t, Xi_smooth_tp1, Xi_filt_t, Xi_pred_tp1, A_t):
+    """Joint covariance of conditional Markov process"""
+    off_diag = (
+        Xi_filt_t @ A_t.T @ jnp.linalg.pinv(Xi_pred_tp1, hermitian=True) @ Xi_smooth_tp1
+    )  # jnp.linalg.solve(Xi_pred_tp1, Xi_smooth_tp1)
+    return jnp.block([[Xi_smooth_t, off_diag], [off_diag.T, Xi_smooth_tp1]])
 
-    proposal, info = laplace_approximation(y, model, n_iter)
-    glssm_la = GLSSM(
-        model.u,
-        model.A,
-        model.D,
-        model.Sigma0,
-        model.Sigma,
-        model.v,
-        model.B,
-        proposal.Omega,
+
+def posterior_markov_proposal(
+    y: Observations, model: GLSSM  # observations  # model
+) -> MarkovProposal:  # Markov proposal of posterior X|Y
+    """calculate the Markov proposal of the smoothing distribution using the Kalman smoother"""
+    filtered = kalman(y, model)
+    _, Xi_filter, _, Xi_pred = filtered
+    x_smooth, Xi_smooth = smoother(filtered, model.A)
+
+    covs = vmap(_joint_cov)(
+        Xi_smooth[:-1], Xi_smooth[1:], Xi_filter[:-1], Xi_pred[1:], model.A
     )
-    initial = posterior_markov_proposal(proposal.z, glssm_la)
 
-    def _iteration(i, vals):
-        proposal, _ = vals
+    return proposal_from_moments(x_smooth, covs)
+
+# %% ../../nbs/45_cross_entropy_method.ipynb 18
+from jax.lax import dynamic_slice_in_dim
+
+
+def _moment_sums(samples, weights, shift):
+    x = samples - shift
+    first = jnp.einsum("i,itj->tj", weights, x)
+    second = jnp.einsum("i,itj,itk->tjk", weights, x, x)
+    cross = jnp.einsum("i,itj,itk->tjk", weights, x[:, :-1], x[:, 1:])
+    return first, second, cross
+
+
+def consecutive_moments(
+    samples: Float[Array, "N n+1 m"],  # samples
+    weights: Float[Array, "N"],  # normalized weights
+    shift: Float[Array, "n+1 m"] | None = None,  # moments are taken around shift
+    chunk_size: int | None = None,  # number of samples per chunk, all if None
+) -> tuple[
+    Float[Array, "n+1 m"], Float[Array, "n 2*m 2*m"]
+]:  # means and covariances of consecutive states
+    """Weighted means and covariances of consecutive states in a single pass"""
+    N, np1, m = samples.shape
+    if shift is None:
+        shift = jnp.zeros((np1, m))
+
+    if chunk_size is None or chunk_size >= N:
+        first, second, cross = _moment_sums(samples, weights, shift)
+    else:
+        n_chunks, remainder = divmod(N, chunk_size)
+
+        def _add_chunk(i, sums):
+            start = i * chunk_size
+            chunk = dynamic_slice_in_dim(samples, start, chunk_size)
+            chunk_weights = dynamic_slice_in_dim(weights, start, chunk_size)
+            chunk_sums = _moment_sums(chunk, chunk_weights, shift)
+            return tuple(s + c for s, c in zip(sums, chunk_sums))
+
+        zeros = (
+            jnp.zeros((np1, m)),
+            jnp.zeros((np1, m, m)),
+            jnp.zeros((np1 - 1, m, m)),
+        )
+        first, second, cross = fori_loop(0, n_chunks, _add_chunk, zeros)
+        if remainder > 0:
+            rest = _moment_sums(samples[-remainder:], weights[-remainder:], shift)
+            first, second, cross = (s + r for s, r in zip((first, second, cross), rest))
+
+    covs = second - first[:, :, None] * first[:, None, :]
+    cross_covs = cross - first[:-1, :, None] * first[1:, None, :]
+    consecutive_covs = jnp.block(
+        [
+            [covs[:-1], cross_covs],
+            [cross_covs.transpose((0, 2, 1)), covs[1:]],
+        ]
+    ) / (1 - jnp.sum(weights**2))
+
+    return shift + first, consecutive_covs
+
+# %% ../../nbs/45_cross_entropy_method.ipynb 21
+from functools import partial
 
-        model_log_weights = partial(log_weight_cem, y=y, model=model, proposal=proposal)
+from jax.scipy.special import logsumexp
+from jax.tree_util import tree_map
 
-        samples = simulate_cem(proposal, N, subkey_crn)
+from .typing import GLSSM, ConvergenceInformation, IterationTrace
+from .pgssm import mask_missing
+from .importance_sampling import ess_lw
+from .util import compiled_kernel, step_timer
 
-        _N, np1, m = samples.shape
 
-        log_w = vmap(model_log_weights)(samples)
-        w = normalize_weights(log_w)
+@compiled_kernel(
+    static_argnames=(
+        "dist",
+        "N",
+        "n_iter",
+        "antithetics",
+        "normal_variates",
+        "trace",
+        "chunk_size",
+    )
+)
+def _cross_entropy_method(
+    model,
+    y,
+    key,
+    initial,
+    eps,
+    min_ess,
+    *,
+    dist,
+    N,
+    n_iter,
+    antithetics,
+    normal_variates,
+    trace,
+    chunk_size
+):
+    model = mask_missing(y, model._replace(dist=dist))
+    key, subkey_crn = jrn.split(key)
 
-        mean = jnp.sum(w[:, None, None] * samples, axis=0)
-        x_consecutive = jnp.concatenate((samples[:, :-1], samples[:, 1:]), axis=-1)
+    if initial is None:
+        proposal, info = laplace_approximation(y, model, n_iter)
+        glssm_la = GLSSM(
+            model.u,
+            model.A,
+            model.D,
+            model.Sigma0,
+            model.Sigma,
+            model.v,
+            model.B,
+            proposal.Omega,
+        )
+        initial = posterior_markov_proposal(proposal.z, glssm_la)
+    # the loop carry has the structure of the output of `proposal_from_moments`
+    initial = _with_operators(initial)
+
+    def _finite(proposal):
+        return jnp.logical_and(
+            jnp.isfinite(proposal.mean).all(), jnp.isfinite(proposal.R).all()
+        )
+
+    def _parameters_converged(proposal, old_proposal):
+        # `converged` treats nans as converged, a diverged proposal is not
+        return jnp.logical_and(
+            jnp.logical_and(
+                converged(proposal.mean, old_proposal.mean, eps),
+                converged(proposal.R, old_proposal.R, eps),
+            ),
+            _finite(proposal),
+        )
+
+    def _keep_going(val):
+        i, proposal, old_proposal, log_w, _ = val
+        ess_reached = ess_pct(log_w) >= min_ess
+        done = jnp.logical_or(
+            _parameters_converged(proposal, old_proposal), ess_reached
+        )
+        stop = jnp.logical_or(jnp.logical_and(done, i > 0), i >= n_iter)
+        # further iterations cannot recover from a diverged proposal
+        stop = jnp.logical_or(stop, jnp.logical_not(_finite(proposal)))
+        return jnp.logical_not(stop)
+
+    def _iteration(val):
+        i, proposal, _, _, iteration_trace = val
+
+        samples = simulate_cem(proposal, N, subkey_crn, antithetics, normal_variates)
 
-        cov_IS = partial(jnp.cov, aweights=w, rowvar=False)
+        _N, np1, m = samples.shape
 
-        # ensure matrices (in 1D case jnp.cov reduces to (np1, m))
-        cov_shape = (np1 - 1, 2 * m, 2 * m)
-        consecutive_covs = vmap(cov_IS, 1)(x_consecutive).reshape(cov_shape)
+        log_w = log_weight_cem(samples, y, model, proposal)
+        w = normalize_weights(log_w)
+
+        mean, consecutive_covs = consecutive_moments(
+            samples, w, proposal.mean, chunk_size
+        )
 
         new_proposal = proposal_from_moments(mean, consecutive_covs)
 
-        return new_proposal, log_w
+        if trace:
+            iteration_trace = iteration_trace.record(
+                i,
+                delta=jnp.max(jnp.abs(new_proposal.mean - proposal.mean)),
+                ess=ess_lw(log_w),
+                # log weights are with respect to the joint density p(x, y)
+                log_lik=logsumexp(log_w) - jnp.log(_N),
+                step_time=step_timer(new_proposal.mean, new_proposal.R),
+            )
+
+        return i + 1, new_proposal, proposal, log_w, iteration_trace
+
+    iteration_trace = IterationTrace.empty(n_iter) if trace else None
+    if trace:
+        step_timer(initial.mean)
+    init = (
+        0,
+        initial,
+        initial,
+        jnp.full(n_antithetic_samples(N, antithetics), -jnp.inf),
+        iteration_trace,
+    )
+    n_iters, final_proposal, old_proposal, log_w, iteration_trace = while_loop(
+        _keep_going, _iteration, init
+    )
 
-    final_proposal, log_w = fori_loop(
-        0, n_iter, _iteration, (initial, jnp.empty(4 * N))
+    delta_mean = jnp.max(jnp.abs(final_proposal.mean - old_proposal.mean))
+    delta_R = jnp.max(jnp.abs(final_proposal.R - old_proposal.R))
+    information = ConvergenceInformation(
+        converged=jnp.logical_or(
+            _parameters_converged(final_proposal, old_proposal),
+            ess_pct(log_w) >= min_ess,
+        ),
+        n_iter=n_iters,
+        delta=jnp.maximum(delta_mean, delta_R),
+        trace=iteration_trace,
+    )
+    # fall back to the last finite proposal, the log weights belong to its samples
+    diverged = jnp.logical_not(_finite(final_proposal))
+    final_proposal = tree_map(
+        lambda new, old: jnp.where(diverged, old, new), final_proposal, old_proposal
     )
+    return final_proposal, log_w, information
 
-    return final_proposal, log_w
+
+def cross_entropy_method(
+    model: PGSSM,  # model
+    y: Observations,  # observations
+    N: int,  # number of samples to use in the CEM
+    key: PRNGKeyArray,  # random number seed
+    n_iter: int,  # maximal number of iterations
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
+    trace: bool = False,  # record per iteration diagnostics, see `IterationTrace`
+    chunk_size: int | None = None,  # see `consecutive_moments`
+    eps: Float = 1e-5,  # tolerance for the relative change of mean and $R$
+    min_ess: Float | None = None,  # stop once the ESS (in percent) reaches `min_ess`
+    N_max: int | None = None,  # double N up to N_max until the CEM converges
+    initial: MarkovProposal | None = None,  # initial proposal, defaults to the LA
+) -> tuple[
+    MarkovProposal, Float[Array, "N"], ConvergenceInformation
+]:  # the CEM proposal, last log weights and convergence information
+    """iteratively perform the CEM to find an optimal proposal"""
+    min_ess = jnp.inf if min_ess is None else min_ess
+    n_iters = 0
+    previous_traces = []
+    while True:
+        # the distribution is not an array, pass it as static argument
+        proposal, log_w, information = _cross_entropy_method(
+            model._replace(dist=None),
+            y,
+            key,
+            initial,
+            eps,
+            min_ess,
+            dist=model.dist,
+            N=N,
+            n_iter=n_iter,
+            antithetics=antithetics,
+            normal_variates=normal_variates,
+            trace=trace,
+            chunk_size=chunk_size,
+        )
+        n_iters += information.n_iter
+        if N_max is None or information.converged or 2 * N > N_max:
+            if previous_traces:
+                # iterations of all rounds, followed by the unused entries of the last
+                information = information._replace(
+                    trace=tree_map(
+                        lambda *rounds: jnp.concatenate(rounds),
+                        *previous_traces,
+                        information.trace,
+                    )
+                )
+            return proposal, log_w, information._replace(n_iter=n_iters)
+        if trace:
+            # rounds have n_iter entries, `nan` after their last iteration
+            previous_traces.append(information.trace)
+        # continue from the current proposal with more, fresh, samples
+        N, initial = 2 * N, proposal
+        key, _ = jrn.split(key)
@@ -0,0 +1,150 @@
+"""Persistent compilation cache and ahead-of-time warm up of kernels"""
+
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/80_compilation.ipynb.
+
+# %% auto 0
+__all__ = ['default_cache_dir', 'enable_compilation_cache', 'WarmupShape', 'warmup']
+
+# %% ../../nbs/80_compilation.ipynb 3
+import os
+from typing import NamedTuple
+
+import jax
+import jax.numpy as jnp
+import jax.random as jrn
+from jax.experimental.compilation_cache import compilation_cache
+from jaxtyping import Float
+
+from .estimation import _pgnll_kernel
+from .kalman import _simulation_smoother, kalman
+from .laplace_approximation import _laplace_approximation, default_link
+from isssm.modified_efficient_importance_sampling import (
+    _modified_efficient_importance_sampling,
+)
+from .typing import GLSSM, PGSSM
+from .util import KernelCacheInfo, iid_normal, kernel_cache
+
+# %% ../../nbs/80_compilation.ipynb 6
+def default_cache_dir() -> str:
+    """`$ISSSM_COMPILATION_CACHE_DIR`, or `~/.cache/isssm/jax` if unset"""
+    return os.environ.get(
+        "ISSSM_COMPILATION_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "isssm", "jax"),
+    )
+
+
+def enable_compilation_cache(
+    cache_dir: str
+    | None = None,  # directory of the cache, defaults to `default_cache_dir()`
+    min_compile_time_secs: Float = 0.0,  # only persist compilations taking at least this long
+) -> str:  # the cache directory
+    """Persist compiled executables on disk and reuse them across processes"""
+    if cache_dir is None:
+        cache_dir = default_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    jax.config.update("jax_compilation_cache_dir", cache_dir)
+    jax.config.update(
+        "jax_persistent_cache_min_compile_time_secs", min_compile_time_secs
+    )
+    # jax sets up the cache on the first compilation, which may have happened already
+    compilation_cache.reset_cache()
+    return cache_dir
+
+# %% ../../nbs/80_compilation.ipynb 11
+class WarmupShape(NamedTuple):
+    n: int  # number of time points minus one
+    m: int  # dimension of states
+    p: int  # dimension of observations
+    N: int  # number of samples
+    l: int | None = None  # dimension of state innovations, defaults to `m`
+
+
+def _placeholder_model(shape: WarmupShape, dtype) -> GLSSM:
+    n, m, p, _, l = shape
+    l = m if l is None else l
+    return GLSSM(
+        jnp.zeros((n + 1, m), dtype),
+        jnp.zeros((n, m, m), dtype),
+        jnp.zeros((n, m, l), dtype),
+        jnp.zeros((m, m), dtype),
+        jnp.zeros((n, l, l), dtype),
+        jnp.zeros((n + 1, p), dtype),
+        jnp.zeros((n + 1, p, m), dtype),
+        jnp.zeros((n + 1, p, p), dtype),
+    )
+
+
+def warmup(
+    *shapes: WarmupShape | tuple,  # shapes (n, m, p, N[, l]) to compile for
+    dist,  # observation distribution, see `PGSSM`
+    n_iter: int,  # number of LA iterations
+    n_iter_meis: int | None = None,  # number of MEIS iterations, defaults to `n_iter`
+    eps: Float = 1e-5,  # convergence threshold of LA and MEIS
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
+    dtype=None,  # dtype of observations and models, defaults to jax's default float
+) -> KernelCacheInfo:  # statistics of the kernel cache after warm up
+    """Compile the kernels of the main algorithms ahead of time"""
+    n_iter_meis = n_iter if n_iter_meis is None else n_iter_meis
+    dtype = jnp.zeros(()).dtype if dtype is None else dtype
+    key = jrn.PRNGKey(0)
+    for shape in shapes:
+        shape = WarmupShape(*shape)
+        glssm = _placeholder_model(shape, dtype)
+        y = jnp.zeros((shape.n + 1, shape.p), dtype)
+        pgssm = PGSSM(*glssm[:7], dist=None, xi=jnp.zeros_like(y))
+        z, Omega = glssm.v, glssm.Omega
+
+        # mirror the calls in the public functions, so that they hit the cache
+        kalman.precompile(y, glssm)
+        _simulation_smoother.precompile(
+            glssm,
+            y,
+            key,
+            N=shape.N,
+            antithetics=antithetics,
+            normal_variates=normal_variates,
+            structure=None,
+        )
+        _laplace_approximation.precompile(
+            y,
+            pgssm,
+            eps,
+            None,
+            dist=dist,
+            n_iter=n_iter,
+            log_lik=None,
+            d_log_lik=None,
+            dd_log_lik=None,
+            link=default_link,
+            trace=False,
+            structure=None,
+        )
+        _modified_efficient_importance_sampling.precompile(
+            y,
+            pgssm,
+            z,
+            Omega,
+            key,
+            eps,
+            dist=dist,
+            n_iter=n_iter_meis,
+            N=shape.N,
+            antithetics=antithetics,
+            normal_variates=normal_variates,
+            trace=False,
+            structure=None,
+        )
+        _pgnll_kernel.precompile(
+            y,
+            pgssm,
+            z,
+            Omega,
+            key,
+            dist=dist,
+            N=shape.N,
+            antithetics=antithetics,
+            normal_variates=normal_variates,
+            control_variates=False,
+        )
+    return kernel_cache.info()
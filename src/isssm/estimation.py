@@ -12,7 +12,6 @@ from jax import vmap
 from jaxtyping import Float, Array, PRNGKeyArray
 from .kalman import kalman
 from jax import jit
-from scipy.optimize import minimize as minimize_scipy
 from .laplace_approximation import laplace_approximation
 from isssm.modified_efficient_importance_sampling import (
     modified_efficient_importance_sampling,
@@ -20,6 +19,13 @@ from isssm.modified_efficient_importance_sampling import (
 from .importance_sampling import normalize_weights
 from .typing import GLSSM, PGSSM
 
+
+def _minimize_scipy(*args, **kwargs):
+    # scipy is slow to import, only load it once we optimize
+    from scipy.optimize import minimize
+
+    return minimize(*args, **kwargs)
+
 # %% ../../nbs/60_maximum_likelihood_estimation.ipynb 6
 from .util import MVN_degenerate as MVN
 
@@ -47,11 +53,14 @@ def gnll_full(y: Float[Array, "n+1 p"], model: GLSSM):  # observations $y_t$
     return gnll(y, filtered.x_pred, filtered.Xi_pred, model.B, model.Omega)
 
 # %% ../../nbs/60_maximum_likelihood_estimation.ipynb 9
-from scipy.optimize import minimize as minimize_scipy
+from typing import TYPE_CHECKING
+
 from jax.scipy.optimize import minimize as minimize_jax
-from scipy.optimize import OptimizeResult
 from jax.scipy.optimize import OptimizeResults
 
+if TYPE_CHECKING:
+    from scipy.optimize import OptimizeResult
+
 
 def mle_glssm(
     y: Float[Array, "n+1 p"],  # observations $y_t$
@@ -59,7 +68,7 @@ def mle_glssm(
     theta0: Float[Array, "k"],  # initial parameter guess
     aux,  # auxiliary data for the model
     options=None,  # options for the optimizer
-) -> OptimizeResult:  # result of MLE optimization
+) -> "OptimizeResult":  # result of MLE optimization
     """Maximum likelihood estimation for GLSSM"""
 
     @jit
@@ -69,7 +78,7 @@ def mle_glssm(
         n_obs = y.size
         return gnll_full(y, model) / n_obs
 
-    return minimize_scipy(f, theta0, method="BFGS", options=options)
+    return _minimize_scipy(f, theta0, method="BFGS", options=options)
 
 
 def mle_glssm_ad(
@@ -91,9 +100,17 @@ def mle_glssm_ad(
 
 # %% ../../nbs/60_maximum_likelihood_estimation.ipynb 16
 from jax.scipy.special import logsumexp
-from .importance_sampling import pgssm_importance_sampling
+from isssm.importance_sampling import (
+    ControlledEstimate,
+    _controlled_mean,
+    pgssm_importance_sampling,
+    proposal_signal_moments,
+    signal_control_variates,
+)
 from .kalman import kalman
 from .typing import GLSSM, PGSSM
+from .pgssm import mask_missing
+from .util import compiled_kernel, iid_normal
 
 
 def _pgnll(
@@ -110,6 +127,61 @@ def _pgnll(
     )  # - (jnp.var(weights) / (2 * N * jnp.mean(weights) ** 2))
 
 
+def _pgnll_cv(
+    gnll: Float,  # surrogate gaussian negative log-likelihood
+    unnormalized_log_weights: Float[
+        Array, "N"
+    ],  # unnormalized log-weights $\log w(X^i)$
+    controls: Float[Array, "N k"],  # control variates with mean zero under the proposal
+) -> ControlledEstimate:  # the approximate negative log-likelihood and variance ratio
+    """Internal Log-Concave Negative Log-Likelihood with control variates"""
+    # scale the weights to avoid overflow
+    max_log_weight = unnormalized_log_weights.max()
+    weights = jnp.exp(unnormalized_log_weights - max_log_weight)
+    (mean_weight,), (variance_ratio,) = _controlled_mean(weights[:, None], controls)
+    # guard against a negative controlled mean, unlikely as the number of controls
+    # used is limited relative to N, see `cv_mc_integration`
+    mean_weight = jnp.where(mean_weight > 0.0, mean_weight, weights.mean())
+    return ControlledEstimate(
+        gnll - jnp.log(mean_weight) - max_log_weight, variance_ratio
+    )
+
+
+@compiled_kernel(
+    static_argnames=("dist", "N", "antithetics", "normal_variates", "control_variates")
+)
+def _pgnll_kernel(
+    y, model, z, Omega, key, *, dist, N, antithetics, normal_variates, control_variates
+):
+    model = mask_missing(y, model._replace(dist=dist))
+
+    key, subkey = jrn.split(key)
+
+    signal_samples, log_weights = pgssm_importance_sampling(
+        y, model, z, Omega, N, subkey, antithetics, normal_variates
+    )
+
+    gnll_g = gnll_full(
+        z,
+        GLSSM(
+            model.u,
+            model.A,
+            model.D,
+            model.Sigma0,
+            model.Sigma,
+            model.v,
+            model.B,
+            Omega,
+        ),
+    )
+    if not control_variates:
+        return _pgnll(gnll_g, log_weights)
+
+    signal_mean, signal_var = proposal_signal_moments(y, model, z, Omega)
+    controls = signal_control_variates(signal_samples, signal_mean, signal_var)
+    return _pgnll_cv(gnll_g, log_weights, controls)
+
+
 def pgnll(
     y: Float[Array, "n+1 p"],  # observations
     model: PGSSM,  # the model
@@ -117,28 +189,23 @@ def pgnll(
     Omega: Float[Array, "n+1 p p"],  # covariance of synthetic observations
     N: int,  # number of samples
     key: PRNGKeyArray,  # random key
-) -> Float:  # the approximate negative log-likelihood
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
+    control_variates: bool = False,  # use signal control variates, see `cv_mc_integration`
+) -> Float | ControlledEstimate:  # the approximate negative log-likelihood, with its variance ratio if `control_variates`
     """Log-Concave Negative Log-Likelihood"""
-
-    key, subkey = jrn.split(key)
-
-    _, log_weights = pgssm_importance_sampling(y, model, z, Omega, N, subkey)
-
-    return _pgnll(
-        gnll_full(
-            z,
-            GLSSM(
-                model.u,
-                model.A,
-                model.D,
-                model.Sigma0,
-                model.Sigma,
-                model.v,
-                model.B,
-                Omega,
-            ),
-        ),
-        log_weights,
+    # the distribution is not an array, pass it as static argument
+    return _pgnll_kernel(
+        y,
+        model._replace(dist=None),
+        z,
+        Omega,
+        key,
+        dist=model.dist,
+        N=N,
+        antithetics=antithetics,
+        normal_variates=normal_variates,
+        control_variates=control_variates,
     )
 
 # %% ../../nbs/60_maximum_likelihood_estimation.ipynb 19
@@ -178,7 +245,7 @@ def initial_theta(
     if jit_target:
         f = jit(f)
 
-    result = minimize_scipy(f, theta0, method="BFGS", jac="3-point", options=options)
+    result = _minimize_scipy(f, theta0, method="BFGS", jac="3-point", options=options)
     return result
 
 # %% ../../nbs/60_maximum_likelihood_estimation.ipynb 24
@@ -191,6 +258,8 @@ def mle_pgssm(
     N: int,  # number of importance samples
     key: Array,  # random key
     options=None,  # options for the optimizer
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
 ) -> Float[Array, "k"]:  # MLE
     """Maximum Likelihood Estimation for PGSSMs"""
 
@@ -202,16 +271,34 @@ def mle_pgssm(
 
         key, subkey = jrn.split(key)
         proposal_meis, _ = modified_efficient_importance_sampling(
-            y, model, proposal_la.z, proposal_la.Omega, n_iter_la, N, subkey
+            y,
+            model,
+            proposal_la.z,
+            proposal_la.Omega,
+            n_iter_la,
+            N,
+            subkey,
+            antithetics=antithetics,
+            normal_variates=normal_variates,
         )
 
         key, subkey = jrn.split(key)
         # improve numerical stability by dividing by number of observations
         n_obs = y.size
-        return pgnll(y, model, proposal_meis.z, proposal_meis.Omega, N, subkey) / n_obs
+        nll = pgnll(
+            y,
+            model,
+            proposal_meis.z,
+            proposal_meis.Omega,
+            N,
+            subkey,
+            antithetics,
+            normal_variates,
+        )
+        return nll / n_obs
 
     key, subkey = jrn.split(key)
-    result = minimize_scipy(
+    result = _minimize_scipy(
         f, theta0, method="BFGS", jac="3-point", options=options, args=(subkey,)
     )
     return result
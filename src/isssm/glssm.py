@@ -17,33 +17,37 @@ from .typing import GLSSM, GLSSMObservationModel, GLSSMState, Observations, Stat
 from .util import MVN_degenerate as MVN, mm_sim
 
 # %% ../../nbs/00_glssm.ipynb 6
+from .util import cached_factor, iid_normal
+
+
 def simulate_states(
     state: GLSSMState,
     N: int,  # number of samples to draw
     key: PRNGKeyArray,  # the random state
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
 ) -> Float[Array, "N n+1 m"]:  # array of N samples from the state distribution
     """Simulate states of a GLSSM"""
     u, A, D, Sigma0, Sigma = state
 
-    _, _, l = D.shape
+    n, m, l = D.shape
 
     def sim_next_states(carry, inputs):
-        x_prev, key = carry
-        u, A, D, Sigma = inputs
-
-        key, subkey = jrn.split(key)
-        eps = MVN(jnp.zeros(l), Sigma).sample(N, seed=subkey)
+        (x_prev,) = carry
+        u, A, D, chol_Sigma, z = inputs
 
+        eps = mm_sim(chol_Sigma, z)
         samples = u + mm_sim(A, x_prev) + mm_sim(D, eps)
 
-        return (samples, key), samples
+        return (samples,), samples
 
     key, subkey = jrn.split(key)
-    x0 = MVN(u[0], Sigma0).sample(N, subkey)
-    key, subkey = jrn.split(key)
-    init = (x0, subkey)
+    z = normal_variates(subkey, N, m + n * l)
+    z_eps = z[:, m:].reshape((N, n, l)).transpose((1, 0, 2))
+
+    x0 = u[0] + mm_sim(cached_factor(state, "Sigma0"), z[:, :m])
+    chol_Sigma = cached_factor(state, "Sigma")
 
-    _, X = scan(sim_next_states, init, (u[1:], A, D, Sigma))
+    _, X = scan(sim_next_states, (x0,), (u[1:], A, D, chol_Sigma, z_eps))
 
     X = jnp.concatenate([x0[None], X], axis=0)
 
@@ -51,6 +55,7 @@ def simulate_states(
 
 # %% ../../nbs/00_glssm.ipynb 7
 from .typing import to_states, to_observation_model
+from .util import MVN_cholesky, cached_factor
 
 
 def simulate_glssm(
@@ -75,12 +80,12 @@ def simulate_glssm(
     S = S.transpose((1, 0, 2))
 
     key, subkey = jrn.split(key)
-    Y = MVN(S, Omega).sample(seed=subkey)
+    Y = MVN_cholesky(S, cached_factor(glssm, "Omega")).sample(seed=subkey)
 
     return X, Y
 
 # %% ../../nbs/00_glssm.ipynb 15
-from .util import mm_time, append_to_front
+from .util import MVN_cholesky, append_to_front, cached_factor, mm_time
 
 
 def log_probs_x(
@@ -89,14 +94,14 @@ def log_probs_x(
     """log probabilities $\\log p(x_t | x_{t-1})$"""
     u, A, D, Sigma0, Sigma = state
     _, _, l = D.shape
-    log_p0 = MVN(u[0], Sigma0).log_prob(x[0])
+    log_p0 = MVN_cholesky(u[0], cached_factor(state, "Sigma0")).log_prob(x[0])
     x_prev = x[:-1]
 
     DT = D.transpose((0, 2, 1))
 
     eps = mm_time(DT, x[1:] - u[1:] - (A @ x_prev[:, :, None])[:, :, 0])
 
-    log_p = MVN(jnp.zeros(l), Sigma).log_prob(eps)
+    log_p = MVN_cholesky(jnp.zeros(l), cached_factor(state, "Sigma")).log_prob(eps)
     return append_to_front(log_p0, log_p)
 
 
@@ -108,7 +113,7 @@ def log_probs_y(
     """log probabilities $\\log p(y_t | x_t)$"""
     v, B, Omega = obs_model
     y_pred = v + (B @ x[:, :, None])[:, :, 0]
-    return MVN(y_pred, Omega).log_prob(y)
+    return MVN_cholesky(y_pred, cached_factor(obs_model, "Omega")).log_prob(y)
 
 
 def log_prob(x: States, y: Observations, glssm: GLSSM) -> Float:  # $\log p(x,y)$
@@ -3,9 +3,156 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/40_importance_sampling.ipynb.
 
 # %% auto 0
-__all__ = ['normalize_weights', 'ess', 'ess_lw', 'ess_pct', 'mc_integration', 'prediction']
+__all__ = ['prediction_percentiles', 'log_weights_t', 'log_weights', 'diagonal_gaussian_log_prob', 'log_weights_diagonal',
+           'is_diagonal', 'pgssm_importance_sampling', 'normalize_weights', 'ess', 'ess_lw', 'ess_pct',
+           'mc_integration', 'proposal_signal_moments', 'signal_control_variates', 'ControlledEstimate',
+           'cv_mc_integration', 'future_prediction_interval', 'weighted_quantiles', 'predict', 'QuantileSketch',
+           'quantile_sketch', 'update_sketch', 'sketch_quantiles', 'PredictionResult', 'ControlledPredictionResult',
+           'prediction', 'discrete_prediction_quantiles']
 
-# %% ../../nbs/40_importance_sampling.ipynb 13
+# %% ../../nbs/40_importance_sampling.ipynb 4
+from functools import partial
+
+import jax.numpy as jnp
+from jax import vmap
+from jaxtyping import Array, Bool, Float
+from jax.scipy.stats import multivariate_normal
+
+from .pgssm import observation_log_prob
+from .typing import PGSSM
+
+
+def log_weights_t(
+    s_t: Float[Array, "p"],  # signal
+    y_t: Float[Array, "p"],  # observation
+    xi_t: Float[Array, "p"],  # parameters
+    dist,  # observation distribution
+    z_t: Float[Array, "p"],  # synthetic observation
+    Omega_t: Float[Array, "p p"],  # synthetic observation covariance, assumed diagonal
+) -> Float:  # single log weight
+    """Log weight for a single time point."""
+    p_ys = observation_log_prob(y_t, s_t, dist, xi_t).sum()
+
+    # omega_t = jnp.sqrt(jnp.diag(Omega_t))
+    # g_zs = MVN_diag(s_t, omega_t).log_prob(z_t).sum()
+    g_zs = multivariate_normal.logpdf(z_t, s_t, Omega_t).sum()
+
+    return p_ys - g_zs
+
+
+def log_weights(
+    s: Float[Array, "n+1 p"],  # signals
+    y: Float[Array, "n+1 p"],  # observations
+    dist,  # observation distribution
+    xi: Float[Array, "n+1 p"],  # observation parameters
+    z: Float[Array, "n+1 p"],  # synthetic observations
+    Omega: Float[Array, "n+1 p p"],  # synthetic observation covariances:
+) -> Float:  # log weights
+    """Log weights for all time points"""
+    p_ys = observation_log_prob(y, s, dist, xi).sum()
+
+    # avoid triangular solve problems
+    # omega = jnp.sqrt(vmap(jnp.diag)(Omega))
+    # g_zs = MVN_diag(s, omega).log_prob(z).sum()
+    g_zs = multivariate_normal.logpdf(z, s, Omega).sum()
+
+    return p_ys - g_zs
+
+# %% ../../nbs/40_importance_sampling.ipynb 6
+def diagonal_gaussian_log_prob(
+    z: Float[Array, "n+1 p"],  # synthetic observations
+    s: Float[Array, "N n+1 p"],  # signals
+    Omega: Float[Array, "n+1 p p"],  # synthetic observation covariances, diagonal
+) -> Float[Array, "N n+1"]:  # log densities $\log g(z_t|s_t)$
+    """Gaussian log densities of synthetic observations for diagonal covariances"""
+    omega2 = jnp.diagonal(Omega, axis1=-2, axis2=-1)
+    log_norm = -0.5 * jnp.log(2 * jnp.pi * omega2).sum(axis=-1)
+    inv_omega2 = 1 / omega2
+    return log_norm - 0.5 * ((z - s) ** 2 * inv_omega2).sum(axis=-1)
+
+
+def log_weights_diagonal(
+    s: Float[Array, "N n+1 p"],  # signals
+    y: Float[Array, "n+1 p"],  # observations
+    dist,  # observation distribution
+    xi: Float[Array, "n+1 p"],  # observation parameters
+    z: Float[Array, "n+1 p"],  # synthetic observations
+    Omega: Float[Array, "n+1 p p"],  # synthetic observation covariances, diagonal
+) -> Float[Array, "N n+1"]:  # log weights per sample and time point
+    r"""Log weights for all samples and time points, assuming diagonal $\Omega_t$"""
+    p_ys = observation_log_prob(y, s, dist, xi).sum(axis=-1)
+    g_zs = diagonal_gaussian_log_prob(z, s, Omega)
+
+    return p_ys - g_zs
+
+
+def is_diagonal(
+    Omega: Float[Array, "... p p"],  # (batch of) matrices
+) -> Bool:  # whether all matrices are diagonal
+    """Check whether all matrices are diagonal"""
+    *_, p = Omega.shape
+    return jnp.all(jnp.where(jnp.eye(p, dtype=bool), 0.0, Omega) == 0.0)
+
+# %% ../../nbs/40_importance_sampling.ipynb 9
+from functools import partial
+
+import jax.random as jrn
+from jax import lax
+from jaxtyping import Array, Float, PRNGKeyArray
+
+from .kalman import FFBS, simulation_smoother
+from .pgssm import mask_missing, observation_log_prob
+from .typing import GLSSM, PGSSM, prepared_like
+from .util import MVN_cholesky, cached_factor, iid_normal
+
+
+def pgssm_importance_sampling(
+    y: Float[Array, "n+1 p"],  # observations
+    model: PGSSM,  # model
+    z: Float[Array, "n+1 p"],  # synthetic observations
+    Omega: Float[Array, "n+1 p p"],  # covariance of synthetic observations
+    N: int,  # number of samples
+    key: PRNGKeyArray,  # random key
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
+) -> tuple[
+    Float[Array, "N n+1 m"], Float[Array, "N"]
+]:  # importance samples and weights
+    model = mask_missing(y, model)
+    u, A, D, Sigma0, Sigma, v, B, dist, xi = model
+
+    glssm = prepared_like(model, GLSSM(u, A, D, Sigma0, Sigma, v, B, Omega))
+
+    key, subkey = jrn.split(key)
+    s = simulation_smoother(glssm, z, N, subkey, antithetics, normal_variates)
+
+    return s, _signal_log_weights(s, y, dist, xi, z, glssm)
+
+
+def _signal_log_weights(s, y, dist, xi, z, glssm):
+    def _log_weights_full(s):
+        # factorize Omega once for all samples
+        p_ys = observation_log_prob(y, s, dist, xi).sum(axis=(-2, -1))
+        g_zs = MVN_cholesky(s, cached_factor(glssm, "Omega")).log_prob(z).sum(axis=-1)
+        return p_ys - g_zs
+
+    return lax.cond(
+        is_diagonal(glssm.Omega),
+        lambda s: log_weights_diagonal(s, y, dist, xi, z, glssm.Omega).sum(axis=-1),
+        _log_weights_full,
+        s,
+    )
+
+def _synthetic_log_prob(z, s, glssm):
+    r"""log densities $\log g(z_t|s_t)$, for diagonal $\Omega_t$ without factorizing"""
+    return lax.cond(
+        is_diagonal(glssm.Omega),
+        lambda s: diagonal_gaussian_log_prob(z, s, glssm.Omega),
+        lambda s: MVN_cholesky(s, cached_factor(glssm, "Omega")).log_prob(z),
+        s,
+    )
+
+# %% ../../nbs/40_importance_sampling.ipynb 17
 from jaxtyping import Array, Float
 
 
@@ -21,7 +168,7 @@ def normalize_weights(
 
     return weights / weights.sum()
 
-# %% ../../nbs/40_importance_sampling.ipynb 16
+# %% ../../nbs/40_importance_sampling.ipynb 20
 from jaxtyping import Array, Float
 
 
@@ -45,7 +192,7 @@ def ess_pct(
     (N,) = log_weights.shape
     return ess_lw(log_weights) / N * 100
 
-# %% ../../nbs/40_importance_sampling.ipynb 19
+# %% ../../nbs/40_importance_sampling.ipynb 23
 from jax import jit
 
 
@@ -53,8 +200,284 @@ from jax import jit
 def mc_integration(samples: Float[Array, "N ..."], log_weights: Float[Array, "N"]):
     return jnp.einsum("i...,i->...", samples, normalize_weights(log_weights))
 
-# %% ../../nbs/40_importance_sampling.ipynb 24
-from .kalman import to_signal_model
+# %% ../../nbs/40_importance_sampling.ipynb 28
+from typing import NamedTuple
+
+from .kalman import kalman, smoother
+
+
+def proposal_signal_moments(
+    y: Float[Array, "n+1 p"],  # observations
+    model: PGSSM,  # model
+    z: Float[Array, "n+1 p"],  # synthetic observations
+    Omega: Float[Array, "n+1 p p"],  # covariance of synthetic observations
+) -> tuple[
+    Float[Array, "n+1 p"], Float[Array, "n+1 p"]
+]:  # mean and marginal variances of the signal
+    """moments of the signal under the gaussian proposal $g(s|z)$"""
+    model = mask_missing(y, model)
+    u, A, D, Sigma0, Sigma, v, B, dist, xi = model
+    glssm = GLSSM(u, A, D, Sigma0, Sigma, v, B, Omega)
+
+    x_smooth, Xi_smooth = smoother(kalman(z, glssm), A)
+    mean = v + jnp.einsum("tpm,tm->tp", B, x_smooth)
+    var = jnp.einsum("tpm,tmk,tpk->tp", B, Xi_smooth, B)
+    return mean, var
+
+
+def signal_control_variates(
+    signal_samples: Float[Array, "N n+1 p"],  # samples from the proposal
+    mean: Float[Array, "n+1 p"],  # mean of the signal under the proposal
+    var: Float[Array, "n+1 p"],  # marginal variances of the signal under the proposal
+) -> Float[Array, "N 2(n+1)p"]:  # control variates with mean zero under the proposal
+    """linear and quadratic control variates of the signal"""
+    N = signal_samples.shape[0]
+    deviation = signal_samples - mean
+    return jnp.concatenate(
+        [deviation.reshape(N, -1), (deviation**2 - var).reshape(N, -1)], axis=1
+    )
+
+
+class ControlledEstimate(NamedTuple):
+    """estimate with control variates"""
+
+    estimate: Float[Array, "..."]  # the estimate
+    variance_ratio: Float[Array, "..."]  # held-out ratio of variances with and without controls
+
+
+# regress on at most one control per this many samples of a fold
+_samples_per_control = 10
+
+
+def _regression_coefficients(values, controls, n_controls):
+    """least squares coefficients, restricted to the leading principal components"""
+    H = controls - controls.mean(axis=0)
+    _, _, V_T = jnp.linalg.svd(H, full_matrices=False)
+    V = V_T[:n_controls].T
+    gamma, *_ = jnp.linalg.lstsq(H @ V, values - values.mean(axis=0))
+    return V @ gamma
+
+
+def _controlled_mean(values, controls):
+    # regression estimator, the controls have known mean zero
+    # cross-fitting: the coefficients of every fold are estimated on the other one
+    # alternating folds keep antithetic copies together if the number of draws is even
+    N, k = controls.shape
+    n_controls = max(1, min(k, (N // 2) // _samples_per_control))
+    folds = (slice(0, None, 2), slice(1, None, 2))
+    residuals = jnp.concatenate(
+        [
+            values[test] - controls[test] @ _regression_coefficients(
+                values[fit], controls[fit], n_controls
+            )
+            for fit, test in (folds, folds[::-1])
+        ]
+    )
+    variance_ratio = residuals.var(axis=0) / values.var(axis=0)
+    return residuals.mean(axis=0), variance_ratio
+
+
+@jit
+def cv_mc_integration(
+    samples: Float[Array, "N ..."],  # samples of the integrand
+    log_weights: Float[Array, "N"],  # log weights
+    controls: Float[Array, "N k"],  # control variates with mean zero under the proposal
+) -> ControlledEstimate:  # estimate and ratio of variances with and without control variates
+    """self-normalized importance sampling estimate with control variates"""
+    N, *shape = samples.shape
+    phi = samples.reshape(N, -1)
+    w = N * normalize_weights(log_weights)
+    estimate = w @ phi / N
+    # linearization of the self-normalized estimator
+    correction, variance_ratio = _controlled_mean(
+        w[:, None] * (phi - estimate), controls
+    )
+    return ControlledEstimate(
+        (estimate + correction).reshape(shape), variance_ratio.reshape(shape)
+    )
+
+# %% ../../nbs/40_importance_sampling.ipynb 32
+from functools import partial
+
+from jax import jit
+
+from .glssm import simulate_states
+from .kalman import kalman
+from .typing import GLSSMProposal, GLSSMState
+from .util import mm_time_sim
+
+
+def future_prediction_interval(dist, signal_samples, xi, log_weights, p):
+    def integer_ecdf(y):
+        return (
+            dist(signal_samples, xi).cdf(y).squeeze(axis=-1)
+            * normalize_weights(log_weights)
+        ).sum()
+
+    def ecdf(y):
+        y_floor = jnp.floor(y)
+        y_ceil = jnp.ceil(y)
+        y_gauss = y - y_floor
+
+        return integer_ecdf(y_floor) * (1 - y_gauss) + integer_ecdf(y_ceil) * y_gauss
+
+    def pinball_loss(y, p):
+        return (jnp.abs(ecdf(y) - p).sum()) ** 2
+
+    # scipy is slow to import, only load it when needed
+    from scipy.optimize import minimize
+
+    mean = mc_integration(dist(signal_samples, xi).mean(), log_weights)
+    result = minimize(pinball_loss, mean, args=(p,), method="Nelder-Mead")
+    return result.x
+
+
+def weighted_quantiles(
+    samples: Float[Array, "N ..."],  # samples, quantiles are taken along the first axis
+    weights: Float[Array, "N"],  # normalized weights
+    probs: Float[Array, "k"],  # probabilities of the quantiles
+) -> Float[Array, "k ..."]:  # weighted quantiles of every entry
+    """weighted quantiles of all entries at once, sorting along the sample axis only once"""
+    N, *shape = samples.shape
+    Y = samples.reshape(N, -1)
+    order = jnp.argsort(Y, axis=0)
+    Y_sorted = jnp.take_along_axis(Y, order, axis=0)
+    cumsum = jnp.cumsum(weights[order], axis=0)
+
+    # find indices of cumulative sum closest to probs
+    # take corresponding Y_sorted values
+    # with linear interpolation if necessary
+    indices = vmap(jnp.searchsorted, (1, None), 1)(cumsum, probs)
+    indices = jnp.clip(indices, 1, N - 1)
+    take = partial(jnp.take_along_axis, axis=0)
+    left_cumsum, right_cumsum = take(cumsum, indices - 1), take(cumsum, indices)
+    left_Y, right_Y = take(Y_sorted, indices - 1), take(Y_sorted, indices)
+    # linear interpolation
+    quantiles = left_Y + (probs[:, None] - left_cumsum) / (
+        right_cumsum - left_cumsum
+    ) * (right_Y - left_Y)
+    return quantiles.reshape(len(probs), *shape)
+
+
+prediction_percentiles = weighted_quantiles
+
+
+def predict(
+    model: PGSSM,
+    y: Float[Array, "n+1 p"],
+    proposal: GLSSMProposal,
+    future_model: PGSSM,
+    N: int,
+    key: PRNGKeyArray,
+):
+    key, subkey = jrn.split(key)
+    signal_samples, log_weights = pgssm_importance_sampling(
+        y, model, proposal.z, proposal.Omega, N, subkey
+    )
+    (N,) = log_weights.shape
+
+    signal_model = GLSSM(
+        proposal.u,
+        proposal.A,
+        proposal.D,
+        proposal.Sigma0,
+        proposal.Sigma,
+        proposal.v,
+        proposal.B,
+        proposal.Omega,
+    )
+
+    @jit
+    def future_sample(signal_sample, key):
+        x_filt, Xi_filt, _, _ = kalman(signal_sample, signal_model)
+        state = GLSSMState(
+            future_model.u.at[0].set(x_filt[-1]),
+            future_model.A,
+            future_model.D,
+            Xi_filt[-1],
+            future_model.Sigma,
+        )
+
+        (x,) = simulate_states(state, 1, key)
+        return x
+
+    key, *subkeys = jrn.split(key, N + 1)
+    subkeys = jnp.array(subkeys)
+
+    future_x = vmap(future_sample)(signal_samples, subkeys)
+    future_s = mm_time_sim(future_model.B, future_x)
+    future_y = future_model.dist(future_s, future_model.xi).mean()
+
+    return (future_x, future_s, future_y), log_weights
+
+# %% ../../nbs/40_importance_sampling.ipynb 36
+from typing import NamedTuple
+
+from jax.scipy.special import logsumexp
+
+
+class QuantileSketch(NamedTuple):
+    """weighted samples summarized by M equally weighted points per entry"""
+
+    values: Float[Array, "M ..."]  # weighted quantiles at (i + 1/2) / M
+    log_mass: Float  # log of the total unnormalized weight
+
+
+def quantile_sketch(
+    samples: Float[Array, "N ..."],  # samples
+    log_weights: Float[Array, "N"],  # unnormalized log weights
+    M: int,  # number of points in the sketch
+) -> QuantileSketch:
+    """summarize weighted samples by M equally weighted points"""
+    grid = (jnp.arange(M) + 0.5) / M
+    values = weighted_quantiles(samples, normalize_weights(log_weights), grid)
+    return QuantileSketch(values, logsumexp(log_weights))
+
+
+def update_sketch(
+    sketch: QuantileSketch,  # sketch of the previous chunks
+    samples: Float[Array, "N ..."],  # new chunk of samples
+    log_weights: Float[Array, "N"],  # their unnormalized log weights
+) -> QuantileSketch:
+    """merge a new chunk of weighted samples into the sketch"""
+    M = sketch.values.shape[0]
+    merged_log_weights = jnp.concatenate(
+        [jnp.full(M, sketch.log_mass - jnp.log(M)), log_weights]
+    )
+    merged = jnp.concatenate([sketch.values, samples])
+    return quantile_sketch(merged, merged_log_weights, M)
+
+
+def sketch_quantiles(
+    sketch: QuantileSketch,  # sketch
+    probs: Float[Array, "k"],  # probabilities of the quantiles
+) -> Float[Array, "k ..."]:  # approximate weighted quantiles
+    """approximate weighted quantiles from a sketch"""
+    M = sketch.values.shape[0]
+    return weighted_quantiles(sketch.values, jnp.full(M, 1 / M), probs)
+
+# %% ../../nbs/40_importance_sampling.ipynb 38
+import jax
+from jax.scipy.stats import norm
+
+from .kalman import batched_FFBS, to_signal_model
+
+
+class PredictionResult(NamedTuple):
+    """predictive summaries of f"""
+
+    mean: Float[Array, "..."]  # predictive mean
+    sd: Float[Array, "..."]  # predictive standard deviation
+    quantiles: Float[Array, "k ..."]  # predictive quantiles
+
+
+class ControlledPredictionResult(NamedTuple):
+    """predictive summaries of f, with the mean estimated using control variates"""
+
+    mean: Float[Array, "..."]  # predictive mean
+    sd: Float[Array, "..."]  # predictive standard deviation
+    quantiles: Float[Array, "k ..."]  # predictive quantiles
+    variance_ratio: Float[Array, "..."]  # held-out ratio of variances of the mean
 
 
 def prediction(
@@ -66,25 +489,66 @@ def prediction(
     key: PRNGKeyArray,
     probs: Float[Array, "k"],
     prediction_model=None,
-):
+    antithetics: str = "all",
+    normal_variates=iid_normal,
+    rao_blackwellize: bool = False,  # integrate out y_prime, requires f to be affine in y_prime
+    control_variates: bool = False,  # use signal control variates for the mean, see `cv_mc_integration`
+) -> PredictionResult | ControlledPredictionResult:
     if prediction_model is None:
         prediction_model = model
 
     key, subkey = jrn.split(key)
     signal_samples, log_weights = pgssm_importance_sampling(
-        y, model, proposal.z, proposal.Omega, N, subkey
+        y,
+        model,
+        proposal.z,
+        proposal.Omega,
+        N,
+        subkey,
+        antithetics,
+        normal_variates,
+    )
+    x_samples, y_prime_samples = _prediction_draws(
+        signal_samples, proposal, prediction_model, key
     )
-    N = signal_samples.shape[0]
 
-    signal_model = to_signal_model(proposal)
+    if rao_blackwellize:
+        _check_affine(f, x_samples[0], signal_samples[0], y_prime_samples[0])
+        conditional_mean, conditional_var = _conditional_moments(
+            f, x_samples, signal_samples, prediction_model
+        )
+        percentiles = _normal_mixture_quantiles(
+            conditional_mean, conditional_var, log_weights, probs
+        )
+    else:
+        f_samples = vmap(f)(x_samples, signal_samples, y_prime_samples)
+        conditional_mean, conditional_var = f_samples, 0.0
+        percentiles = _percentiles(f_samples, log_weights, probs)
 
-    def state_sample(signal_sample, key):
-        (x_sample,) = FFBS(signal_sample, signal_model, 1, key)
-        return x_sample
+    sd_f = jnp.sqrt(
+        mc_integration(conditional_var + conditional_mean**2, log_weights)
+        - mc_integration(conditional_mean, log_weights) ** 2
+    )
 
-    key, *subkeys = jrn.split(key, N + 1)
-    subkeys = jnp.array(subkeys)
-    x_samples = vmap(state_sample)(signal_samples, subkeys)
+    if not control_variates:
+        return PredictionResult(
+            mc_integration(conditional_mean, log_weights), sd_f, percentiles
+        )
+
+    signal_mean, signal_var = proposal_signal_moments(
+        y, model, proposal.z, proposal.Omega
+    )
+    controls = signal_control_variates(signal_samples, signal_mean, signal_var)
+    mean_f, variance_ratio = cv_mc_integration(conditional_mean, log_weights, controls)
+    return ControlledPredictionResult(mean_f, sd_f, percentiles, variance_ratio)
+
+
+def _prediction_draws(signal_samples, proposal, prediction_model, key):
+    signal_model = to_signal_model(proposal)
+
+    # states conditional on signals, sharing the filter across all samples
+    key, subkey = jrn.split(key)
+    x_samples = batched_FFBS(signal_samples, signal_model, subkey)
     s_samples = mm_time_sim(prediction_model.B, x_samples)
 
     key, subkey = jrn.split(key)
@@ -92,22 +556,115 @@ def prediction(
         s_samples, prediction_model.xi[None]
     ).sample(seed=subkey)
 
-    f_samples = vmap(f)(x_samples, signal_samples, y_prime_samples)
+    return x_samples, y_prime_samples
 
-    mean_f = mc_integration(f_samples, log_weights)
-    sd_f = jnp.sqrt(mc_integration(f_samples**2, log_weights) - mean_f**2)
 
-    if f_samples.ndim == 3:
-        percentiles = prediction_percentiles(
-            f_samples, normalize_weights(log_weights), probs
-        )
-    elif f_samples.ndim == 2:
-        percentiles = vmap(_prediction_percentiles, (1, None, None), 1)(
-            f_samples, normalize_weights(log_weights), probs
-        )
-    elif f_samples.ndim == 1:
-        percentiles = _prediction_percentiles(
-            f_samples, normalize_weights(log_weights), probs
+def _prediction_samples(f, signal_samples, proposal, prediction_model, key):
+    x_samples, y_prime_samples = _prediction_draws(
+        signal_samples, proposal, prediction_model, key
+    )
+    return vmap(f)(x_samples, signal_samples, y_prime_samples)
+
+
+def _check_affine(f, x, s, y_prime):
+    """raise if f is not affine in y_prime, checked at a single sample"""
+    direction = jrn.normal(jrn.PRNGKey(0), y_prime.shape)
+    f_y = lambda y_prime: f(x, s, y_prime)
+    derivative = lambda y_prime: jax.jvp(f_y, (y_prime,), (direction,))[1]
+    _, second_derivative = jax.jvp(derivative, (y_prime,), (direction,))
+    if not jnp.allclose(second_derivative, 0.0):
+        raise ValueError("rao_blackwellize=True requires f to be affine in y_prime")
+
+
+def _conditional_moments(f, x_samples, signal_samples, prediction_model):
+    s_samples = mm_time_sim(prediction_model.B, x_samples)
+    dist = prediction_model.dist(s_samples, prediction_model.xi[None])
+
+    def moments(args):
+        x, s, y_mean, y_var = args
+        # the entries of y_prime are conditionally independent and f is affine,
+        # so the conditional variance only depends on the Jacobian
+        J = jax.jacfwd(f, argnums=2)(x, s, y_mean)
+        return f(x, s, y_mean), (J**2 * y_var).sum(axis=(-2, -1))
+
+    # one sample at a time, the Jacobians do not fit into memory at once
+    return lax.map(moments, (x_samples, signal_samples, dist.mean(), dist.variance()))
+
+
+def _percentiles(f_samples, log_weights, probs):
+    return weighted_quantiles(f_samples, normalize_weights(log_weights), probs)
+
+
+def _normal_mixture_quantiles(mean, var, log_weights, probs, n_bisections=60):
+    """invert the weighted mixture of normal CDFs by bisection, for all entries at once"""
+    weights = normalize_weights(log_weights)
+    N, *shape = mean.shape
+    mean = mean.reshape(N, -1)
+    sd = jnp.sqrt(var).reshape(N, -1)
+    # point masses where f does not depend on y_prime
+    is_degenerate = sd == 0.0
+    safe_sd = jnp.where(is_degenerate, 1.0, sd)
+
+    def mixture_cdf(q):
+        cdfs = jnp.where(
+            is_degenerate[:, None],
+            q[None] >= mean[:, None],
+            norm.cdf((q[None] - mean[:, None]) / safe_sd[:, None]),
         )
+        return jnp.tensordot(weights, cdfs, axes=1)
+
+    def bisect(_, bounds):
+        lower, upper = bounds
+        middle = (lower + upper) / 2
+        below = mixture_cdf(middle) < probs[:, None]
+        return jnp.where(below, middle, lower), jnp.where(below, upper, middle)
+
+    k = len(probs)
+    lower = jnp.broadcast_to((mean - 10 * sd).min(axis=0), (k, mean.shape[1]))
+    upper = jnp.broadcast_to((mean + 10 * sd).max(axis=0), (k, mean.shape[1]))
+    lower, upper = lax.fori_loop(0, n_bisections, bisect, (lower, upper))
+    return ((lower + upper) / 2).reshape(k, *shape)
+
+# %% ../../nbs/40_importance_sampling.ipynb 50
+from .util import compiled_kernel
 
-    return mean_f, sd_f, percentiles
+
+@compiled_kernel(static_argnames=("dist", "y_max"))
+def _discrete_prediction_quantiles(
+    signal_samples, xi, log_weights, probs, *, dist, y_max
+):
+    weights = normalize_weights(log_weights)
+
+    def mixture_cdf(y):
+        return jnp.tensordot(weights, dist(signal_samples, xi).cdf(y), axes=1)
+
+    # start at -1 where the CDF is zero, evaluate one grid point at a time
+    # to keep memory linear in N
+    F = lax.map(mixture_cdf, jnp.arange(-1.0, y_max + 1.0))
+    _, *shape = F.shape
+    F = F.reshape(y_max + 2, -1)
+
+    indices = vmap(jnp.searchsorted, (1, None), 1)(F, probs)
+    indices = jnp.clip(indices, 1, y_max + 1)
+    take = partial(jnp.take_along_axis, axis=0)
+    F_left, F_right = take(F, indices - 1), take(F, indices)
+    # linear interpolation between integers
+    increment = jnp.where(
+        F_right > F_left, (probs[:, None] - F_left) / (F_right - F_left), 1.0
+    )
+    quantiles = indices - 2 + jnp.clip(increment, 0.0, 1.0)
+    return quantiles.reshape(len(probs), *shape)
+
+
+def discrete_prediction_quantiles(
+    dist,  # observation distribution, takes signal and xi
+    signal_samples: Float[Array, "N ... p"],  # samples of the signal
+    xi: Float[Array, "... p"],  # parameters of the observation distribution
+    log_weights: Float[Array, "N"],  # log weights of the samples
+    probs: Float[Array, "k"],  # probabilities of the quantiles
+    y_max: int,  # largest value of the integer grid
+) -> Float[Array, "k ... p"]:  # interpolated quantiles of the predictive distribution
+    """quantiles of integer valued predictions by inverting the weighted mixture CDF"""
+    return _discrete_prediction_quantiles(
+        signal_samples, xi, log_weights, probs, dist=dist, y_max=y_max
+    )
@@ -3,15 +3,16 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/10_kalman_filter_smoother.ipynb.
 
 # %% auto 0
-__all__ = ['State', 'StateCov', 'StateTransition', 'kalman', 'smoother', 'account_for_nans', 'filter_intervals',
-           'smoother_intervals', 'FFBS', 'disturbance_smoother', 'smoothed_signals', 'simulation_smoother',
-           'to_signal_model', 'state_conditional_on_signal', 'state_mode']
+__all__ = ['vmm', 'State', 'StateCov', 'StateTransition', 'kalman', 'log_likelihood', 'smoother', 'account_for_nans',
+           'filter_intervals', 'smoother_intervals', 'FFBS', 'batched_FFBS', 'disturbance_smoother', 'smoothed_signals',
+           'simulation_smoother', 'to_signal_model', 'state_conditional_on_signal', 'state_mode', 'Dense', 'Companion',
+           'BlockDiagonal', 'Selection', 'StateSpaceStructure', 'structured_kalman', 'structured_disturbance_smoother',
+           'structured_smoothed_signals']
 
 # %% ../../nbs/10_kalman_filter_smoother.ipynb 1
 import jax.numpy as jnp
 import jax.random as jrn
 import jax.scipy.linalg as jsla
-import tensorflow_probability.substrates.jax.distributions as tfd
 from jax import vmap, jit
 from jax.lax import scan
 from jaxtyping import Array, Float, PRNGKeyArray
@@ -20,7 +21,7 @@ from .typing import GLSSM, FilterResult, Observations, SmootherResult
 from .util import MVN_degenerate as MVN, mm_sim
 
 # %% ../../nbs/10_kalman_filter_smoother.ipynb 7
-from .util import append_to_front
+from .util import append_to_front, compiled_kernel
 
 
 def _predict(
@@ -58,6 +59,7 @@ def _filter(
     return x_filt, Xi_filt
 
 
+@compiled_kernel
 def kalman(
     y: Observations,  # observatoins
     glssm: GLSSM,  # model
@@ -95,6 +97,23 @@ def kalman(
     return FilterResult(x_filt, Xi_filt, x_pred, Xi_pred)
 
 # %% ../../nbs/10_kalman_filter_smoother.ipynb 13
+vmm = vmap(jnp.matmul)
+
+
+def log_likelihood(
+    y: Observations,  # observations
+    filtered: FilterResult,  # result of the Kalman filter
+    glssm: GLSSM,  # model
+) -> Float:  # the log-likelihood $\log p(y)$
+    """Gaussian log-likelihood from the Kalman filter"""
+    y_pred = glssm.v + vmm(glssm.B, filtered.x_pred)
+    Psi_pred = (
+        vmm(vmm(glssm.B, filtered.Xi_pred), jnp.transpose(glssm.B, (0, 2, 1)))
+        + glssm.Omega
+    )
+    return MVN(y_pred, Psi_pred).log_prob(y).sum()
+
+# %% ../../nbs/10_kalman_filter_smoother.ipynb 16
 State = Float[Array, "m"]
 StateCov = Float[Array, "m m"]
 StateTransition = Float[Array, "m m"]
@@ -146,7 +165,7 @@ def smoother(
 
     return SmootherResult(x_smooth, Xi_smooth)
 
-# %% ../../nbs/10_kalman_filter_smoother.ipynb 18
+# %% ../../nbs/10_kalman_filter_smoother.ipynb 21
 # y not jittable: boolean indices have to be concrete
 def account_for_nans(model: GLSSM, y: Observations) -> tuple[GLSSM, Observations]:
     u, A, D, Sigma0, Sigma, v, B, Omega = model
@@ -163,8 +182,8 @@ def account_for_nans(model: GLSSM, y: Observations) -> tuple[GLSSM, Observations
 
     return GLSSM(u, A, D, Sigma0, Sigma, v, B, Omega), y
 
-# %% ../../nbs/10_kalman_filter_smoother.ipynb 22
-from tensorflow_probability.substrates.jax.distributions import Normal
+# %% ../../nbs/10_kalman_filter_smoother.ipynb 25
+from jax.scipy.stats import norm
 
 
 def filter_intervals(
@@ -172,9 +191,8 @@ def filter_intervals(
 ) -> Float[Array, "2 n+1 m"]:
     x_filt, Xi_filt, *_ = result
     marginal_variances = vmap(jnp.diag)(Xi_filt)
-    dist = Normal(x_filt, marginal_variances)
-    lower = dist.quantile(alpha / 2)
-    upper = dist.quantile(1 - alpha / 2)
+    lower = norm.ppf(alpha / 2, x_filt, marginal_variances)
+    upper = norm.ppf(1 - alpha / 2, x_filt, marginal_variances)
 
     return jnp.concatenate((lower[None], upper[None]))
 
@@ -184,65 +202,180 @@ def smoother_intervals(
 ) -> Float[Array, "2 n+1 m"]:
     x_smooth, Xi_smooth = result
     marginal_variances = vmap(jnp.diag)(Xi_smooth)
-    dist = Normal(x_smooth, marginal_variances)
-    lower = dist.quantile(alpha / 2)
-    upper = dist.quantile(1 - alpha / 2)
+    lower = norm.ppf(alpha / 2, x_smooth, marginal_variances)
+    upper = norm.ppf(1 - alpha / 2, x_smooth, marginal_variances)
 
     return jnp.concatenate((lower[None], upper[None]))
 
-# %% ../../nbs/10_kalman_filter_smoother.ipynb 25
+# %% ../../nbs/10_kalman_filter_smoother.ipynb 28
+from .util import degenerate_cholesky, iid_normal
+
+
+def _backward_sampling_parameters(
+    Xi_filt: Float[Array, "n+1 m m"],  # filtered state covariances
+    Xi_pred: Float[Array, "n+1 m m"],  # predicted state covariances
+    A: Float[Array, "n m m"],  # transition matrices
+) -> tuple[
+    Float[Array, "n m m"], Float[Array, "n m m"], Float[Array, "m m"]
+]:  # smoothing gains, roots of conditional covariances and root of final filtered covariance
+    """smoothing gains and Cholesky roots of the conditional covariances for all times"""
+    G = (
+        Xi_filt[:-1]
+        @ A.transpose((0, 2, 1))
+        @ jnp.linalg.pinv(Xi_pred[1:], hermitian=True)
+    )
+    cond_covariance = Xi_filt[:-1] - G @ Xi_pred[1:] @ G.transpose((0, 2, 1))
+
+    return G, degenerate_cholesky(cond_covariance), degenerate_cholesky(Xi_filt[-1])
+
+
+def _sample_backwards(
+    x_filt: Float[Array, "N n+1 m"],  # filtered means
+    x_pred: Float[Array, "N n+1 m"],  # predicted means
+    G: Float[Array, "n m m"],  # smoothing gains
+    C: Float[Array, "n m m"],  # roots of conditional covariances
+    C_n: Float[Array, "m m"],  # root of final filtered covariance
+    U: Float[Array, "N n+1 m"],  # standard normal variates
+) -> Float[Array, "N n+1 m"]:  # samples from the smoothing distribution
+    """backwards pass of the FFBS, only matrix-vector products"""
+    X_n = x_filt[:, -1] + mm_sim(C_n, U[:, -1])
+
+    def step(carry, inputs):
+        (X_next,) = carry
+        x_filt, x_pred_next, G, C, U = inputs
+
+        X = x_filt + mm_sim(G, X_next - x_pred_next) + mm_sim(C, U)
+
+        return (X,), X
+
+    time_first = lambda a: a.transpose((1, 0, 2))
+    _, X = scan(
+        step,
+        (X_n,),
+        (
+            time_first(x_filt[:, :-1]),
+            time_first(x_pred[:, 1:]),
+            G,
+            C,
+            time_first(U[:, :-1]),
+        ),
+        reverse=True,
+    )
+
+    return jnp.concatenate((X, X_n[None]), axis=0).transpose((1, 0, 2))
+
+
 def _simulate_smoothed_FW1994(
     x_filt: Float[Array, "n+1 m"],
     Xi_filt: Float[Array, "n+1 m m"],
+    x_pred: Float[Array, "n+1 m"],
     Xi_pred: Float[Array, "n+1 m m"],
     A: Float[Array, "n m m"],
     N: int,  # number of samples
     key: PRNGKeyArray,  # the random states
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
 ) -> Float[Array, "N n+1 m"]:  # array of N samples from the smoothing distribution
     r"""Simulate from smoothing distribution $p(X_0, \dots, X_n|Y_0, \dots, Y_n)$"""
+    np1, m = x_filt.shape
 
-    key, subkey = jrn.split(key)
-    X_n = MVN(x_filt[-1], Xi_filt[-1]).sample(N, subkey)
-
-    def sample_backwards(carry, inputs):
-        X_smooth_next, key = carry
-        x_filt, Xi_filt, Xi_pred, A = inputs
-
-        G = Xi_filt @ jnp.linalg.solve(Xi_pred, A).T
-
-        cond_expectation = x_filt + mm_sim(G, X_smooth_next - (A @ x_filt)[None])
-        cond_covariance = Xi_filt - G @ Xi_pred @ G.T
-
-        key, subkey = jrn.split(key)
-        new_samples = MVN(cond_expectation, cond_covariance).sample(seed=subkey)
-        return (new_samples, key), new_samples
+    G, C, C_n = _backward_sampling_parameters(Xi_filt, Xi_pred, A)
 
     key, subkey = jrn.split(key)
-    _, X = scan(
-        sample_backwards,
-        (X_n, subkey),
-        (x_filt[:-1], Xi_filt[:-1], Xi_pred[1:], A),
-        reverse=True,
+    U = normal_variates(subkey, N, np1 * m).reshape((N, np1, m))
+
+    return _sample_backwards(
+        jnp.broadcast_to(x_filt, (N, np1, m)),
+        jnp.broadcast_to(x_pred, (N, np1, m)),
+        G,
+        C,
+        C_n,
+        U,
     )
 
-    X_full = jnp.concatenate((X, X_n[None]))
-
-    return X_full.transpose((1, 0, 2))
-
 
 def FFBS(
     y: Observations,  # Observations $y$
     model: GLSSM,  # GLSSM
     N: int,  # number of samples
     key: PRNGKeyArray,  # random state
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
 ) -> Float[Array, "N n+1 m"]:  # N samples from the smoothing distribution
     r"""The Forward-Filter Backwards-Sampling Algorithm from [@Fruhwirth-Schnatter1994Data]."""
-    x_filt, Xi_filt, _, Xi_pred = kalman(y, model)
+    x_filt, Xi_filt, x_pred, Xi_pred = kalman(y, model)
 
     key, subkey = jrn.split(key)
-    return _simulate_smoothed_FW1994(x_filt, Xi_filt, Xi_pred, model.A, N, subkey)
+    return _simulate_smoothed_FW1994(
+        x_filt, Xi_filt, x_pred, Xi_pred, model.A, N, subkey, normal_variates
+    )
+
+# %% ../../nbs/10_kalman_filter_smoother.ipynb 33
+def _kalman_gains(
+    Xi_pred: Float[Array, "n+1 m m"],  # predicted state covariances
+    B: Float[Array, "n+1 p m"],  # observation matrices
+    Omega: Float[Array, "n+1 p p"],  # observation covariances
+) -> Float[Array, "n+1 m p"]:  # Kalman gains
+    BT = B.transpose((0, 2, 1))
+    Psi_pred = B @ Xi_pred @ BT + Omega
+    return Xi_pred @ BT @ jnp.linalg.pinv(Psi_pred, hermitian=True)
+
+
+def _filter_means(
+    ys: Float[Array, "N n+1 p"],  # N sets of observations
+    model: GLSSM,  # model
+    K: Float[Array, "n+1 m p"],  # Kalman gains
+) -> tuple[
+    Float[Array, "N n+1 m"], Float[Array, "N n+1 m"]
+]:  # filtered and predicted means
+    """mean recursions of the Kalman filter for many observations with shared gains"""
+    u, A, D, Sigma0, Sigma, v, B, Omega = model
+    N, np1, p = ys.shape
+    _, m, _ = D.shape
+
+    def step(carry, inputs):
+        (x_filt,) = carry
+        y, u, A, v, B, K = inputs
+
+        x_pred = u + mm_sim(A, x_filt)
+        x_filt_next = x_pred + mm_sim(K, y - v - mm_sim(B, x_pred))
+
+        return (x_filt_next,), (x_filt_next, x_pred)
 
-# %% ../../nbs/10_kalman_filter_smoother.ipynb 30
+    A_ext = append_to_front(jnp.eye(m), A)
+    u_ext = append_to_front(jnp.zeros(m), u[1:])
+    init = (jnp.broadcast_to(u[0], (N, m)),)
+
+    _, (x_filt, x_pred) = scan(
+        step, init, (ys.transpose((1, 0, 2)), u_ext, A_ext, v, B, K)
+    )
+
+    return x_filt.transpose((1, 0, 2)), x_pred.transpose((1, 0, 2))
+
+
+def batched_FFBS(
+    ys: Float[Array, "N n+1 p"],  # N sets of observations
+    model: GLSSM,  # GLSSM
+    key: PRNGKeyArray,  # random state
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
+) -> Float[
+    Array, "N n+1 m"
+]:  # for each set of observations one sample from the smoothing distribution
+    """FFBS for many sets of observations, sharing covariance and gain recursions"""
+    N, np1, p = ys.shape
+    _, m, _ = model.D.shape
+
+    # covariances do not depend on the observations
+    _, Xi_filt, _, Xi_pred = kalman(ys[0], model)
+    K = _kalman_gains(Xi_pred, model.B, model.Omega)
+    x_filt, x_pred = _filter_means(ys, model, K)
+
+    G, C, C_n = _backward_sampling_parameters(Xi_filt, Xi_pred, model.A)
+
+    key, subkey = jrn.split(key)
+    U = normal_variates(subkey, N, np1 * m).reshape((N, np1, m))
+
+    return _sample_backwards(x_filt, x_pred, G, C, C_n, U)
+
+# %% ../../nbs/10_kalman_filter_smoother.ipynb 36
 from .util import mm_time
 
 
@@ -298,10 +431,10 @@ def smoothed_signals(
     eta_smooth = disturbance_smoother(filtered, y, model)
     return y - eta_smooth
 
-# %% ../../nbs/10_kalman_filter_smoother.ipynb 35
-from tensorflow_probability.substrates.jax.distributions import Chi2
-from .util import degenerate_cholesky
-from .util import location_antithetic, scale_antithethic
+# %% ../../nbs/10_kalman_filter_smoother.ipynb 41
+from .util import cached_factor
+from .util import apply_antithetics, compiled_kernel, iid_normal
+from functools import partial
 
 
 def _sim_from_innovations_disturbances(
@@ -319,7 +452,7 @@ def _sim_from_innovations_disturbances(
         u, A, D, eps, v, B, eta = inputs
 
         x_next = u + (A @ x[..., None])[..., 0] + mm_sim(D, eps)
-        y_next = v + (B @ x[..., None])[..., 0] + eta
+        y_next = v + (B @ x_next[..., None])[..., 0] + eta
 
         return (x_next,), y_next
 
@@ -338,57 +471,78 @@ def _sim_from_innovations_disturbances(
     return y.transpose((1, 0, 2))
 
 
-def simulation_smoother(
-    model: GLSSM,  # model
-    y: Observations,  # observations
-    N: int,  # number of samples to draw
-    key: PRNGKeyArray,  # random number seed
-) -> Float[Array, "N n+1 m"]:  # N samples from the smoothing distribution of signals
-    """Simulate from the smoothing distribution of signals"""
+def _signal_filter_smoother(y, model, structure=None):
+    if structure is None:
+        return smoothed_signals(kalman(y, model), y, model)
+    filtered = structured_kalman(y, model, structure)
+    return structured_smoothed_signals(filtered, y, model, structure)
+
+
+def _n_variates(model: GLSSM) -> int:
+    """number of standard normal variates required for a single draw"""
     np1, p, m = model.B.shape
     n, _, l = model.D.shape
+    return m + n * l + np1 * p
 
-    @jit
-    def signal_filter_smoother(y, model):
-        return smoothed_signals(kalman(y, model), y, model)
 
-    key, subkey = jrn.split(key)
-    u_x0 = MVN(jnp.zeros(m), jnp.eye(m)).sample(N, subkey)
-    chol_Sigma0 = degenerate_cholesky(model.Sigma0)
+def _samples_from_variates(model, y, u, antithetics, structure=None):
+    np1, p, m = model.B.shape
+    n, _, l = model.D.shape
+    N = u.shape[0]
+
+    u_x0 = u[:, :m]
+    u_eps = u[:, m : m + n * l].reshape((N, n, l))
+    u_eta = u[:, m + n * l :].reshape((N, np1, p))
+
+    chol_Sigma0 = cached_factor(model, "Sigma0")
     x0 = mm_sim(chol_Sigma0, u_x0)
 
-    key, subkey = jrn.split(key)
-    u_eps = MVN(jnp.zeros((n, l)), jnp.eye(l)[None]).sample(N, subkey)
-    chol_Sigma = degenerate_cholesky(model.Sigma)
+    chol_Sigma = cached_factor(model, "Sigma")
     eps = vmap(vmap(jnp.matmul), (None, 0))(chol_Sigma, u_eps)
 
-    key, subkey = jrn.split(key)
-    u_eta = MVN(jnp.zeros((np1, p)), jnp.eye(p)[None]).sample(N, subkey)
-    chol_Omega = degenerate_cholesky(model.Omega)
+    chol_Omega = cached_factor(model, "Omega")
     eta = vmap(vmap(jnp.matmul), (None, 0))(chol_Omega, u_eta)
 
     y_sim = _sim_from_innovations_disturbances(model, x0, eps, eta)
 
-    signals_smooth = signal_filter_smoother(y, model)
+    filter_smoother = partial(_signal_filter_smoother, structure=structure)
+    signals_smooth = filter_smoother(y, model)
     sim_signals = y_sim - eta
-    sim_signals_smooth = vmap(signal_filter_smoother, (0, None))(y_sim, model)
+    sim_signals_smooth = vmap(filter_smoother, (0, None))(y_sim, model)
 
     samples = signals_smooth[None] + (sim_signals - sim_signals_smooth)
 
-    # u = jnp.concatenate((u_x0[:, None, :], u_eps, u_eta), axis=-1)
-    u = jnp.concatenate(
-        (u_x0.reshape((N, -1)), u_eps.reshape((N, -1)), u_eta.reshape((N, -1))), axis=1
-    )
+    return apply_antithetics(u, samples, signals_smooth, antithetics)
+
 
-    l_samples = location_antithetic(samples, signals_smooth)
-    s_samples = scale_antithethic(u, samples, signals_smooth)
-    ls_samples = scale_antithethic(u, l_samples, signals_smooth)
+@compiled_kernel(static_argnames=("N", "antithetics", "normal_variates", "structure"))
+def _simulation_smoother(model, y, key, *, N, antithetics, normal_variates, structure):
+    key, subkey = jrn.split(key)
+    u = normal_variates(subkey, N, _n_variates(model))
+    return _samples_from_variates(model, y, u, antithetics, structure)
 
-    full_samples = jnp.concatenate((samples, l_samples, s_samples, ls_samples), axis=0)
 
-    return full_samples
+def simulation_smoother(
+    model: GLSSM,  # model
+    y: Observations,  # observations
+    N: int,  # number of samples to draw
+    key: PRNGKeyArray,  # random number seed
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
+    structure=None,  # sparsity structure of the model, see `StateSpaceStructure`
+) -> Float[Array, "N n+1 m"]:  # N samples from the smoothing distribution of signals
+    """Simulate from the smoothing distribution of signals"""
+    return _simulation_smoother(
+        model,
+        y,
+        key,
+        N=N,
+        antithetics=antithetics,
+        normal_variates=normal_variates,
+        structure=structure,
+    )
 
-# %% ../../nbs/10_kalman_filter_smoother.ipynb 39
+# %% ../../nbs/10_kalman_filter_smoother.ipynb 46
 from .typing import PGSSM
 
 
@@ -415,3 +569,219 @@ def state_conditional_on_signal(
 
 def state_mode(model: GLSSM | PGSSM, signal_mode: Float[Array, "n+1 p"]):
     return state_conditional_on_signal(model, signal_mode).x_smooth
+
+# %% ../../nbs/10_kalman_filter_smoother.ipynb 48
+from functools import partial
+from typing import NamedTuple
+
+
+class Dense(NamedTuple):
+    """unstructured block of a block diagonal matrix"""
+
+    size: int  # number of rows and columns
+
+
+class Companion(NamedTuple):
+    """companion block: free first row and ones on the subdiagonal"""
+
+    size: int  # number of rows and columns
+
+
+class BlockDiagonal(NamedTuple):
+    """structure of block diagonal transition matrices $A_t$"""
+
+    blocks: tuple[Dense | Companion, ...]  # blocks from top left to bottom right
+
+
+class Selection(NamedTuple):
+    """structure of matrices that only involve a few states"""
+
+    index: tuple[int, ...]  # non-zero columns of $B_t$ or non-zero rows of $D_t$
+
+
+class StateSpaceStructure(NamedTuple):
+    """sparsity structure of the system matrices of a GLSSM"""
+
+    A: BlockDiagonal  # structure of the transition matrices $A_t$
+    D: Selection  # structure of the innovation matrices $D_t$
+    B: Selection  # structure of the observation matrices $B_t$
+
+
+def _apply_transition(
+    A: Float[Array, "m m"],  # transition matrix
+    M: Float[Array, "m ..."],  # vector or matrix
+    structure: BlockDiagonal,
+) -> Float[Array, "m ..."]:  # $AM$
+    start = 0
+    rows = []
+    for block in structure.blocks:
+        stop = start + block.size
+        M_block = M[start:stop]
+        if isinstance(block, Companion):
+            rows.append((A[start, start:stop] @ M_block)[None])
+            rows.append(M_block[:-1])
+        else:
+            rows.append(A[start:stop, start:stop] @ M_block)
+        start = stop
+    return jnp.concatenate(rows)
+
+
+def _apply_transition_T(
+    A: Float[Array, "m m"],  # transition matrix
+    M: Float[Array, "m ..."],  # vector or matrix
+    structure: BlockDiagonal,
+) -> Float[Array, "m ..."]:  # $A^TM$
+    start = 0
+    rows = []
+    for block in structure.blocks:
+        stop = start + block.size
+        M_block = M[start:stop]
+        if isinstance(block, Companion):
+            shifted = jnp.concatenate((M_block[1:], jnp.zeros_like(M_block[:1])))
+            first_row = A[start, start:stop]
+            rows.append(jnp.tensordot(first_row, M_block[0], axes=0) + shifted)
+        else:
+            rows.append(A[start:stop, start:stop].T @ M_block)
+        start = stop
+    return jnp.concatenate(rows)
+
+
+def _apply_selection(
+    B: Float[Array, "p m"],  # observation matrix
+    M: Float[Array, "m ..."],  # vector or matrix
+    structure: Selection,
+) -> Float[Array, "p ..."]:  # $BM$
+    index = jnp.array(structure.index)
+    return B[:, index] @ M[index]
+
+
+def _apply_selection_T(
+    B: Float[Array, "p m"],  # observation matrix
+    w: Float[Array, "p"],  # vector
+    structure: Selection,
+) -> Float[Array, "m"]:  # $B^Tw$
+    index = jnp.array(structure.index)
+    Bw = B[:, index].T @ w
+    return jnp.zeros(B.shape[1], Bw.dtype).at[index].set(Bw)
+
+
+def _structured_predict(x_filt, Xi_filt, u, A, Sigma, D, structure):
+    """prediction step in $O(m^2)$ for companion blocks"""
+    x_pred = _apply_transition(A, x_filt, structure.A) + u
+    A_Xi = _apply_transition(A, Xi_filt, structure.A)
+    Xi_pred = _apply_transition(A, A_Xi.T, structure.A)
+
+    index = jnp.array(structure.D.index)
+    D_index = D[index]
+    Xi_pred = Xi_pred.at[index[:, None], index].add(D_index @ Sigma @ D_index.T)
+
+    return x_pred, Xi_pred
+
+
+def _structured_filter(x_pred, Xi_pred, y, v, B, Omega, structure):
+    """filtering step in $O(pm^2)$"""
+    B_Xi = _apply_selection(B, Xi_pred, structure.B)
+    y_pred = v + _apply_selection(B, x_pred, structure.B)
+    Psi_pred = _apply_selection(B, B_Xi.T, structure.B) + Omega
+    K = B_Xi.T @ jnp.linalg.pinv(Psi_pred, hermitian=True)
+    x_filt = x_pred + K @ (y - y_pred)
+    Xi_filt = Xi_pred - K @ Psi_pred @ K.T
+
+    return x_filt, Xi_filt
+
+
+@compiled_kernel(static_argnames=("structure",))
+def _structured_kalman(y, glssm, *, structure):
+    u, A, D, Sigma0, Sigma, v, B, Omega = glssm
+
+    def step(carry, inputs):
+        x_filt, Xi_filt = carry
+        y, u, A, D, Sigma, v, B, Omega = inputs
+
+        x_pred, Xi_pred = _structured_predict(
+            x_filt, Xi_filt, u, A, Sigma, D, structure
+        )
+        x_filt_next, Xi_filt_next = _structured_filter(
+            x_pred, Xi_pred, y, v, B, Omega, structure
+        )
+
+        return (x_filt_next, Xi_filt_next), (x_filt_next, Xi_filt_next, x_pred, Xi_pred)
+
+    # the artificial identity transition used in `kalman` is not structured,
+    # so filter X_0 separately
+    x_filt0, Xi_filt0 = _structured_filter(
+        u[0], Sigma0, y[0], v[0], B[0], Omega[0], structure
+    )
+    _, (x_filt, Xi_filt, x_pred, Xi_pred) = scan(
+        step,
+        (x_filt0, Xi_filt0),
+        (y[1:], u[1:], A, D, Sigma, v[1:], B[1:], Omega[1:]),
+    )
+
+    return FilterResult(
+        append_to_front(x_filt0, x_filt),
+        append_to_front(Xi_filt0, Xi_filt),
+        append_to_front(u[0], x_pred),
+        append_to_front(Sigma0, Xi_pred),
+    )
+
+
+def structured_kalman(
+    y: Observations,  # observations
+    glssm: GLSSM,  # model
+    structure: StateSpaceStructure,  # sparsity structure of the model
+) -> FilterResult:  # filtered & predicted states and covariances
+    """Kalman filter exploiting sparse system matrices"""
+    return _structured_kalman(y, glssm, structure=structure)
+
+
+def structured_disturbance_smoother(
+    filtered: FilterResult,  # filter result
+    y: Observations,  # observations
+    model: GLSSM,  # model
+    structure: StateSpaceStructure,  # sparsity structure of the model
+) -> Float[Array, "n+1 p"]:  # smoothed disturbances
+    """disturbance smoother exploiting sparse system matrices"""
+    x_filt, Xi_filt, x_pred, Xi_pred = filtered
+    u, A, D, Sigma0, Sigma, v, B, Omega = model
+
+    select = vmap(partial(_apply_selection, structure=structure.B))
+    B_Xi = select(B, Xi_pred)
+    K_Psi = B_Xi.transpose((0, 2, 1))
+    Psi_pred = select(B, K_Psi) + Omega
+    Psi_pred_pinv = jnp.linalg.pinv(Psi_pred, hermitian=True)
+    K = K_Psi @ Psi_pred_pinv
+    Pinv_y = mm_time(Psi_pred_pinv, y - select(B, x_pred))
+
+    def step(carry, inputs):
+        (r,) = carry
+        Pinv_y, K, A, B, Omega = inputs
+
+        AT_r = _apply_transition_T(A, r, structure.A)
+        e = Pinv_y - K.T @ AT_r
+
+        eta_smooth = Omega @ e
+        # L^T r = (I - KB)^T A^T r
+        r_prev = _apply_selection_T(B, e, structure.B) + AT_r
+
+        return (r_prev,), eta_smooth
+
+    # r_n = 0, so the transition at time n does not matter
+    A_ext = jnp.concatenate((A, A[-1:]), axis=0)
+
+    _, eta_smooth = scan(
+        step, (jnp.zeros_like(x_pred[0]),), (Pinv_y, K, A_ext, B, Omega), reverse=True
+    )
+
+    return eta_smooth
+
+
+def structured_smoothed_signals(
+    filtered: FilterResult,  # filter result
+    y: Observations,  # observations
+    model: GLSSM,  # model
+    structure: StateSpaceStructure,  # sparsity structure of the model
+) -> Float[Array, "n+1 p"]:  # smoothed signals
+    """compute smoothed signals from filter result, exploiting sparse system matrices"""
+    eta_smooth = structured_disturbance_smoother(filtered, y, model, structure)
+    return y - eta_smooth
@@ -22,9 +22,14 @@ from .typing import GLSSM, PGSSM, InitialState
 
 # %% ../../nbs/30_laplace_approximation.ipynb 7
 from .kalman import smoothed_signals
+from .kalman import structured_kalman, structured_smoothed_signals
 from .typing import to_glssm
-from .typing import GLSSMProposal, ConvergenceInformation
+from .typing import GLSSMProposal, ConvergenceInformation, IterationTrace
 from jax.scipy.optimize import minimize
+from .util import compiled_kernel, step_timer
+from .kalman import log_likelihood
+from .importance_sampling import diagonal_gaussian_log_prob
+from .pgssm import mask_missing, missing_observations, missing_omega2
 
 vmm = jit(vmap(jnp.matmul))
 vdiag = jit(vmap(jnp.diag))
@@ -46,37 +51,69 @@ def _initial_guess(xi_ti, y_ti, dist, link=default_link):
     return jnp.squeeze(result.x)
 
 
-def laplace_approximation(
-    y: Float[Array, "n+1 p"],  # observation
-    model: PGSSM,
-    n_iter: int,  # number of iterations
-    log_lik=None,  # log likelihood function
-    d_log_lik=None,  # derivative of log likelihood function
-    dd_log_lik=None,  # second derivative of log likelihood function
-    eps: Float = 1e-5,  # precision of iterations
-    link=default_link,  # default link to use in initial guess
-) -> tuple[GLSSMProposal, ConvergenceInformation]:
-    u, A, D, Sigma0, Sigma, v, B, dist, xi = model
-    np1, p, m = B.shape
+def _default_log_lik(s_ti, xi_ti, y_ti, dist):
+    return dist(s_ti, xi_ti).log_prob(y_ti).sum()
+
+
+def _pseudo_observations(s, xi, y, missing, vd_log_lik, vdd_log_lik):
+    grad = vd_log_lik(s, xi, y)
+    Gamma = -vdd_log_lik(s, xi, y)
+    # assume hessian is diagonal
+    Omega = vdiag(jnp.where(missing, missing_omega2, 1.0 / Gamma))
 
-    s_init = vvmap(partial(_initial_guess, dist=dist, link=link))(xi, y)
+    z = jnp.where(missing, 0.0, s + grad / Gamma)
+    return z, Omega
+
+
+@compiled_kernel(
+    static_argnames=(
+        "dist",
+        "n_iter",
+        "log_lik",
+        "d_log_lik",
+        "dd_log_lik",
+        "link",
+        "trace",
+        "structure",
+    )
+)
+def _laplace_approximation(
+    y,
+    model,
+    eps,
+    s_init,
+    *,
+    dist,
+    n_iter,
+    log_lik,
+    d_log_lik,
+    dd_log_lik,
+    link,
+    trace,
+    structure,
+):
+    u, A, D, Sigma0, Sigma, v, B, _, xi = mask_missing(y, model)
+    missing = missing_observations(y)
+    y = jnp.where(missing, 0.0, y)
+    np1, p, m = B.shape
 
-    def default_log_lik(s_ti, xi_ti, y_ti):
-        return dist(s_ti, xi_ti).log_prob(y_ti).sum()
+    if s_init is None:
+        s_init = vvmap(partial(_initial_guess, dist=dist, link=link))(xi, y)
+    s_init = jnp.where(missing, 0.0, s_init)
 
     if log_lik is None:
-        log_lik = default_log_lik
+        log_lik = partial(_default_log_lik, dist=dist)
 
     if d_log_lik is None:
         d_log_lik = jacfwd(log_lik, argnums=0)
     if dd_log_lik is None:
         dd_log_lik = jacrev(d_log_lik, argnums=0)
 
-    vd_log_lik = jit(vvmap(d_log_lik))
-    vdd_log_lik = jit(vvmap(dd_log_lik))
+    vd_log_lik = vvmap(d_log_lik)
+    vdd_log_lik = vvmap(dd_log_lik)
 
     def _break(val):
-        _, i, z, Omega, z_old, Omega_old = val
+        _, i, z, Omega, z_old, Omega_old, _ = val
 
         z_converged = jnp.logical_and(converged(z, z_old, eps), i > 0)
         Omega_converged = jnp.logical_and(converged(Omega, Omega_old, eps), i > 0)
@@ -87,27 +124,46 @@ def laplace_approximation(
         return jnp.logical_or(all_converged, iteration_limit_reached)
 
     def _iteration(val):
-        s, i, z_old, Omega_old, _, _ = val
+        s, i, z_old, Omega_old, _, _, iteration_trace = val
 
-        grad = vd_log_lik(s, xi, y)
-        Gamma = -vdd_log_lik(s, xi, y)
-        # assume hessian is diagonal
-        Omega = vdiag(1.0 / Gamma)
-
-        z = s + grad / Gamma
+        z, Omega = _pseudo_observations(s, xi, y, missing, vd_log_lik, vdd_log_lik)
         approx_glssm = GLSSM(u, A, D, Sigma0, Sigma, v, B, Omega)
 
-        filtered = kalman(z, approx_glssm)
-        s_new = smoothed_signals(filtered, z, approx_glssm)
-
-        return s_new, i + 1, z, Omega, z_old, Omega_old
+        if structure is None:
+            filtered = kalman(z, approx_glssm)
+            s_new = smoothed_signals(filtered, z, approx_glssm)
+        else:
+            filtered = structured_kalman(z, approx_glssm, structure)
+            s_new = structured_smoothed_signals(filtered, z, approx_glssm, structure)
+
+        if trace:
+            # Laplace approximation of log p(y), expanded around the mode s_new
+            log_p = jnp.where(missing, 0.0, vvmap(log_lik)(s_new, xi, y)).sum()
+            log_g = diagonal_gaussian_log_prob(z, s_new, Omega).sum()
+            delta = jnp.maximum(
+                jnp.max(jnp.abs(z - z_old)), jnp.max(jnp.abs(Omega - Omega_old))
+            )
+            iteration_trace = iteration_trace.record(
+                i,
+                delta=jnp.where(i > 0, delta, jnp.nan),
+                log_lik=log_likelihood(z, filtered, approx_glssm) + log_p - log_g,
+                step_time=step_timer(s_new),
+            )
+
+        return s_new, i + 1, z, Omega, z_old, Omega_old, iteration_trace
 
     empty_z = jnp.empty_like(s_init)
     empty_Omega = jnp.empty((np1, p, p))
-    init = (s_init, 0, empty_z, empty_Omega, empty_z, empty_Omega)
+    # no samples are drawn, the ESS stays NaN
+    iteration_trace = IterationTrace.empty(n_iter) if trace else None
+    if trace:
+        step_timer(s_init)
+    init = (s_init, 0, empty_z, empty_Omega, empty_z, empty_Omega, iteration_trace)
 
     _keep_going = lambda *args: jnp.logical_not(_break(*args))
-    _, n_iters, z, Omega, z_old, Omega_old = while_loop(_keep_going, _iteration, init)
+    _, n_iters, z, Omega, z_old, Omega_old, iteration_trace = while_loop(
+        _keep_going, _iteration, init
+    )
 
     final_proposal = GLSSMProposal(u, A, D, Sigma0, Sigma, v, B, Omega, z)
     delta_z = jnp.max(jnp.abs(z - z_old))
@@ -118,10 +174,41 @@ def laplace_approximation(
         ),
         n_iter=n_iters,
         delta=jnp.max(jnp.array([delta_z, delta_Omega])),
+        trace=iteration_trace,
     )
     return final_proposal, information
 
 
+def laplace_approximation(
+    y: Float[Array, "n+1 p"],  # observation
+    model: PGSSM,
+    n_iter: int,  # number of iterations
+    log_lik=None,  # log likelihood function
+    d_log_lik=None,  # derivative of log likelihood function
+    dd_log_lik=None,  # second derivative of log likelihood function
+    eps: Float = 1e-5,  # precision of iterations
+    link=default_link,  # default link to use in initial guess
+    trace: bool = False,  # record per iteration diagnostics, see `IterationTrace`
+    s_init: Float[Array, "n+1 p"] | None = None,  # initial signal, defaults to the modes of $p(y_t|s_t)$
+    structure=None,  # sparsity structure of the model, see `StateSpaceStructure`
+) -> tuple[GLSSMProposal, ConvergenceInformation]:
+    # the distribution is not an array, pass it as static argument
+    return _laplace_approximation(
+        y,
+        model._replace(dist=None),
+        eps,
+        s_init,
+        dist=model.dist,
+        n_iter=n_iter,
+        log_lik=log_lik,
+        d_log_lik=d_log_lik,
+        dd_log_lik=dd_log_lik,
+        link=link,
+        trace=trace,
+        structure=structure,
+    )
+
+
 def posterior_mode(proposal: GLSSMProposal) -> Float[Array, "n+1 p"]:
     glssm = to_glssm(proposal)
     return smoothed_signals(kalman(proposal.z, glssm), proposal.z, glssm)
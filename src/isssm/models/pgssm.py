@@ -1,26 +1,33 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../../nbs/Models/20_pgssm.ipynb.
 
 # %% auto 0
-__all__ = ['nb_pgssm', 'poisson_pgssm']
+__all__ = ['dist_nb', 'dist_poisson', 'nb_pgssm', 'poisson_pgssm']
 
-# %% ../../../nbs/Models/20_pgssm.ipynb 2
+# %% ../../../nbs/models/20_pgssm.ipynb 2
 import jax.numpy as jnp
 from jaxtyping import Float
 from ..typing import GLSSM, PGSSM
-from tensorflow_probability.substrates.jax.distributions import (
-    NegativeBinomial as NBinom,
-    Poisson,
-)
+
+
+# module level distributions, so that compiled kernels are shared across models
+# tfp is slow to import, so it is only loaded once a distribution is used
+def dist_nb(log_mu, xi):
+    from tensorflow_probability.substrates.jax.distributions import NegativeBinomial
+
+    mu = jnp.exp(log_mu)
+    return NegativeBinomial(xi, probs=mu / (xi + mu))
+
+
+def dist_poisson(log_mu, xi):
+    from tensorflow_probability.substrates.jax.distributions import Poisson
+
+    return Poisson(log_rate=log_mu)
 
 
 def nb_pgssm(glssm: GLSSM, r: Float):
     np1, p, m = glssm.B.shape
     xi = jnp.full((np1, p), r)
 
-    def dist_nb(log_mu, xi):
-        mu = jnp.exp(log_mu)
-        return NBinom(xi, probs=mu / (xi + mu))
-
     return PGSSM(
         glssm.u,
         glssm.A,
@@ -38,9 +45,6 @@ def poisson_pgssm(glssm: GLSSM):
     np1, p, m = glssm.B.shape
     xi = jnp.empty((np1, p))
 
-    def dist_poisson(log_mu, xi):
-        return Poisson(log_rate=log_mu)
-
     return PGSSM(
         glssm.u,
         glssm.A,
@@ -3,7 +3,7 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../../nbs/Models/10_stsm.ipynb.
 
 # %% auto 0
-__all__ = ['stsm']
+__all__ = ['stsm', 'stsm_structure']
 
 # %% ../../../nbs/Models/10_stsm.ipynb 1
 import jax
@@ -61,3 +61,24 @@ def stsm(
     v = jnp.zeros((n + 1, p))
 
     return GLSSM(u, A, D, Sigma0, Sigma, v, B, Omega)
+
+# %% ../../../nbs/Models/10_stsm.ipynb 8
+from ..kalman import BlockDiagonal, Companion, Dense, Selection, StateSpaceStructure
+
+
+def stsm_structure(
+    s_order: int,  # order of seasonal component
+) -> StateSpaceStructure:  # sparsity structure of `stsm` models
+    """Structure of `stsm` models, see `structured_kalman`"""
+    has_seasonality = s_order >= 2
+    if has_seasonality:
+        return StateSpaceStructure(
+            A=BlockDiagonal((Dense(2), Companion(s_order - 1))),
+            D=Selection((0, 1, 2)),
+            B=Selection((0, 2)),
+        )
+    return StateSpaceStructure(
+        A=BlockDiagonal((Dense(2),)),
+        D=Selection((0, 1)),
+        B=Selection((0,)),
+    )
@@ -8,24 +8,43 @@ __all__ = ['optimal_parameters', 'modified_efficient_importance_sampling']
 # %% ../../nbs/50_modified_efficient_importance_sampling.ipynb 5
 import jax.numpy as jnp
 import jax.random as jrn
-from jaxtyping import Float, Array, PRNGKeyArray
+from jaxtyping import Bool, Float, Array, PRNGKeyArray
 from jax import vmap, jit
-from .util import converged
-from .importance_sampling import log_weights_t, normalize_weights
+from .util import compiled_kernel, converged, iid_normal, step_timer
+from .importance_sampling import _synthetic_log_prob, normalize_weights
+from .importance_sampling import ess_lw
+from jax.scipy.special import logsumexp
 from functools import partial
 from jax.lax import while_loop
-from .kalman import kalman, simulation_smoother
+from .kalman import kalman, log_likelihood, simulation_smoother, structured_kalman
 from jax.lax import scan
 from .util import MVN_degenerate as MVN, mm_sim
 
 from .glssm import mm_sim
 from .typing import GLSSM, PGSSM, GLSSMProposal, ConvergenceInformation
+from .typing import IterationTrace
+from .typing import prepare, prepared_like
+from isssm.pgssm import (
+    mask_missing,
+    missing_observations,
+    missing_omega2,
+    observation_log_prob,
+)
 
 
 @jit
 def optimal_parameters(
-    signal: Float[Array, "N p"], weights: Float[Array, "N"], log_p: Float[Array, "N"]
+    signal: Float[Array, "N p"],
+    weights: Float[Array, "N"],
+    log_p: Float[Array, "N"],
+    missing: Bool[Array, "p"] | None = None,  # missing observations, signal is 0
 ):
+    X_T_W_X, X_T_W_y = _normal_equations(signal, weights, log_p)
+    return _solve_normal_equations(X_T_W_X, X_T_W_y, missing)
+
+
+def _normal_equations(signal, weights, log_p):
+    """weighted least squares moments, sums over the samples"""
     ones = jnp.ones_like(weights)[:, None]
     w_inner_prod = lambda a, b: jnp.einsum("i,ij,ik->jk", weights, a, b)
 
@@ -55,36 +74,67 @@ def optimal_parameters(
             w_inner_prod(-0.5 * signal**2, log_p[:, None]),
         ]
     )
+    return X_T_W_X, X_T_W_y
+
+
+def _solve_normal_equations(X_T_W_X, X_T_W_y, missing):
+    if missing is not None:
+        # signals of missing observations vanish, decouple their (zero) rows and columns
+        missing = missing.astype(X_T_W_X.dtype)
+        X_T_W_X = X_T_W_X + jnp.diag(jnp.concatenate([jnp.zeros(1), missing, missing]))
 
     beta = jnp.linalg.solve(X_T_W_X, X_T_W_y[:, 0])
     return beta
 
 
-def modified_efficient_importance_sampling(
-    y: Float[Array, "n+1 p"],  # observations
-    model: PGSSM,  # model
-    z_init: Float[Array, "n+1 p"],  # initial z estimate
-    Omega_init: Float[Array, "n+1 p p"],  # initial Omega estimate
-    n_iter: int,  # number of iterations
-    N: int,  # number of samples
-    key: PRNGKeyArray,  # random key
-    eps: Float = 1e-5,  # convergence threshold
-) -> tuple[GLSSMProposal, ConvergenceInformation]:
+def _normalize_observed_weights(log_weights, unobserved):
+    """normalize the log weights of every sample over the observed time points"""
+    # time points without observations, e.g. padding, have log weight 0 for every
+    # sample, leave them out of the normalization so that they do not change it
+    normalize = lambda lw: normalize_weights(jnp.where(unobserved, -jnp.inf, lw))
+    return jnp.where(unobserved, 1.0, vmap(normalize)(log_weights))
+
+
+@compiled_kernel(
+    static_argnames=(
+        "dist",
+        "n_iter",
+        "N",
+        "antithetics",
+        "normal_variates",
+        "trace",
+        "structure",
+    )
+)
+def _modified_efficient_importance_sampling(
+    y,
+    model,
+    z_init,
+    Omega_init,
+    key,
+    eps,
+    *,
+    dist,
+    n_iter,
+    N,
+    antithetics,
+    normal_variates,
+    trace,
+    structure
+):
     z, Omega = z_init, Omega_init
+    # factorize Sigma0 and Sigma once for all iterations
+    model = prepare(mask_missing(y, model._replace(dist=dist)))
+    missing = missing_observations(y)
 
     np1, p, m = model.B.shape
 
     key, crn_key = jrn.split(key)
 
-    v_norm_w = vmap(normalize_weights)
-    dist = model.dist
-    lw_t = vmap(
-        vmap(lambda s, y, xi, z, Omega: log_weights_t(s, y, xi, dist, z, Omega)),
-        (0, None, None, None, None),
-    )
+    unobserved = missing.all(axis=-1)
 
     def _break(val):
-        i, z, Omega, z_old, Omega_old = val
+        i, z, Omega, z_old, Omega_old, _ = val
 
         # in first iteration we don't have old values, converged is True for NaNs
         z_converged = jnp.logical_and(converged(z, z_old, eps), i > 0)
@@ -96,40 +146,81 @@ def modified_efficient_importance_sampling(
         )
 
     def _iteration(val):
-        i, z, Omega, _, _ = val
-        glssm_approx = GLSSM(
-            model.u,
-            model.A,
-            model.D,
-            model.Sigma0,
-            model.Sigma,
-            model.v,
-            model.B,
-            Omega,
+        i, z, Omega, _, _, iteration_trace = val
+        glssm_approx = prepared_like(
+            model,
+            GLSSM(
+                model.u,
+                model.A,
+                model.D,
+                model.Sigma0,
+                model.Sigma,
+                model.v,
+                model.B,
+                Omega,
+            ),
+        )
+        sim_signal = simulation_smoother(
+            glssm_approx, z, N, crn_key, antithetics, normal_variates, structure
         )
-        sim_signal = simulation_smoother(glssm_approx, z, N, crn_key)
 
-        log_weights = lw_t(sim_signal, y, model.xi, z, Omega)
-        log_p = dist(sim_signal, model.xi).log_prob(y).sum(axis=-1)
-        wls_estimate = vmap(optimal_parameters, (1, 1, 1), 0)(
-            sim_signal, v_norm_w(log_weights), log_p
+        log_p = observation_log_prob(y, sim_signal, dist, model.xi).sum(axis=-1)
+        # Omega_init need not be diagonal
+        log_weights = log_p - _synthetic_log_prob(z, sim_signal, glssm_approx)
+        weights = _normalize_observed_weights(log_weights, unobserved)
+        wls_estimate = vmap(optimal_parameters, (1, 1, 1, 0), 0)(
+            sim_signal, weights, log_p, missing
         )
 
         a = wls_estimate[:, 0]
         b = wls_estimate[:, 1 : (p + 1)]
         c = wls_estimate[:, (p + 1) :]
 
-        z_new = b / c
-        Omega_new = vmap(jnp.diag)(1 / c)
+        z_new = jnp.where(missing, 0.0, b / c)
+        Omega_new = vmap(jnp.diag)(jnp.where(missing, missing_omega2, 1 / c))
+
+        if trace:
+            # importance sampling estimate of log p(y) with the current proposal
+            total_log_weights = log_weights.sum(axis=-1)
+            (n_samples,) = total_log_weights.shape
+            if structure is None:
+                filtered = kalman(z, glssm_approx)
+            else:
+                filtered = structured_kalman(z, glssm_approx, structure)
+            log_lik = (
+                log_likelihood(z, filtered, glssm_approx)
+                + logsumexp(total_log_weights)
+                - jnp.log(n_samples)
+            )
+            delta = jnp.maximum(
+                jnp.max(jnp.abs(z_new - z)), jnp.max(jnp.abs(Omega_new - Omega))
+            )
+            iteration_trace = iteration_trace.record(
+                i,
+                delta=delta,
+                ess=ess_lw(total_log_weights),
+                log_lik=log_lik,
+                step_time=step_timer(z_new, Omega_new),
+            )
 
-        return i + 1, z_new, Omega_new, z, Omega
+        return i + 1, z_new, Omega_new, z, Omega, iteration_trace
 
     _keep_going = lambda *args: jnp.logical_not(_break(*args))
 
-    n_iters, z, Omega, z_old, Omega_old = while_loop(
+    iteration_trace = IterationTrace.empty(n_iter) if trace else None
+    if trace:
+        step_timer(z_init, Omega_init)
+    n_iters, z, Omega, z_old, Omega_old, iteration_trace = while_loop(
         _keep_going,
         _iteration,
-        (0, z_init, Omega_init, jnp.empty_like(z_init), jnp.empty_like(Omega_init)),
+        (
+            0,
+            z_init,
+            Omega_init,
+            jnp.empty_like(z_init),
+            jnp.empty_like(Omega_init),
+            iteration_trace,
+        ),
     )
 
     proposal = GLSSMProposal(
@@ -152,6 +243,39 @@ def modified_efficient_importance_sampling(
         ),
         n_iter=n_iters,
         delta=jnp.max(jnp.array([delta_z, delta_Omega])),
+        trace=iteration_trace,
     )
 
     return proposal, information
+
+
+def modified_efficient_importance_sampling(
+    y: Float[Array, "n+1 p"],  # observations
+    model: PGSSM,  # model
+    z_init: Float[Array, "n+1 p"],  # initial z estimate
+    Omega_init: Float[Array, "n+1 p p"],  # initial Omega estimate
+    n_iter: int,  # number of iterations
+    N: int,  # number of samples
+    key: PRNGKeyArray,  # random key
+    eps: Float = 1e-5,  # convergence threshold
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
+    trace: bool = False,  # record per iteration diagnostics, see `IterationTrace`
+    structure=None,  # sparsity structure of the model, see `StateSpaceStructure`
+) -> tuple[GLSSMProposal, ConvergenceInformation]:
+    # the distribution is not an array, pass it as static argument
+    return _modified_efficient_importance_sampling(
+        y,
+        model._replace(dist=None),
+        z_init,
+        Omega_init,
+        key,
+        eps,
+        dist=model.dist,
+        n_iter=n_iter,
+        N=N,
+        antithetics=antithetics,
+        normal_variates=normal_variates,
+        trace=trace,
+        structure=structure,
+    )
@@ -0,0 +1,183 @@
+"""Fit many independent time series on a pool of worker processes"""
+
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/85_parallel.ipynb.
+
+# %% auto 0
+__all__ = ['worker_environment', 'Job', 'JobResult', 'run_jobs', 'mle_job', 'prediction_job']
+
+# %% ../../nbs/85_parallel.ipynb 3
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import Any, Callable, Hashable, Iterable, Iterator, NamedTuple
+
+# %% ../../nbs/85_parallel.ipynb 6
+def worker_environment(
+    threads_per_worker: int = 1,  # number of threads of a single worker
+) -> dict[str, str]:  # environment variables to set before `jax` is imported
+    """Environment variables that limit BLAS to `threads_per_worker` threads"""
+    if threads_per_worker < 1:
+        raise ValueError(
+            f"threads_per_worker has to be positive, got {threads_per_worker}"
+        )
+    # XLA has no flag for the size of its thread pool, which is the number of cores
+    # the process may run on, see `_pin_to_cores`
+    multi_thread = "true" if threads_per_worker > 1 else "false"
+    n_threads = str(threads_per_worker)
+    return {
+        "XLA_FLAGS": f"--xla_cpu_multi_thread_eigen={multi_thread}",
+        "OMP_NUM_THREADS": n_threads,
+        "OPENBLAS_NUM_THREADS": n_threads,
+        "MKL_NUM_THREADS": n_threads,
+    }
+
+
+def _pin_to_cores(index: int, threads_per_worker: int):
+    """pin the `index`-th worker to `threads_per_worker` cores of its own"""
+    cores = sorted(os.sched_getaffinity(0))
+    start = index * threads_per_worker
+    worker_cores = {cores[(start + i) % len(cores)] for i in range(threads_per_worker)}
+    os.sched_setaffinity(0, worker_cores)
+
+
+def _initialize_worker(threads_per_worker, worker_counter, cache_dir, enable_x64):
+    environment = worker_environment(threads_per_worker)
+    # keep flags of the parent, e.g. the number of host devices
+    environment["XLA_FLAGS"] = " ".join(
+        filter(None, (os.environ.get("XLA_FLAGS"), environment["XLA_FLAGS"]))
+    )
+    os.environ.update(environment)
+
+    if worker_counter is not None:
+        with worker_counter.get_lock():
+            index = worker_counter.value
+            worker_counter.value += 1
+        _pin_to_cores(index, threads_per_worker)
+
+    import jax
+
+    jax.config.update("jax_enable_x64", enable_x64)
+    if cache_dir is not None:
+        from isssm.compilation import enable_compilation_cache
+
+        enable_compilation_cache(cache_dir)
+
+# %% ../../nbs/85_parallel.ipynb 9
+class Job(NamedTuple):
+    name: Hashable  # identifies the job, e.g. the stratum
+    args: tuple = ()  # positional arguments of the job function
+    kwargs: dict | None = None  # keyword arguments of the job function
+
+
+class JobResult(NamedTuple):
+    name: Hashable  # name of the job
+    value: Any  # return value of the job function, None if it failed
+    error: str | None  # traceback if the job failed
+    run_time: float  # wall clock time in seconds, in the worker
+    pid: int  # process id of the worker
+
+
+def _run_job(fun: Callable, job: Job) -> JobResult:
+    start = time.perf_counter()
+    try:
+        value, error = fun(*job.args, **(job.kwargs or {})), None
+    except Exception:
+        value, error = None, traceback.format_exc()
+    return JobResult(job.name, value, error, time.perf_counter() - start, os.getpid())
+
+
+def run_jobs(
+    fun: Callable,  # module level job function, called as `fun(*job.args, **job.kwargs)`
+    jobs: Iterable[Job],  # jobs to run
+    n_workers: int | None = None,  # number of worker processes, defaults to all cores
+    threads_per_worker: int = 1,  # number of threads of every worker
+    pin_cores: bool = True,  # pin workers to their own cores, if supported
+    cache_dir: str
+    | None = None,  # share compiled kernels on disk, see `enable_compilation_cache`
+    enable_x64: bool = True,  # whether workers use double precision
+) -> Iterator[JobResult]:  # results, in the order the jobs finish
+    """Run jobs on a pool of worker processes and yield results as they finish"""
+    can_pin = hasattr(os, "sched_setaffinity")
+    if n_workers is None:
+        n_cores = len(os.sched_getaffinity(0)) if can_pin else os.cpu_count()
+        n_workers = max(1, n_cores // threads_per_worker)
+
+    context = get_context("spawn")
+    worker_counter = context.Value("i", 0) if pin_cores and can_pin else None
+    pool = ProcessPoolExecutor(
+        n_workers,
+        mp_context=context,
+        initializer=_initialize_worker,
+        initargs=(threads_per_worker, worker_counter, cache_dir, enable_x64),
+    )
+    try:
+        futures = [pool.submit(_run_job, fun, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # stop early if the caller does not consume all results
+        pool.shutdown(wait=True, cancel_futures=True)
+
+# %% ../../nbs/85_parallel.ipynb 11
+def mle_job(
+    y,  # observations $y_t$
+    model_fn,  # parameterized PGSSM, defined at module level
+    theta0,  # initial parameter guess
+    aux,  # auxiliary data for the model
+    n_iter_la: int,  # number of LA iterations
+    N: int,  # number of importance samples
+    key,  # random key
+    buckets: str | int | None = "pow2",  # see `bucket_length`, None to not pad
+    **kwargs,  # further arguments to `mle_pgssm`
+):  # result of the optimization
+    """`mle_pgssm` for a single series"""
+    from isssm.bucketing import bucketed_mle_pgssm
+    from isssm.estimation import mle_pgssm
+
+    if buckets is None:
+        return mle_pgssm(y, model_fn, theta0, aux, n_iter_la, N, key, **kwargs)
+    return bucketed_mle_pgssm(
+        y, model_fn, theta0, aux, n_iter_la, N, key, buckets, **kwargs
+    )
+
+
+def _future_observations(x, s, y_prime):
+    return y_prime
+
+
+def prediction_job(
+    y,  # observations $y_t$
+    model,  # model, its distribution defined at module level
+    n_iter: int,  # number of LA and MEIS iterations
+    N: int,  # number of importance samples
+    key,  # random key
+    probs,  # probabilities of the predictive quantiles
+    f: Callable | None = None,  # function to predict, defaults to the observations
+    prediction_model=None,  # model to predict with, defaults to `model`
+    buckets: str | int | None = "pow2",  # see `bucket_length`, None to not pad
+):  # mean, standard deviation and quantiles of f
+    """LA, MEIS and `prediction` for a single series"""
+    import jax.random as jrn
+    import numpy as np
+
+    from isssm.bucketing import (
+        bucketed_laplace_approximation,
+        bucketed_modified_efficient_importance_sampling,
+    )
+    from isssm.importance_sampling import prediction
+
+    if f is None:
+        f = _future_observations
+
+    buckets = {} if buckets is None else {"buckets": buckets}
+    proposal_la, _ = bucketed_laplace_approximation(y, model, n_iter, **buckets)
+    key, subkey = jrn.split(key)
+    proposal, _ = bucketed_modified_efficient_importance_sampling(
+        y, model, proposal_la.z, proposal_la.Omega, n_iter, N, subkey, **buckets
+    )
+    key, subkey = jrn.split(key)
+    result = prediction(f, y, proposal, model, N, subkey, probs, prediction_model)
+    # plain arrays are cheaper to send back to the driver
+    return np.asarray(result.mean), np.asarray(result.sd), np.asarray(result.quantiles)
@@ -0,0 +1,323 @@
+"""Sequential importance sampling with gaussian proposals"""
+
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/47_particle_filter.ipynb.
+
+# %% auto 0
+__all__ = ['ParticleFilterState', 'initial_state', 'systematic_resampling', 'GuidedStep', 'guided_steps', 'MarkovStep',
+           'markov_steps', 'ParticleFilterResult', 'particle_filter', 'assimilate']
+
+# %% ../../nbs/47_particle_filter.ipynb 3
+from typing import NamedTuple
+
+import jax
+import jax.numpy as jnp
+import jax.random as jrn
+import jax.scipy as jsp
+import jax.scipy.linalg as jsla
+from jax import lax, vmap
+from jax.scipy.special import logsumexp
+from jaxtyping import Array, Bool, Float, Int, PRNGKeyArray
+
+from .ce_method import transition_matrices
+from .importance_sampling import ess_lw
+from .pgssm import mask_missing, observation_log_prob
+from .typing import PGSSM, GLSSMProposal, MarkovProposal
+from .util import MVN_cholesky, append_to_front, compiled_kernel, degenerate_cholesky
+
+# %% ../../nbs/47_particle_filter.ipynb 6
+class ParticleFilterState(NamedTuple):
+    """particle approximation of the filtering distribution at a single time point"""
+
+    particles: Float[Array, "N m"]  # particles $X^i_t$
+    log_weights: Float[Array, "N"]  # normalized log weights $\log W^i_t$
+    log_lik: Float  # estimate of $\log p(y_0, \dots, y_t)$
+
+
+def initial_state(
+    N: int,  # number of particles
+    m: int,  # dimension of the states
+) -> ParticleFilterState:  # state before the first observation
+    """state of the particle filter before the first observation"""
+    return ParticleFilterState(
+        particles=jnp.zeros((N, m)),
+        log_weights=jnp.full(N, -jnp.log(N), dtype=jnp.result_type(float)),
+        log_lik=jnp.zeros(()),
+    )
+
+
+def systematic_resampling(
+    key: PRNGKeyArray,  # random key
+    log_weights: Float[Array, "N"],  # normalized log weights
+) -> Int[Array, "N"]:  # indices of the resampled particles
+    """Systematic resampling"""
+    (N,) = log_weights.shape
+    positions = (jrn.uniform(key) + jnp.arange(N)) / N
+    cumulative_weights = jnp.cumsum(jnp.exp(log_weights))
+    return jnp.minimum(jnp.searchsorted(cumulative_weights, positions), N - 1)
+
+
+def _resample_if_degenerate(key, particles, log_weights, ess_threshold):
+    (N,) = log_weights.shape
+    ess = ess_lw(log_weights)
+    resampled = ess < ess_threshold * N
+    ancestors = jnp.where(
+        resampled, systematic_resampling(key, log_weights), jnp.arange(N)
+    )
+    log_weights = jnp.where(resampled, -jnp.log(N), log_weights)
+    return particles[ancestors], log_weights, ess, resampled
+
+# %% ../../nbs/47_particle_filter.ipynb 9
+class GuidedStep(NamedTuple):
+    """operators of the locally optimal proposal of the surrogate model at time t"""
+
+    u: Float[Array, "m"]  # state bias
+    A: Float[Array, "m m"]  # transition matrix, zero for t = 0
+    K: Float[Array, "m p"]  # gain
+    L: Float[Array, "m m"]  # root of $\operatorname{Cov}(X_t| X_{t - 1}, Z_t)$
+    v: Float[Array, "p"]  # signal bias
+    B: Float[Array, "p m"]  # signal matrix
+    chol_S: Float[Array, "p p"]  # root of $\operatorname{Cov}(Z_t | X_{t - 1})$
+    chol_Omega: Float[Array, "p p"]  # root of $\Omega_t$
+    z: Float[Array, "p"]  # synthetic observation
+    xi: Float[Array, "p"]  # parameters of the observation distribution
+
+
+def _guided_operators(P, B, Omega):
+    S = B @ P @ B.T + Omega
+    chol_S = degenerate_cholesky(S)
+    # K = P B^T S^{-1}
+    K = jsla.cho_solve((chol_S, True), B @ P).T
+    L = degenerate_cholesky(P - K @ B @ P)
+    return K, L, chol_S, degenerate_cholesky(Omega)
+
+
+def guided_steps(
+    y: Float[Array, "n+1 p"],  # observations
+    model: PGSSM,  # model
+    proposal: GLSSMProposal,  # proposal, e.g. from LA or MEIS
+) -> GuidedStep:  # operators for all time points, time in the first dimension
+    """Precompute the locally optimal proposals of the surrogate model"""
+    u, A, D, Sigma0, Sigma, v, B, _, xi = mask_missing(y, model)
+    np1, m = u.shape
+
+    # covariances of X_t given X_{t - 1}, the initial covariance for t = 0
+    P = jnp.concatenate((Sigma0[None], D @ Sigma @ D.transpose((0, 2, 1))))
+    K, L, chol_S, chol_Omega = vmap(_guided_operators)(P, B, proposal.Omega)
+
+    return GuidedStep(
+        u=u,
+        A=append_to_front(jnp.zeros((m, m)), A),
+        K=K,
+        L=L,
+        v=v,
+        B=B,
+        chol_S=chol_S,
+        chol_Omega=chol_Omega,
+        z=proposal.z,
+        xi=xi,
+    )
+
+
+def _guided_step(state, y_t, step, key, *, dist, ess_threshold):
+    particles, log_weights, log_lik = state
+    N, m = particles.shape
+
+    # first stage weights, $g(z_t|x_{t - 1})$
+    x_pred = step.u + particles @ step.A.T
+    s_pred = step.v + x_pred @ step.B.T
+    first_stage = log_weights + MVN_cholesky(s_pred, step.chol_S).log_prob(step.z)
+    log_norm_first = logsumexp(first_stage)
+
+    key, subkey = jrn.split(key)
+    x_pred, log_weights, ess, resampled = _resample_if_degenerate(
+        subkey, x_pred, first_stage - log_norm_first, ess_threshold
+    )
+
+    # propagate with $g(x_t|x_{t - 1}, z_t)$
+    s_pred = step.v + x_pred @ step.B.T
+    nu = jrn.normal(key, (N, m))
+    x = x_pred + (step.z - s_pred) @ step.K.T + nu @ step.L.T
+
+    # second stage weights, $p(y_t|s_t) / g(z_t|s_t)$
+    s = step.v + x @ step.B.T
+    log_p = observation_log_prob(y_t, s, dist, step.xi).sum(axis=-1)
+    log_g = MVN_cholesky(s, step.chol_Omega).log_prob(step.z)
+    second_stage = log_weights + log_p - log_g
+    log_norm_second = logsumexp(second_stage)
+
+    new_state = ParticleFilterState(
+        particles=x,
+        log_weights=second_stage - log_norm_second,
+        log_lik=log_lik + log_norm_first + log_norm_second,
+    )
+    return new_state, (ess, resampled)
+
+# %% ../../nbs/47_particle_filter.ipynb 11
+class MarkovStep(NamedTuple):
+    """operators of a Markov proposal at time t"""
+
+    mean: Float[Array, "m"]  # mean of the proposal
+    mean_prev: Float[Array, "m"]  # mean of the proposal at time t - 1, zero for t = 0
+    C: Float[Array, "m m"]  # transition matrix of the proposal, zero for t = 0
+    R: Float[Array, "m m"]  # root of the innovation covariance of the proposal
+    u: Float[Array, "m"]  # state bias
+    A: Float[Array, "m m"]  # transition matrix, zero for t = 0
+    D: Float[Array, "m l"]  # noise embedding matrix, unused for t = 0
+    chol_Sigma: Float[Array, "l l"]  # root of the innovation covariance, unused for t = 0
+    chol_Sigma0: Float[Array, "m m"]  # root of the initial covariance
+    initial: Bool  # whether t = 0
+    v: Float[Array, "p"]  # signal bias
+    B: Float[Array, "p m"]  # signal matrix
+    xi: Float[Array, "p"]  # parameters of the observation distribution
+
+
+def markov_steps(
+    y: Float[Array, "n+1 p"],  # observations
+    model: PGSSM,  # model
+    proposal: MarkovProposal,  # proposal, e.g. from the CEM
+) -> MarkovStep:  # operators for all time points, time in the first dimension
+    """Precompute the transitions of a Markov proposal"""
+    u, A, D, Sigma0, Sigma, v, B, _, xi = mask_missing(y, model)
+    np1, m = u.shape
+
+    chol_Sigma = degenerate_cholesky(Sigma)
+    return MarkovStep(
+        mean=proposal.mean,
+        mean_prev=append_to_front(jnp.zeros(m), proposal.mean[:-1]),
+        C=append_to_front(jnp.zeros((m, m)), transition_matrices(proposal)),
+        R=proposal.R,
+        u=u,
+        A=append_to_front(jnp.zeros((m, m)), A),
+        D=append_to_front(D[0], D),
+        chol_Sigma=append_to_front(chol_Sigma[0], chol_Sigma),
+        chol_Sigma0=jnp.broadcast_to(degenerate_cholesky(Sigma0), (np1, m, m)),
+        initial=jnp.arange(np1) == 0,
+        v=v,
+        B=B,
+        xi=xi,
+    )
+
+
+def _markov_step(state, y_t, step, key, *, dist, ess_threshold):
+    particles, log_weights, log_lik = state
+    N, m = particles.shape
+    _, l = step.D.shape
+
+    key, subkey = jrn.split(key)
+    particles, log_weights, ess, resampled = _resample_if_degenerate(
+        subkey, particles, log_weights, ess_threshold
+    )
+
+    nu = jrn.normal(key, (N, m))
+    x = step.mean + (particles - step.mean_prev) @ step.C.T + nu @ step.R.T
+    log_det_R = jnp.log(jnp.diag(step.R)).sum()
+    log_g = jsp.stats.norm.logpdf(nu).sum(axis=-1) - log_det_R
+
+    eps = (x - step.u - particles @ step.A.T) @ step.D
+    log_p_x = jnp.where(
+        step.initial,
+        MVN_cholesky(step.u, step.chol_Sigma0).log_prob(x),
+        MVN_cholesky(jnp.zeros(l), step.chol_Sigma).log_prob(eps),
+    )
+    s = step.v + x @ step.B.T
+    log_p_y = observation_log_prob(y_t, s, dist, step.xi).sum(axis=-1)
+
+    new_log_weights = log_weights + log_p_x + log_p_y - log_g
+    log_norm = logsumexp(new_log_weights)
+
+    new_state = ParticleFilterState(
+        particles=x,
+        log_weights=new_log_weights - log_norm,
+        log_lik=log_lik + log_norm,
+    )
+    return new_state, (ess, resampled)
+
+# %% ../../nbs/47_particle_filter.ipynb 13
+class ParticleFilterResult(NamedTuple):
+    """particle approximations of all filtering distributions"""
+
+    particles: Float[Array, "n+1 N m"]  # particles at every time point
+    log_weights: Float[Array, "n+1 N"]  # normalized log weights
+    ess: Float[Array, "n+1"]  # effective sample size before resampling
+    resampled: Bool[Array, "n+1"]  # whether the particles were resampled
+    log_lik: Float  # estimate of $\log p(y)$
+
+
+def _step_function(step: GuidedStep | MarkovStep):
+    return _markov_step if isinstance(step, MarkovStep) else _guided_step
+
+
+@compiled_kernel(static_argnames=("dist", "N", "ess_threshold"))
+def _particle_filter(y, model, proposal, key, *, dist, N, ess_threshold):
+    model = model._replace(dist=dist)
+    if isinstance(proposal, MarkovProposal):
+        steps = markov_steps(y, model, proposal)
+    else:
+        steps = guided_steps(y, model, proposal)
+    step_function = _step_function(steps)
+
+    np1, m = steps.u.shape
+
+    def _iteration(state, inputs):
+        y_t, step, key = inputs
+        state, (ess, resampled) = step_function(
+            state, y_t, step, key, dist=dist, ess_threshold=ess_threshold
+        )
+        return state, (state.particles, state.log_weights, ess, resampled)
+
+    state, (particles, log_weights, ess, resampled) = lax.scan(
+        _iteration, initial_state(N, m), (y, steps, jrn.split(key, np1))
+    )
+    return ParticleFilterResult(particles, log_weights, ess, resampled, state.log_lik)
+
+
+def _check_finite(proposal: GLSSMProposal | MarkovProposal):
+    """raise if the proposal has non-finite entries, skipped when traced"""
+    leaves = jax.tree_util.tree_leaves(proposal)
+    if any(isinstance(leaf, jax.core.Tracer) for leaf in leaves):
+        return
+    if not all(jnp.isfinite(leaf).all() for leaf in leaves):
+        raise ValueError("proposal has non-finite entries, e.g. from a diverged CEM")
+
+
+def particle_filter(
+    y: Float[Array, "n+1 p"],  # observations
+    model: PGSSM,  # model
+    proposal: GLSSMProposal | MarkovProposal,  # proposal, e.g. from LA, MEIS or CEM
+    N: int,  # number of particles
+    key: PRNGKeyArray,  # random key
+    ess_threshold: float = 0.5,  # resample if the ESS drops below this fraction of N
+) -> ParticleFilterResult:  # filtering distributions and log-likelihood estimate
+    """Guided particle filter with a gaussian proposal"""
+    _check_finite(proposal)
+    # the distribution is not an array, pass it as static argument
+    return _particle_filter(
+        y,
+        model._replace(dist=None),
+        proposal,
+        key,
+        dist=model.dist,
+        N=N,
+        ess_threshold=ess_threshold,
+    )
+
+
+@compiled_kernel(static_argnames=("dist", "ess_threshold"))
+def _assimilate(state, y_t, step, key, *, dist, ess_threshold):
+    return _step_function(step)(
+        state, y_t, step, key, dist=dist, ess_threshold=ess_threshold
+    )
+
+
+def assimilate(
+    state: ParticleFilterState,  # state at time t - 1, see `initial_state`
+    y_t: Float[Array, "p"],  # observation at time t
+    step: GuidedStep | MarkovStep,  # operators at time t, see `guided_steps` and `markov_steps`
+    dist,  # observation distribution
+    key: PRNGKeyArray,  # random key
+    ess_threshold: float = 0.5,  # resample if the ESS drops below this fraction of N
+) -> tuple[
+    ParticleFilterState, tuple[Float, Bool]
+]:  # state at time t, ESS and whether the particles were resampled
+    """Assimilate a single observation"""
+    return _assimilate(state, y_t, step, key, dist=dist, ess_threshold=ess_threshold)
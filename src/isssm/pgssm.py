@@ -3,17 +3,14 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/20_pgssm.ipynb.
 
 # %% auto 0
-__all__ = ['simulate_pgssm', 'nb_pgssm_running_example', 'log_probs_y', 'log_prob']
+__all__ = ['missing_omega2', 'simulate_pgssm', 'nb_pgssm_running_example', 'missing_observations', 'mask_missing',
+           'observation_log_prob', 'log_probs_y', 'log_prob']
 
 # %% ../../nbs/20_pgssm.ipynb 5
 import jax.numpy as jnp
 import jax.random as jrn
 from jax import lax, vmap
 from jaxtyping import Array, Float, PRNGKeyArray
-from tensorflow_probability.substrates.jax.distributions import (
-    NegativeBinomial as NBinom,
-)
-from tensorflow_probability.substrates.jax.distributions import Poisson
 
 from .glssm import log_probs_x, simulate_states
 from .typing import PGSSM, GLSSMObservationModel, GLSSMState
@@ -76,7 +73,42 @@ def nb_pgssm_running_example(
     )
     return model
 
-# %% ../../nbs/20_pgssm.ipynb 12
+# %% ../../nbs/20_pgssm.ipynb 13
+from jaxtyping import Bool
+
+missing_omega2 = 1 / (2 * jnp.pi)
+
+
+def missing_observations(
+    y: Float[Array, "n+1 p"],  # observations, nan if missing
+) -> Bool[Array, "n+1 p"]:  # indicators of missing observations
+    return jnp.isnan(y)
+
+
+def mask_missing(
+    y: Float[Array, "n+1 p"],  # observations, nan if missing
+    model: PGSSM,  # the model
+) -> PGSSM:  # model whose signals are 0 where y is missing
+    """Remove the signal of missing observations from the model"""
+    missing = missing_observations(y)
+    return model._replace(
+        v=jnp.where(missing, 0.0, model.v),
+        B=jnp.where(missing[..., None], 0.0, model.B),
+    )
+
+
+def observation_log_prob(
+    y: Float[Array, "n+1 p"],  # observations, nan if missing
+    s: Float[Array, "... n+1 p"],  # signals
+    dist,  # observation distribution
+    xi: Float[Array, "n+1 p"],  # observation parameters
+) -> Float[Array, "... n+1 p"]:  # log densities $\log p(y^i_t|s^i_t)$, 0 if missing
+    """Observation log densities ignoring missing observations"""
+    missing = missing_observations(y)
+    log_p = dist(s, xi).log_prob(jnp.where(missing, 0.0, y))
+    return jnp.where(missing, 0.0, log_p)
+
+# %% ../../nbs/20_pgssm.ipynb 14
 from .typing import to_states
 
 
@@ -89,7 +121,7 @@ def log_probs_y(
     xi,  # observation parameters
 ):
     s = v + (B @ x[:, :, None])[:, :, 0]
-    return dist(s, xi).log_prob(y).sum(axis=1)
+    return observation_log_prob(y, s, dist, xi).sum(axis=1)
 
 
 def log_prob(
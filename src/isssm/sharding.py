@@ -0,0 +1,445 @@
+"""Distribute importance samples across devices"""
+
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/75_sharding.ipynb.
+
+# %% auto 0
+__all__ = ['SAMPLES', 'sample_mesh', 'sharded_logsumexp', 'sharded_normalize_weights', 'sharded_mc_integration',
+           'sharded_simulation_smoother', 'sharded_pgssm_importance_sampling',
+           'sharded_modified_efficient_importance_sampling', 'sharded_prediction']
+
+# %% ../../nbs/75_sharding.ipynb 3
+from functools import partial
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+import jax.random as jrn
+from jax import lax, vmap
+from jax.experimental.shard_map import shard_map
+from jax.lax import while_loop
+from jax.sharding import Mesh, NamedSharding
+from jax.sharding import PartitionSpec as P
+from jaxtyping import Array, Float, PRNGKeyArray
+
+from isssm.importance_sampling import (
+    PredictionResult,
+    _percentiles,
+    _prediction_samples,
+    _signal_log_weights,
+    _synthetic_log_prob,
+)
+from .kalman import _n_variates, _samples_from_variates
+from isssm.modified_efficient_importance_sampling import (
+    _normal_equations,
+    _normalize_observed_weights,
+    _solve_normal_equations,
+)
+from isssm.pgssm import (
+    mask_missing,
+    missing_observations,
+    missing_omega2,
+    observation_log_prob,
+)
+from isssm.typing import (
+    GLSSM,
+    PGSSM,
+    ConvergenceInformation,
+    GLSSMProposal,
+    prepare,
+    prepared_like,
+)
+from .util import compiled_kernel, converged, iid_normal
+
+# %% ../../nbs/75_sharding.ipynb 6
+SAMPLES = "samples"  # name of the mesh axis that samples are split along
+
+
+def sample_mesh(
+    devices=None,  # devices to use, defaults to all devices
+) -> Mesh:  # one dimensional mesh with axis `SAMPLES`
+    """Mesh that distributes samples across devices"""
+    if devices is None:
+        devices = jax.devices()
+    return Mesh(np.asarray(devices), (SAMPLES,))
+
+
+def _shard_map(fun, mesh, in_specs, out_specs):
+    # lax.cond, e.g. in the degenerate Cholesky decomposition, and lax.pmax, in
+    # `sharded_logsumexp`, have no replication rules in older versions of jax
+    return shard_map(fun, mesh, in_specs=in_specs, out_specs=out_specs, check_rep=False)
+
+
+def _check_divisible(N: int, mesh: Mesh):
+    n_devices = mesh.shape[SAMPLES]
+    if N % n_devices != 0:
+        raise ValueError(
+            f"N = {N} has to be a multiple of the number of devices, {n_devices}"
+        )
+
+# %% ../../nbs/75_sharding.ipynb 8
+def sharded_logsumexp(
+    log_weights: Float[Array, "N_local"],  # log weights of the local samples
+) -> Float:  # log-sum-exp of the log weights of all samples
+    """log-sum-exp across devices, use inside of `shard_map`"""
+    max_log_weight = lax.stop_gradient(lax.pmax(jnp.max(log_weights), SAMPLES))
+    local_sum = jnp.exp(log_weights - max_log_weight).sum()
+    return max_log_weight + jnp.log(lax.psum(local_sum, SAMPLES))
+
+
+def sharded_normalize_weights(
+    log_weights: Float[Array, "N_local"],  # log weights of the local samples
+) -> Float[Array, "N_local"]:  # weights normalized across all samples
+    """normalize weights across devices, use inside of `shard_map`"""
+    return jnp.exp(log_weights - sharded_logsumexp(log_weights))
+
+
+def sharded_mc_integration(
+    samples: Float[Array, "N_local ..."],  # local samples
+    log_weights: Float[Array, "N_local"],  # log weights of the local samples
+) -> Float[Array, "..."]:  # self-normalized importance sampling estimate
+    """weighted mean across devices, use inside of `shard_map`"""
+    weights = sharded_normalize_weights(log_weights)
+    return lax.psum(jnp.einsum("i...,i->...", samples, weights), SAMPLES)
+
+# %% ../../nbs/75_sharding.ipynb 11
+def _sharded_variates(key, N, k, mesh, normal_variates):
+    """draw standard normal variates for all samples, split across devices"""
+    u = normal_variates(key, N, k)
+    return lax.with_sharding_constraint(u, NamedSharding(mesh, P(SAMPLES)))
+
+
+@compiled_kernel(static_argnames=("N", "mesh", "antithetics", "normal_variates"))
+def _sharded_simulation_smoother(
+    model, y, key, *, N, mesh, antithetics, normal_variates
+):
+    key, subkey = jrn.split(key)
+    u = _sharded_variates(subkey, N, _n_variates(model), mesh, normal_variates)
+
+    return _shard_map(
+        partial(_samples_from_variates, antithetics=antithetics),
+        mesh,
+        in_specs=(P(), P(), P(SAMPLES)),
+        out_specs=P(SAMPLES),
+    )(model, y, u)
+
+
+def sharded_simulation_smoother(
+    model: GLSSM,  # model
+    y: Float[Array, "n+1 p"],  # observations
+    N: int,  # number of samples to draw, a multiple of the number of devices
+    key: PRNGKeyArray,  # random number seed
+    mesh: Mesh | None = None,  # mesh to distribute samples on, see `sample_mesh`
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
+) -> Float[Array, "N n+1 p"]:  # samples, split across devices
+    """`simulation_smoother` with samples split across devices"""
+    mesh = sample_mesh() if mesh is None else mesh
+    _check_divisible(N, mesh)
+    return _sharded_simulation_smoother(
+        model,
+        y,
+        key,
+        N=N,
+        mesh=mesh,
+        antithetics=antithetics,
+        normal_variates=normal_variates,
+    )
+
+# %% ../../nbs/75_sharding.ipynb 16
+@compiled_kernel(
+    static_argnames=("dist", "N", "mesh", "antithetics", "normal_variates")
+)
+def _sharded_importance_sampling(
+    y, model, z, Omega, key, *, dist, N, mesh, antithetics, normal_variates
+):
+    model = mask_missing(y, model._replace(dist=dist))
+    u, A, D, Sigma0, Sigma, v, B, _, xi = model
+    glssm = prepare(GLSSM(u, A, D, Sigma0, Sigma, v, B, Omega))
+
+    # same variates as `pgssm_importance_sampling`
+    key, subkey = jrn.split(key)
+    _, subkey = jrn.split(subkey)
+    variates = _sharded_variates(subkey, N, _n_variates(glssm), mesh, normal_variates)
+
+    def _local_samples(glssm, y, z, xi, variates):
+        s = _samples_from_variates(glssm, z, variates, antithetics)
+        return s, _signal_log_weights(s, y, dist, xi, z, glssm)
+
+    return _shard_map(
+        _local_samples,
+        mesh,
+        in_specs=(P(), P(), P(), P(), P(SAMPLES)),
+        out_specs=(P(SAMPLES), P(SAMPLES)),
+    )(glssm, y, z, xi, variates)
+
+
+def sharded_pgssm_importance_sampling(
+    y: Float[Array, "n+1 p"],  # observations
+    model: PGSSM,  # model
+    z: Float[Array, "n+1 p"],  # synthetic observations
+    Omega: Float[Array, "n+1 p p"],  # covariance of synthetic observations
+    N: int,  # number of samples, a multiple of the number of devices
+    key: PRNGKeyArray,  # random key
+    mesh: Mesh | None = None,  # mesh to distribute samples on, see `sample_mesh`
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
+) -> tuple[
+    Float[Array, "N n+1 p"], Float[Array, "N"]
+]:  # importance samples and log weights, split across devices
+    """`pgssm_importance_sampling` with samples split across devices"""
+    mesh = sample_mesh() if mesh is None else mesh
+    _check_divisible(N, mesh)
+    return _sharded_importance_sampling(
+        y,
+        model._replace(dist=None),
+        z,
+        Omega,
+        key,
+        dist=model.dist,
+        N=N,
+        mesh=mesh,
+        antithetics=antithetics,
+        normal_variates=normal_variates,
+    )
+
+# %% ../../nbs/75_sharding.ipynb 20
+@compiled_kernel(
+    static_argnames=("dist", "n_iter", "N", "mesh", "antithetics", "normal_variates")
+)
+def _sharded_modified_efficient_importance_sampling(
+    y,
+    model,
+    z_init,
+    Omega_init,
+    key,
+    eps,
+    *,
+    dist,
+    n_iter,
+    N,
+    mesh,
+    antithetics,
+    normal_variates
+):
+    model = prepare(mask_missing(y, model._replace(dist=dist)))
+    missing = missing_observations(y)
+    np1, p, m = model.B.shape
+
+    # common random numbers, same variates as `modified_efficient_importance_sampling`
+    key, crn_key = jrn.split(key)
+    _, subkey = jrn.split(crn_key)
+    variates = _sharded_variates(subkey, N, _n_variates(model), mesh, normal_variates)
+
+    def _local_normal_equations(glssm, z, y, xi, variates):
+        sim_signal = _samples_from_variates(glssm, z, variates, antithetics)
+        log_p = observation_log_prob(y, sim_signal, dist, xi).sum(axis=-1)
+        log_weights = log_p - _synthetic_log_prob(z, sim_signal, glssm)
+        unobserved = missing_observations(y).all(axis=-1)
+        weights = _normalize_observed_weights(log_weights, unobserved)
+        moments = vmap(_normal_equations, (1, 1, 1), 0)(sim_signal, weights, log_p)
+        return lax.psum(moments, SAMPLES)
+
+    normal_equations = _shard_map(
+        _local_normal_equations,
+        mesh,
+        in_specs=(P(), P(), P(), P(), P(SAMPLES)),
+        out_specs=P(),
+    )
+
+    def _break(val):
+        i, z, Omega, z_old, Omega_old = val
+
+        z_converged = jnp.logical_and(converged(z, z_old, eps), i > 0)
+        Omega_converged = jnp.logical_and(converged(Omega, Omega_old, eps), i > 0)
+        iteration_limit_reached = i >= n_iter
+
+        return jnp.logical_or(
+            jnp.logical_and(z_converged, Omega_converged), iteration_limit_reached
+        )
+
+    def _iteration(val):
+        i, z, Omega, _, _ = val
+        glssm_approx = prepared_like(
+            model,
+            GLSSM(
+                model.u,
+                model.A,
+                model.D,
+                model.Sigma0,
+                model.Sigma,
+                model.v,
+                model.B,
+                Omega,
+            ),
+        )
+
+        X_T_W_X, X_T_W_y = normal_equations(glssm_approx, z, y, model.xi, variates)
+        wls_estimate = vmap(_solve_normal_equations)(X_T_W_X, X_T_W_y, missing)
+
+        b = wls_estimate[:, 1 : (p + 1)]
+        c = wls_estimate[:, (p + 1) :]
+
+        z_new = jnp.where(missing, 0.0, b / c)
+        Omega_new = vmap(jnp.diag)(jnp.where(missing, missing_omega2, 1 / c))
+
+        return i + 1, z_new, Omega_new, z, Omega
+
+    _keep_going = lambda *args: jnp.logical_not(_break(*args))
+
+    n_iters, z, Omega, z_old, Omega_old = while_loop(
+        _keep_going,
+        _iteration,
+        (0, z_init, Omega_init, jnp.empty_like(z_init), jnp.empty_like(Omega_init)),
+    )
+
+    proposal = GLSSMProposal(
+        u=model.u,
+        A=model.A,
+        D=model.D,
+        Sigma0=model.Sigma0,
+        Sigma=model.Sigma,
+        v=model.v,
+        B=model.B,
+        Omega=Omega,
+        z=z,
+    )
+    delta_z = jnp.max(jnp.abs(z - z_old))
+    delta_Omega = jnp.max(jnp.abs(Omega - Omega_old))
+    information = ConvergenceInformation(
+        converged=jnp.logical_and(
+            converged(z, z_old, eps), converged(Omega, Omega_old, eps)
+        ),
+        n_iter=n_iters,
+        delta=jnp.maximum(delta_z, delta_Omega),
+    )
+    return proposal, information
+
+
+def sharded_modified_efficient_importance_sampling(
+    y: Float[Array, "n+1 p"],  # observations
+    model: PGSSM,  # model
+    z_init: Float[Array, "n+1 p"],  # initial z estimate
+    Omega_init: Float[Array, "n+1 p p"],  # initial Omega estimate
+    n_iter: int,  # number of iterations
+    N: int,  # number of samples, a multiple of the number of devices
+    key: PRNGKeyArray,  # random key
+    mesh: Mesh | None = None,  # mesh to distribute samples on, see `sample_mesh`
+    eps: Float = 1e-5,  # convergence threshold
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
+) -> tuple[GLSSMProposal, ConvergenceInformation]:
+    """`modified_efficient_importance_sampling` with samples split across devices"""
+    mesh = sample_mesh() if mesh is None else mesh
+    _check_divisible(N, mesh)
+    return _sharded_modified_efficient_importance_sampling(
+        y,
+        model._replace(dist=None),
+        z_init,
+        Omega_init,
+        key,
+        eps,
+        dist=model.dist,
+        n_iter=n_iter,
+        N=N,
+        mesh=mesh,
+        antithetics=antithetics,
+        normal_variates=normal_variates,
+    )
+
+# %% ../../nbs/75_sharding.ipynb 24
+@compiled_kernel(
+    static_argnames=(
+        "f",
+        "dist",
+        "prediction_dist",
+        "N",
+        "mesh",
+        "antithetics",
+        "normal_variates",
+    )
+)
+def _sharded_prediction(
+    y,
+    proposal,
+    model,
+    prediction_model,
+    key,
+    probs,
+    *,
+    f,
+    dist,
+    prediction_dist,
+    N,
+    mesh,
+    antithetics,
+    normal_variates
+):
+    key, subkey = jrn.split(key)
+    signal_samples, log_weights = _sharded_importance_sampling(
+        y,
+        model,
+        proposal.z,
+        proposal.Omega,
+        subkey,
+        dist=dist,
+        N=N,
+        mesh=mesh,
+        antithetics=antithetics,
+        normal_variates=normal_variates,
+    )
+
+    def _local_prediction(signal_samples, log_weights, proposal, prediction_model, key):
+        key = jrn.fold_in(key, lax.axis_index(SAMPLES))
+        prediction_model = prediction_model._replace(dist=prediction_dist)
+        f_samples = _prediction_samples(
+            f, signal_samples, proposal, prediction_model, key
+        )
+        mean_f = sharded_mc_integration(f_samples, log_weights)
+        sd_f = jnp.sqrt(
+            sharded_mc_integration(f_samples**2, log_weights) - mean_f**2
+        )
+        return f_samples, mean_f, sd_f
+
+    f_samples, mean_f, sd_f = _shard_map(
+        _local_prediction,
+        mesh,
+        in_specs=(P(SAMPLES), P(SAMPLES), P(), P(), P()),
+        out_specs=(P(SAMPLES), P(), P()),
+    )(signal_samples, log_weights, proposal, prediction_model, key)
+
+    return PredictionResult(mean_f, sd_f, _percentiles(f_samples, log_weights, probs))
+
+
+def sharded_prediction(
+    f: callable,  # function of states, signals and future observations to predict
+    y: Float[Array, "n+1 p"],  # observations
+    proposal: GLSSMProposal,  # proposal
+    model: PGSSM,  # model
+    N: int,  # number of samples, a multiple of the number of devices
+    key: PRNGKeyArray,  # random key
+    probs: Float[Array, "k"],  # probabilities of the quantiles
+    prediction_model: PGSSM | None = None,  # model to predict with, defaults to `model`
+    mesh: Mesh | None = None,  # mesh to distribute samples on, see `sample_mesh`
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
+) -> PredictionResult:  # mean, standard deviation and quantiles of f
+    """`prediction` with samples split across devices"""
+    if prediction_model is None:
+        prediction_model = model
+    mesh = sample_mesh() if mesh is None else mesh
+    _check_divisible(N, mesh)
+    return _sharded_prediction(
+        y,
+        proposal,
+        model._replace(dist=None),
+        prediction_model._replace(dist=None),
+        key,
+        probs,
+        f=f,
+        dist=model.dist,
+        prediction_dist=prediction_model.dist,
+        N=N,
+        mesh=mesh,
+        antithetics=antithetics,
+        normal_variates=normal_variates,
+    )
@@ -3,15 +3,20 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/99_typings.ipynb.
 
 # %% auto 0
-__all__ = ['InitialState', 'Observations', 'States', 'GLSSMState', 'GLSSMObservationModel', 'GLSSM', 'FilterResult',
-           'SmootherResult', 'PGSSM', 'to_states', 'to_observation_model', 'GLSSMProposal', 'to_glssm',
-           'ConvergenceInformation', 'MarkovProposal']
+__all__ = ['InitialState', 'Observations', 'States', 'COVARIANCES', 'GLSSMState', 'GLSSMObservationModel', 'GLSSM',
+           'FilterResult', 'SmootherResult', 'PGSSM', 'to_states', 'to_observation_model', 'GLSSMProposal', 'to_glssm',
+           'IterationTrace', 'ConvergenceInformation', 'MarkovProposal', 'PreparedModel', 'prepare', 'prepared_like']
 
 # %% ../../nbs/99_typings.ipynb 2
-from typing import NamedTuple
-import tensorflow_probability.substrates.jax.distributions as tfd
+from typing import TYPE_CHECKING, NamedTuple
+
+import jax.numpy as jnp
 from jaxtyping import Float, Array, Bool
 
+if TYPE_CHECKING:
+    # only for annotations, tfp is slow to import
+    import tensorflow_probability.substrates.jax.distributions as tfd
+
 # %% ../../nbs/99_typings.ipynb 3
 InitialState = Float[Array, "m"]
 Observations = Float[Array, "n+1 p"]
@@ -63,19 +68,20 @@ class PGSSM(NamedTuple):
     Sigma: Float[Array, "n l l"]
     v: Float[Array, "n+1 p"]
     B: Float[Array, "n+1 p m"]
-    dist: tfd.Distribution
+    dist: "tfd.Distribution"
     xi: Float[Array, "n+1 p"]
 
 
 def to_states(model: GLSSM | PGSSM) -> GLSSMState:
-    return GLSSMState(
+    states = GLSSMState(
         u=model.u, A=model.A, D=model.D, Sigma0=model.Sigma0, Sigma=model.Sigma
     )
+    return prepared_like(model, states)
 
 
 def to_observation_model(model: GLSSM) -> GLSSMObservationModel:
-    return GLSSMObservationModel(v=model.v, B=model.B, Omega=model.Omega)
-
+    observation_model = GLSSMObservationModel(v=model.v, B=model.B, Omega=model.Omega)
+    return prepared_like(model, observation_model)
 
 # %% ../../nbs/99_typings.ipynb 11
 class GLSSMProposal(NamedTuple):
@@ -91,7 +97,7 @@ class GLSSMProposal(NamedTuple):
 
 
 def to_glssm(proposal: GLSSMProposal) -> GLSSM:
-    return GLSSM(
+    glssm = GLSSM(
         proposal.u,
         proposal.A,
         proposal.D,
@@ -101,16 +107,138 @@ def to_glssm(proposal: GLSSMProposal) -> GLSSM:
         proposal.B,
         proposal.Omega,
     )
+    return prepared_like(proposal, glssm)
+
+
+class IterationTrace(NamedTuple):
+    """per iteration diagnostics, entries after the last iteration are NaN"""
+
+    delta: Float[Array, "n_iter"]  # maximal change of the parameters
+    ess: Float[Array, "n_iter"]  # effective sample size
+    log_lik: Float[Array, "n_iter"]  # estimate of the log-likelihood $\log p(y)$
+    step_time: Float[Array, "n_iter"]  # wall clock time in seconds
+
+    @classmethod
+    def empty(cls, n_iter: int) -> "IterationTrace":
+        nans = jnp.full(n_iter, jnp.nan, dtype=jnp.result_type(float))
+        return cls(nans, nans, nans, nans)
+
+    def record(self, i: int, **values: Float) -> "IterationTrace":
+        """set the entries of iteration i"""
+        return self._replace(
+            **{name: getattr(self, name).at[i].set(v) for name, v in values.items()}
+        )
 
 
 class ConvergenceInformation(NamedTuple):
     converged: Bool
     n_iter: int
     delta: Float
+    trace: IterationTrace | None = None  # only if requested
 
 # %% ../../nbs/99_typings.ipynb 13
-class MarkovProposal(NamedTuple):
+class _MarkovProposal(NamedTuple):
     mean: Float[Array, "n+1 m"]
     R: Float[Array, "n+1 m m"]
     J_tt: Float[Array, "n m m"]  # lower triangular
     J_tp1t: Float[Array, "n m m"]
+    C: Float[Array, "n m m"] | None = None  # transitions $J_{t + 1,t} J_{t,t}^{-1}$
+    log_det_R: Float | None = None  # $\sum_{t} \log \det R_t$
+
+
+class MarkovProposal(_MarkovProposal):
+    """Gaussian Markov proposal, `C` and `log_det_R` cache operators derived from it"""
+
+    __slots__ = ()
+
+    def _replace(self, **kwargs) -> "MarkovProposal":
+        """Replace fields, dropping cached operators that depend on changed fields"""
+        if "C" not in kwargs and ("J_tt" in kwargs or "J_tp1t" in kwargs):
+            kwargs["C"] = None
+        if "log_det_R" not in kwargs and "R" in kwargs:
+            kwargs["log_det_R"] = None
+        return super()._replace(**kwargs)
+
+# %% ../../nbs/99_typings.ipynb 15
+from jax.tree_util import register_pytree_node_class
+
+from .util import Factorization, factorize
+
+COVARIANCES = ("Sigma0", "Sigma", "Omega")
+
+
+@register_pytree_node_class
+class PreparedModel:
+    """A model together with factorizations of its covariance matrices"""
+
+    def __init__(
+        self,
+        model: GLSSM | PGSSM | GLSSMProposal | GLSSMState | GLSSMObservationModel,
+        factors: dict[str, Factorization] | None = None,  # known factorizations
+    ):
+        factors = {} if factors is None else factors
+        factors = {
+            name: factors[name] if name in factors else factorize(getattr(model, name))
+            for name in COVARIANCES
+            if name in model._fields
+        }
+        object.__setattr__(self, "model", model)
+        object.__setattr__(self, "factors", factors)
+
+    def __getattr__(self, name):
+        if name in ("model", "factors"):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("prepared models are immutable, use `_replace`")
+
+    def __iter__(self):
+        return iter(self.model)
+
+    def __len__(self):
+        return len(self.model)
+
+    def __getitem__(self, i):
+        return self.model[i]
+
+    def __repr__(self):
+        return f"PreparedModel({self.model!r})"
+
+    def _replace(self, **kwargs) -> "PreparedModel":
+        """Replace fields, recomputing factorizations of changed covariance matrices"""
+        factors = {k: v for k, v in self.factors.items() if k not in kwargs}
+        return PreparedModel(self.model._replace(**kwargs), factors)
+
+    def tree_flatten(self):
+        return (self.model, self.factors), None
+
+    @classmethod
+    def tree_unflatten(cls, aux_data, children):
+        prepared = object.__new__(cls)
+        model, factors = children
+        object.__setattr__(prepared, "model", model)
+        object.__setattr__(prepared, "factors", factors)
+        return prepared
+
+
+def prepare(model) -> PreparedModel:
+    """Factorize the covariance matrices of `model`, prepared models are returned as is"""
+    if isinstance(model, PreparedModel):
+        return model
+    return PreparedModel(model)
+
+
+def prepared_like(
+    source,  # (prepared) model
+    model,  # model derived from `source`
+):
+    """Prepare `model` if `source` is prepared, reusing factorizations of shared covariance matrices"""
+    if not isinstance(source, PreparedModel):
+        return model
+    factors = {
+        name: factor
+        for name, factor in source.factors.items()
+        if name in model._fields and getattr(model, name) is getattr(source, name)
+    }
+    return PreparedModel(model, factors)
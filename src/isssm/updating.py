@@ -0,0 +1,195 @@
+"""Warm start LA and MEIS when new observations arrive"""
+
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/55_updating.ipynb.
+
+# %% auto 0
+__all__ = ['shift_proposal', 'update_laplace_approximation', 'update_modified_efficient_importance_sampling']
+
+# %% ../../nbs/55_updating.ipynb 3
+from functools import partial
+
+import jax.numpy as jnp
+from jax import jacfwd, jacrev
+from jaxtyping import Array, Float, PRNGKeyArray
+
+from .bucketing import _OBSERVATION_FIELDS, _TRANSITION_FIELDS
+from .kalman import kalman
+from isssm.laplace_approximation import (
+    _default_log_lik,
+    _initial_guess,
+    _pseudo_observations,
+    default_link,
+    laplace_approximation,
+    posterior_mode,
+    vvmap,
+)
+from isssm.modified_efficient_importance_sampling import (
+    modified_efficient_importance_sampling,
+)
+from .pgssm import mask_missing, missing_observations
+from .typing import PGSSM, ConvergenceInformation, GLSSMProposal, to_glssm
+from .util import iid_normal
+
+# %% ../../nbs/55_updating.ipynb 6
+def _initial_pseudo_observations(y, xi, dist, link):
+    missing = missing_observations(y)
+    y = jnp.where(missing, 0.0, y)
+    s = vvmap(partial(_initial_guess, dist=dist, link=link))(xi, y)
+    s = jnp.where(missing, 0.0, s)
+
+    d_log_lik = jacfwd(partial(_default_log_lik, dist=dist), argnums=0)
+    dd_log_lik = jacrev(d_log_lik, argnums=0)
+    return _pseudo_observations(s, xi, y, missing, vvmap(d_log_lik), vvmap(dd_log_lik))
+
+
+def shift_proposal(
+    proposal: GLSSMProposal,  # previous proposal
+    y: Float[Array, "n+1 p"],  # new observations
+    model: PGSSM,  # model of the new observations
+    shift: int = 0,  # number of time points dropped at the start of the series
+    link=default_link,  # link for the initial guess of new time points
+) -> GLSSMProposal:  # proposal for the new observations
+    """Align a previous proposal with a shifted and extended time series"""
+    if shift < 0:
+        raise ValueError(f"shift has to be non-negative, got {shift}")
+    np1_old, p = proposal.z.shape
+    np1, _ = y.shape
+    n_kept = max(min(np1, np1_old - shift), 0)
+
+    model = mask_missing(y, model)
+    if n_kept < np1:
+        z_new, Omega_new = _initial_pseudo_observations(
+            y[n_kept:], model.xi[n_kept:], model.dist, link
+        )
+    else:
+        z_new, Omega_new = jnp.empty((0, p)), jnp.empty((0, p, p))
+
+    z = jnp.concatenate((proposal.z[shift : shift + n_kept], z_new))
+    Omega = jnp.concatenate((proposal.Omega[shift : shift + n_kept], Omega_new))
+    return GLSSMProposal(*model[:7], Omega=Omega, z=z)
+
+# %% ../../nbs/55_updating.ipynb 11
+def _head(model, np1: int):
+    """time points 0, ..., np1 - 1 of a model"""
+    return model._replace(
+        **{
+            name: getattr(model, name)[: np1 - (name in _TRANSITION_FIELDS)]
+            for name in _OBSERVATION_FIELDS + _TRANSITION_FIELDS
+            if name in model._fields
+        }
+    )
+
+
+def _time_slice(model, start: int):
+    """time points start, ..., n of a model"""
+    return model._replace(
+        **{
+            name: getattr(model, name)[start:]
+            for name in _OBSERVATION_FIELDS + _TRANSITION_FIELDS
+            if name in model._fields
+        }
+    )
+
+
+def _window_model(
+    model: PGSSM,  # model, with missing observations masked
+    proposal: GLSSMProposal,  # proposal, kept fixed before the window
+    start: int,  # first time point of the window
+) -> PGSSM:  # model of the time points in the window
+    glssm = to_glssm(proposal)
+    x_filt, Xi_filt, _, _ = kalman(proposal.z[:start], _head(glssm, start))
+
+    # predict the state at the start of the window
+    A, D, Sigma = glssm.A[start - 1], glssm.D[start - 1], glssm.Sigma[start - 1]
+    x0 = glssm.u[start] + A @ x_filt[-1]
+    Sigma0 = A @ Xi_filt[-1] @ A.T + D @ Sigma @ D.T
+
+    window_model = _time_slice(model, start)
+    return window_model._replace(u=window_model.u.at[0].set(x0), Sigma0=Sigma0)
+
+
+def _join_window(
+    proposal: GLSSMProposal,  # proposal for the whole series
+    window_proposal: GLSSMProposal,  # proposal for the window
+    start: int,  # first time point of the window
+) -> GLSSMProposal:  # proposal for the whole series with the window replaced
+    return proposal._replace(
+        z=jnp.concatenate((proposal.z[:start], window_proposal.z)),
+        Omega=jnp.concatenate((proposal.Omega[:start], window_proposal.Omega)),
+    )
+
+
+def _window_start(np1: int, window: int | None) -> int:
+    if window is None:
+        return 0
+    if window < 1:
+        raise ValueError(f"window has to be positive, got {window}")
+    return max(np1 - window, 0)
+
+# %% ../../nbs/55_updating.ipynb 13
+def update_laplace_approximation(
+    y: Float[Array, "n+1 p"],  # new observations
+    model: PGSSM,  # model of the new observations
+    proposal: GLSSMProposal,  # previous proposal
+    n_iter: int,  # number of iterations
+    shift: int = 0,  # number of time points dropped at the start of the series
+    window: int | None = None,  # only update the last `window` time points, all if None
+    eps: Float = 1e-5,  # precision of iterations
+    link=default_link,  # link for the initial guess of new time points
+) -> tuple[GLSSMProposal, ConvergenceInformation]:
+    """Laplace approximation started from a previous proposal"""
+    initial = shift_proposal(proposal, y, model, shift, link)
+    start = _window_start(y.shape[0], window)
+    if start == 0:
+        return laplace_approximation(
+            y, model, n_iter, eps=eps, link=link, s_init=posterior_mode(initial)
+        )
+
+    window_model = _window_model(mask_missing(y, model), initial, start)
+    window_initial = GLSSMProposal(
+        *window_model[:7], Omega=initial.Omega[start:], z=initial.z[start:]
+    )
+    window_proposal, information = laplace_approximation(
+        y[start:],
+        window_model,
+        n_iter,
+        eps=eps,
+        link=link,
+        s_init=posterior_mode(window_initial),
+    )
+    return _join_window(initial, window_proposal, start), information
+
+
+def update_modified_efficient_importance_sampling(
+    y: Float[Array, "n+1 p"],  # new observations
+    model: PGSSM,  # model of the new observations
+    proposal: GLSSMProposal,  # previous proposal
+    n_iter: int,  # number of iterations
+    N: int,  # number of samples
+    key: PRNGKeyArray,  # random key
+    shift: int = 0,  # number of time points dropped at the start of the series
+    window: int | None = None,  # only update the last `window` time points, all if None
+    eps: Float = 1e-5,  # convergence threshold
+    antithetics: str = "all",  # antithetic variables to use, see `apply_antithetics`
+    normal_variates=iid_normal,  # source of standard normal variates, see `iid_normal`
+    link=default_link,  # link for the initial guess of new time points
+) -> tuple[GLSSMProposal, ConvergenceInformation]:
+    """MEIS started from a previous proposal"""
+    initial = shift_proposal(proposal, y, model, shift, link)
+    start = _window_start(y.shape[0], window)
+    if start > 0:
+        model = _window_model(mask_missing(y, model), initial, start)
+
+    window_proposal, information = modified_efficient_importance_sampling(
+        y[start:],
+        model,
+        initial.z[start:],
+        initial.Omega[start:],
+        n_iter,
+        N,
+        key,
+        eps,
+        antithetics,
+        normal_variates,
+    )
+    return _join_window(initial, window_proposal, start), information
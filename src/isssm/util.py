@@ -1,24 +1,24 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/99_util.ipynb.
 
 # %% auto 0
-__all__ = ['LOFM', 'LOLT', 'mm_sim', 'mm_time', 'mm_time_sim', 'degenerate_cholesky', 'MVN_degenerate', 'converged',
-           'append_to_front', 'location_antithetic', 'scale_antithethic']
+__all__ = ['kernel_cache', 'mm_sim', 'mm_time', 'mm_time_sim', 'ANTITHETICS', 'degenerate_cholesky', 'CholeskyMVN',
+           'MVN_degenerate', 'Factorization', 'factorize', 'cached_factor', 'MVN_cholesky', 'KernelCacheInfo',
+           'KernelCache', 'compiled_kernel', 'converged', 'step_timer', 'append_to_front', 'location_antithetic',
+           'scale_antithethic', 'n_antithetic_samples', 'apply_antithetics', 'iid_normal', 'sobol_normal',
+           'lattice_normal']
 
 # %% ../../nbs/99_util.ipynb 2
 import jax.numpy as jnp
-from jax import vmap
+import jax.random as jrn
+from jax import lax, vmap
 from jaxtyping import Array, Float, Bool
-import tensorflow_probability.substrates.jax as tfp
-from tensorflow_probability.substrates.jax.distributions import (
-    MultivariateNormalLinearOperator as MVNLO,
-)
 
 # %% ../../nbs/99_util.ipynb 6
-LOFM = tfp.tf2jax.linalg.LinearOperatorFullMatrix
-LOLT = tfp.tf2jax.linalg.LinearOperatorLowerTriangular
+from functools import partial
+from typing import NamedTuple
 
 
-def degenerate_cholesky(Sigma):
+def _eigh_qr_cholesky(Sigma):
     evals, evecs = jnp.linalg.eigh(Sigma)
     # transpose for QR
     # ensure positive eigenvalues
@@ -30,13 +30,214 @@ def degenerate_cholesky(Sigma):
     return L
 
 
-def MVN_degenerate(
-    loc: Array, cov: Array
-) -> tfp.distributions.MultivariateNormalLinearOperator:
+def degenerate_cholesky(
+    Sigma: Float[Array, "... m m"],  # (batch of) covariance matrices
+) -> Float[Array, "... m m"]:  # lower triangular roots $L$ with $LL^T = \Sigma$
+    """Cholesky root of possibly singular covariance matrices"""
+    L = jnp.linalg.cholesky(Sigma)
+
+    *_, m = Sigma.shape
+    scale = jnp.max(jnp.abs(Sigma), axis=(-2, -1))
+    tolerance = 100 * m * jnp.finfo(L.dtype).eps * scale
+    reconstruction_error = jnp.max(
+        jnp.abs(L @ L.swapaxes(-1, -2) - Sigma), axis=(-2, -1)
+    )
+    is_valid = jnp.logical_and(
+        jnp.all(jnp.isfinite(L), axis=(-2, -1)), reconstruction_error <= tolerance
+    )
+
+    def fallback(Sigma):
+        # choose per matrix, the matrices handled by the other decomposition are
+        # replaced by well conditioned ones to keep the gradients finite
+        valid = is_valid[..., None, None]
+        well_conditioned = jnp.diag(jnp.arange(1, m + 1, dtype=Sigma.dtype))
+        L_chol = jnp.linalg.cholesky(jnp.where(valid, Sigma, well_conditioned))
+        L_eigh = _eigh_qr_cholesky(jnp.where(valid, well_conditioned, Sigma))
+        return jnp.where(valid, L_chol, L_eigh)
+
+    return lax.cond(jnp.all(is_valid), lambda Sigma: L, fallback, Sigma)
+
+
+class CholeskyMVN(NamedTuple):
+    """Multivariate normal distribution with covariance $LL^T$"""
+
+    loc: Float[Array, "... k"]  # mean
+    scale_tril: Float[Array, "... k k"]  # lower triangular root $L$ of the covariance
+
+    def log_prob(self, x: Float[Array, "... k"]) -> Float[Array, "..."]:
+        *_, k = self.loc.shape
+        solve = partial(lax.linalg.triangular_solve, lower=True, transpose_a=True)
+        w = jnp.vectorize(solve, signature="(k,k),(k)->(k)")(
+            self.scale_tril, x - self.loc
+        )
+        log_det = jnp.log(jnp.abs(jnp.diagonal(self.scale_tril, axis1=-2, axis2=-1)))
+        return (
+            -0.5 * jnp.sum(w**2, axis=-1)
+            - log_det.sum(axis=-1)
+            - k / 2 * jnp.log(2 * jnp.pi)
+        )
+
+    def sample(self, sample_shape=(), seed=None) -> Float[Array, "... k"]:
+        batch_shape = jnp.broadcast_shapes(
+            self.loc.shape[:-1], self.scale_tril.shape[:-2]
+        )
+        *_, k = self.loc.shape
+        shape = tuple(sample_shape) + batch_shape + (k,)
+        z = jrn.normal(seed, shape, jnp.result_type(self.scale_tril, float))
+        return self.loc + jnp.einsum("...ij,...j->...i", self.scale_tril, z)
+
+
+def MVN_degenerate(loc: Array, cov: Array) -> CholeskyMVN:
     L = degenerate_cholesky(cov)
-    return MVNLO(loc=loc, scale=LOLT(L))
+    return CholeskyMVN(loc, L)
+
+# %% ../../nbs/99_util.ipynb 12
+from typing import NamedTuple
+
+
+class Factorization(NamedTuple):
+    chol: Float[Array, "... k k"]  # lower triangular roots
+    log_det: Float[Array, "..."]  # log-determinants, -inf for singular matrices
+    inv: Float[Array, "... k k"]  # pseudo-inverses
+
+
+def _log_det(L: Float[Array, "... k k"]) -> Float[Array, "..."]:
+    return 2 * jnp.log(jnp.diagonal(L, axis1=-2, axis2=-1)).sum(axis=-1)
+
+
+def factorize(
+    Sigma: Float[Array, "... k k"],  # (batch of) covariance matrices
+) -> Factorization:  # Cholesky roots, log-determinants and inverses
+    """Factorize (possibly singular) covariance matrices"""
+    L = degenerate_cholesky(Sigma)
+    return Factorization(L, _log_det(L), jnp.linalg.pinv(Sigma, hermitian=True))
+
+
+def cached_factor(
+    model,  # (prepared) model
+    name: str,  # name of the covariance matrix, e.g. "Sigma"
+    kind: str = "chol",  # one of "chol", "log_det" or "inv"
+) -> Float[Array, "..."]:  # the requested factor
+    """Factor of a covariance matrix of `model`, taken from the cache if `model` is prepared"""
+    factors = getattr(model, "factors", None)
+    if factors is not None and name in factors:
+        return getattr(factors[name], kind)
+
+    L = degenerate_cholesky(getattr(model, name))
+    if kind == "chol":
+        return L
+    if kind == "log_det":
+        return _log_det(L)
+    if kind == "inv":
+        return jnp.linalg.pinv(getattr(model, name), hermitian=True)
+    raise ValueError(f"Unknown factor {kind}, expected 'chol', 'log_det' or 'inv'")
+
+
+def MVN_cholesky(loc: Array, L: Array) -> CholeskyMVN:
+    """Multivariate normal distribution from a (precomputed) Cholesky root"""
+    return CholeskyMVN(loc, L)
+
+# %% ../../nbs/99_util.ipynb 15
+from functools import partial, wraps
+
+import jax
+from jax.tree_util import tree_flatten
+
+
+class KernelCacheInfo(NamedTuple):
+    hits: int  # number of calls that reused a compiled kernel
+    misses: int  # number of compilations
+    size: int  # number of compiled kernels
+
+
+def _abstract_signature(leaf):
+    weak_type = getattr(
+        leaf, "weak_type", isinstance(leaf, (bool, int, float, complex))
+    )
+    return jnp.shape(leaf), jnp.result_type(leaf), weak_type
+
+
+def _strongly_typed(leaf):
+    # weakly typed arrays, e.g. from `jnp.full(shape, 1.0)`, would compile separately
+    if getattr(leaf, "weak_type", False) and jnp.ndim(leaf) > 0:
+        return jax.lax.convert_element_type(leaf, leaf.dtype)
+    return leaf
+
+
+class KernelCache:
+    """Cache of compiled kernels with statistics of hits and misses"""
+
+    def __init__(self):
+        self._compiled = {}
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> KernelCacheInfo:
+        return KernelCacheInfo(self.hits, self.misses, len(self._compiled))
+
+    def clear(self):
+        self._compiled.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def kernel(
+        self,
+        fun,  # function to compile
+        static_argnames: tuple[str, ...] = (),  # keyword arguments to treat as static
+    ):
+        """Compile `fun` once per static configuration and argument shapes"""
+        jitted = jax.jit(fun, static_argnames=static_argnames)
+
+        def lookup(args, kwargs, static):
+            leaves, treedef = tree_flatten((args, kwargs))
+            key = (
+                fun,
+                tuple(sorted(static.items())),
+                treedef,
+                tuple(_abstract_signature(leaf) for leaf in leaves),
+            )
+            if key in self._compiled:
+                self.hits += 1
+            else:
+                self.misses += 1
+                lowered = jitted.lower(*args, **kwargs, **static)
+                self._compiled[key] = lowered.compile()
+            return self._compiled[key]
+
+        @wraps(fun)
+        def compiled_fun(*args, **kwargs):
+            static = {k: kwargs.pop(k) for k in static_argnames if k in kwargs}
+            leaves = jax.tree_util.tree_leaves((args, kwargs))
+            if any(isinstance(leaf, jax.core.Tracer) for leaf in leaves):
+                return jitted(*args, **kwargs, **static)
+            args, kwargs = jax.tree_util.tree_map(_strongly_typed, (args, kwargs))
+            return lookup(args, kwargs, static)(*args, **kwargs)
+
+        def precompile(*args, **kwargs):
+            """Compile for the given arguments without executing the kernel"""
+            static = {k: kwargs.pop(k) for k in static_argnames if k in kwargs}
+            args, kwargs = jax.tree_util.tree_map(_strongly_typed, (args, kwargs))
+            return lookup(args, kwargs, static)
+
+        compiled_fun.jitted = jitted
+        compiled_fun.precompile = precompile
+        return compiled_fun
+
 
-# %% ../../nbs/99_util.ipynb 10
+kernel_cache = KernelCache()
+
+
+def compiled_kernel(
+    fun=None,  # function to compile
+    *,
+    static_argnames: tuple[str, ...] = (),  # keyword arguments to treat as static
+):
+    """Decorator registering `fun` as a kernel in `kernel_cache`"""
+    if fun is None:
+        return partial(compiled_kernel, static_argnames=static_argnames)
+    return kernel_cache.kernel(fun, static_argnames)
+
+# %% ../../nbs/99_util.ipynb 18
 def converged(
     new: Float[Array, "..."],  # the new array
     old: Float[Array, "..."],  # the old array
@@ -54,7 +255,30 @@ def converged(
     any_nans = jnp.isnan(new).sum() > 0
     return jnp.logical_or(is_close, any_nans)
 
-# %% ../../nbs/99_util.ipynb 13
+# %% ../../nbs/99_util.ipynb 20
+import time
+
+import numpy as np
+
+from jax.experimental import io_callback
+
+_last_step = [time.perf_counter()]
+
+
+def _elapsed_since_last_step(*_dependencies) -> np.ndarray:
+    now = time.perf_counter()
+    elapsed, _last_step[0] = now - _last_step[0], now
+    return np.asarray(elapsed, dtype=jnp.result_type(float))
+
+
+def step_timer(
+    *dependencies: Array,  # arrays that have to be computed before the time is taken
+) -> Float:  # seconds since the previous call
+    """wall clock time since the previous call, usable inside of jit"""
+    shape = jax.ShapeDtypeStruct((), jnp.result_type(float))
+    return io_callback(_elapsed_since_last_step, shape, *dependencies, ordered=True)
+
+# %% ../../nbs/99_util.ipynb 24
 # multiply $B_t$ and $X^i_t$
 mm_sim = vmap(jnp.matmul, (None, 0))
 # matmul with $(B_t)_{t}$ and $(X_t)_{t}$
@@ -62,14 +286,11 @@ mm_time = vmap(jnp.matmul, (0, 0))
 # matmul with $(B_t)_{t}$ and $(X^i_t)_{i,t}$
 mm_time_sim = vmap(mm_time, (None, 0))
 
-# %% ../../nbs/99_util.ipynb 16
+# %% ../../nbs/99_util.ipynb 27
 def append_to_front(a0: Float[Array, "..."], a: Float[Array, "n ..."]):
     return jnp.concatenate([a0[None], a], axis=0)
 
-# %% ../../nbs/99_util.ipynb 19
-from tensorflow_probability.substrates.jax.distributions import Chi2
-
-
+# %% ../../nbs/99_util.ipynb 30
 def location_antithetic(samples: Float[Array, "N ..."], mean: Float[Array, "N ..."]):
     return 2 * mean[None] - samples
 
@@ -80,6 +301,9 @@ def scale_antithethic(
     mean: Float[Array, "n+1 p"],
 ):
 
+    # tfp is only loaded once scale antithetics are used
+    from tensorflow_probability.substrates.jax.distributions import Chi2
+
     N, l = u.shape
     # ensure dtype is Float64
     chi_dist = Chi2(l * jnp.ones(1))
@@ -88,3 +312,127 @@ def scale_antithethic(
     c_prime = chi_dist.quantile(1.0 - chi_dist.cdf(c))
 
     return mean[None] + jnp.sqrt(c_prime / c)[:, None, None] * (samples - mean[None])
+
+# %% ../../nbs/99_util.ipynb 32
+ANTITHETICS = {"none": 1, "location": 2, "scale": 2, "all": 4}
+
+
+def n_antithetic_samples(
+    N: int,  # number of independent draws
+    antithetics: str = "all",  # one of "none", "location", "scale" or "all"
+) -> int:  # number of samples including antithetic variables
+    """Number of samples obtained from N draws with the given antithetic variables"""
+    if antithetics not in ANTITHETICS:
+        raise ValueError(
+            f"antithetics has to be one of {tuple(ANTITHETICS)}, got {antithetics!r}"
+        )
+    return ANTITHETICS[antithetics] * N
+
+
+def apply_antithetics(
+    u: Float[Array, "N k"],  # standard normal variates used to generate samples
+    samples: Float[Array, "N n+1 p"],  # samples
+    mean: Float[Array, "n+1 p"],  # mean of the sampling distribution
+    antithetics: str = "all",  # one of "none", "location", "scale" or "all"
+) -> Float[Array, "M n+1 p"]:  # samples followed by their antithetic variables
+    """Append the chosen antithetic variables to samples"""
+    n_antithetic_samples(1, antithetics)
+
+    if antithetics == "none":
+        return samples
+
+    if antithetics == "location":
+        return jnp.concatenate((samples, location_antithetic(samples, mean)), axis=0)
+
+    if antithetics == "scale":
+        return jnp.concatenate((samples, scale_antithethic(u, samples, mean)), axis=0)
+
+    l_samples = location_antithetic(samples, mean)
+    s_samples = scale_antithethic(u, samples, mean)
+    ls_samples = scale_antithethic(u, l_samples, mean)
+
+    return jnp.concatenate((samples, l_samples, s_samples, ls_samples), axis=0)
+
+# %% ../../nbs/99_util.ipynb 35
+import numpy as np
+import jax.random as jrn
+from jax.scipy.special import ndtri
+from jaxtyping import PRNGKeyArray
+
+
+def iid_normal(
+    key: PRNGKeyArray,  # random key
+    N: int,  # number of samples
+    d: int,  # dimension
+) -> Float[Array, "N d"]:  # N independent standard normal vectors
+    """Independent standard normal variates"""
+    return jrn.normal(key, (N, d))
+
+
+def _uniform_to_normal(uniform: Float[Array, "..."]) -> Float[Array, "..."]:
+    """inverse normal CDF, uniforms are clipped away from 0 and 1"""
+    eps = jnp.finfo(uniform.dtype).eps
+    return ndtri(jnp.clip(uniform, eps, 1.0 - eps))
+
+
+def _reverse_bits(x: Array) -> Array:
+    """reverse the bits of unsigned 32 bit integers"""
+    for shift, mask in [
+        (1, 0x55555555),
+        (2, 0x33333333),
+        (4, 0x0F0F0F0F),
+        (8, 0x00FF00FF),
+    ]:
+        mask = jnp.uint32(mask)
+        x = ((x >> shift) & mask) | ((x & mask) << shift)
+    return (x >> 16) | (x << 16)
+
+
+def _nested_uniform_scramble(x: Array, seed: Array) -> Array:
+    """hash based Owen scrambling of unsigned 32 bit integers [@Burley2020Practical]"""
+    # the Laine-Karras permutation flips every bit depending on the less
+    # significant ones, i.e. on the more significant ones after reversing
+    x = _reverse_bits(x) + seed
+    for factor in [0x6C50B47C, 0xB82F1E52, 0xC7AFE638, 0x8D22F6E6]:
+        x = x ^ (x * jnp.uint32(factor))
+    return _reverse_bits(x)
+
+
+def sobol_normal(
+    key: PRNGKeyArray,  # random key, determines the scrambling
+    N: int,  # number of samples, ideally a power of 2
+    d: int,  # dimension
+) -> Float[Array, "N d"]:  # N randomized QMC standard normal vectors
+    """Standard normal variates from a scrambled Sobol' sequence"""
+    # scipy is imported lazily, as it is only needed for QMC
+    from scipy.stats import qmc
+
+    points = qmc.Sobol(d, scramble=False, bits=32).random(N)
+    integers = jnp.asarray(np.ldexp(points, 32).astype(np.uint32))
+    seeds = jrn.bits(key, (d,), dtype=jnp.uint32)
+    scrambled = _nested_uniform_scramble(integers, seeds[None])
+    # midpoints of dyadic intervals
+    return _uniform_to_normal((scrambled + 0.5) / 2.0**32)
+
+
+def _first_primes(d: int) -> np.ndarray:
+    # upper bound for the d-th prime, valid for d >= 6
+    bound = max(15, int(d * (np.log(d + 1) + np.log(np.log(d + 1)))) + 1)
+    is_prime = np.ones(bound + 1, dtype=bool)
+    is_prime[:2] = False
+    for k in range(2, int(bound**0.5) + 1):
+        if is_prime[k]:
+            is_prime[k * k :: k] = False
+    return np.nonzero(is_prime)[0][:d]
+
+
+def lattice_normal(
+    key: PRNGKeyArray,  # random key, determines the random shift
+    N: int,  # number of samples
+    d: int,  # dimension
+) -> Float[Array, "N d"]:  # N randomized QMC standard normal vectors
+    """Standard normal variates from a randomly shifted Kronecker lattice"""
+    alpha = np.sqrt(_first_primes(d)) % 1.0
+    shift = jrn.uniform(key, (d,))
+    uniform = (jnp.arange(1, N + 1)[:, None] * alpha[None] + shift[None]) % 1.0
+    return _uniform_to_normal(uniform)